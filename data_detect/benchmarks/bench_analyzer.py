@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Data Feature Analysis Benchmark
+
+This script generates synthetic releases across scaling axes, times and
+memory-profiles each DataFeatureAnalyzer stage, and writes the results as JSON
+that can be compared between runs.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import itertools
+import statistics
+import tracemalloc
+import logging
+from typing import List, Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from data_feature_analysis import DataFeatureAnalyzer
+from generate_release import generate_release
+from metrics import RssSampler
+
+logger = logging.getLogger("bench_analyzer")
+
+# Analyzer stages in pipeline order
+STAGES = [
+    "extract_critical_features",
+    "get_nodes_features",
+    "analyze_feature_existence",
+    "calculate_coverage",
+    "generate_reports"
+]
+
+# Stages that read the rows of every node file; the others only read headers or
+# work on earlier results, so rows/sec is not reported for them
+ROW_STAGES = {"calculate_coverage"}
+
+# Generator parameters that make up one benchmark configuration
+AXES = ["num_files", "num_rows", "num_columns", "null_density", "dictionary_size"]
+
+
+def run_stages(release: Dict[str, Any], output_dir: str, analyzer_options: Dict[str, Any],
+               trace_memory: bool) -> Dict[str, Dict[str, float]]:
+    """
+    Run every analyzer stage once on a fresh analyzer
+
+    Parameters:
+        release: Release description returned by generate_release
+        output_dir: Directory receiving the reports
+        analyzer_options: Extra DataFeatureAnalyzer keyword arguments
+        trace_memory: Record the peak Python allocation of each stage with tracemalloc
+
+    Returns:
+        Dictionary mapping stage names to their measurements
+    """
+    analyzer = DataFeatureAnalyzer(
+        critical_data_path=release["critical_data_path"],
+        data_dir=release["data_dir"],
+        **analyzer_options
+    )
+    stage_calls = {
+        "extract_critical_features": analyzer.extract_critical_features,
+        "get_nodes_features": analyzer.get_nodes_features,
+        "analyze_feature_existence": analyzer.analyze_feature_existence,
+        "calculate_coverage": analyzer.calculate_coverage,
+        "generate_reports": lambda: analyzer.generate_reports(output_dir=output_dir)
+    }
+
+    measurements = {}
+    for stage in STAGES:
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with RssSampler() as sampler:
+            stage_calls[stage]()
+        seconds = time.perf_counter() - start
+        peak_bytes = 0
+        if trace_memory:
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        measurements[stage] = {
+            "seconds": seconds,
+            "peak_alloc_bytes": peak_bytes,
+            # None where the RSS cannot be sampled; the process-wide ru_maxrss would
+            # attribute the peak of an earlier stage to this one
+            "max_rss_bytes": sampler.peak
+        }
+    return measurements
+
+
+def run_benchmark(configs: List[Dict[str, Any]], repeats: int, analyzer_options: Dict[str, Any],
+                  trace_memory: bool, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Benchmark every configuration
+
+    Timings come from untraced repeats; peak allocations come from one extra
+    traced run, so tracemalloc overhead does not distort the timings.
+
+    Parameters:
+        configs: List of generator parameter dictionaries
+        repeats: Number of timed runs per configuration
+        analyzer_options: Extra DataFeatureAnalyzer keyword arguments
+        trace_memory: Record peak Python allocations per stage
+        seed: Random seed of the generator
+
+    Returns:
+        List of result records, one per configuration and stage
+    """
+    results = []
+    for config in configs:
+        work_dir = tempfile.mkdtemp(prefix="bench_release_")
+        try:
+            release = generate_release(work_dir, seed=seed, **config)
+            output_dir = os.path.join(work_dir, "reports")
+            os.makedirs(output_dir, exist_ok=True)
+            total_rows = release["num_files"] * release["num_rows"]
+
+            runs = [run_stages(release, output_dir, analyzer_options, trace_memory=False) for _ in range(repeats)]
+            traced = run_stages(release, output_dir, analyzer_options, trace_memory=True) if trace_memory else None
+
+            for stage in STAGES:
+                seconds = [run[stage]["seconds"] for run in runs]
+                rss = [run[stage]["max_rss_bytes"] for run in runs if run[stage]["max_rss_bytes"] is not None]
+                rows_per_sec = None
+                if stage in ROW_STAGES and min(seconds) > 0:
+                    rows_per_sec = total_rows / min(seconds)
+                record = dict(config)
+                record.update({
+                    "stage": stage,
+                    "total_bytes": release["total_bytes"],
+                    "seconds_min": min(seconds),
+                    "seconds_median": statistics.median(seconds),
+                    "rows_per_sec": rows_per_sec,
+                    "peak_alloc_bytes": traced[stage]["peak_alloc_bytes"] if traced else None,
+                    "max_rss_bytes": max(rss) if rss else None
+                })
+                results.append(record)
+                logger.info(f"{config} {stage}: {record['seconds_min']:.4f}s")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def compare_results(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> None:
+    """
+    Print the time ratio of each configuration and stage against a previous run
+
+    Parameters:
+        previous: Result records of the previous run
+        current: Result records of this run
+    """
+    def key(record):
+        return tuple(record[axis] for axis in AXES) + (record["stage"],)
+
+    baseline = {key(record): record for record in previous}
+    print(f"{'configuration':<48} {'stage':<28} {'before':>10} {'after':>10} {'ratio':>7}")
+    for record in current:
+        before = baseline.get(key(record))
+        if before is None:
+            continue
+        ratio = record["seconds_min"] / before["seconds_min"] if before["seconds_min"] > 0 else float("nan")
+        config = ",".join(str(record[axis]) for axis in AXES)
+        print(f"{config:<48} {record['stage']:<28} {before['seconds_min']:>10.4f} "
+              f"{record['seconds_min']:>10.4f} {ratio:>7.2f}")
+
+
+def _parse_list(value: str, cast) -> list:
+    """Parse a comma-separated list of axis values"""
+    return [cast(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data Feature Analysis Benchmark")
+    parser.add_argument("--files", default="10", help="Comma-separated numbers of node files")
+    parser.add_argument("--rows", default="1000,10000", help="Comma-separated numbers of rows per file")
+    parser.add_argument("--columns", default="20", help="Comma-separated numbers of property columns per file")
+    parser.add_argument("--null-density", default="0.2", help="Comma-separated shares of empty values")
+    parser.add_argument("--dictionary-size", default="200", help="Comma-separated dictionary sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of timed runs per configuration")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the generator")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that records peak allocations")
+    parser.add_argument("--workers", type=int, default=1, help="Analyzer worker processes")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Analyzer chunk size")
+    parser.add_argument("--critical-only", action="store_true", help="Run the analyzer in critical-only mode")
+    parser.add_argument("--output", default="bench_results.json", help="Output JSON file")
+    parser.add_argument("--compare", default=None, help="Previous results JSON file to compare against")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    for name in ("data_feature_analysis", "stats_cache", "metrics", "generate_release"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    axis_values = [
+        _parse_list(args.files, int),
+        _parse_list(args.rows, int),
+        _parse_list(args.columns, int),
+        _parse_list(args.null_density, float),
+        _parse_list(args.dictionary_size, int)
+    ]
+    configs = [dict(zip(AXES, values)) for values in itertools.product(*axis_values)]
+
+    analyzer_options: Dict[str, Any] = {"workers": args.workers, "critical_only": args.critical_only}
+    if args.chunk_size:
+        analyzer_options["chunk_size"] = args.chunk_size
+
+    results = run_benchmark(configs, args.repeats, analyzer_options, trace_memory=not args.no_memory, seed=args.seed)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "platform": platform.platform(),
+                "repeats": args.repeats,
+                "analyzer_options": analyzer_options
+            },
+            "results": results
+        }, f, indent=2)
+    logger.info(f"Benchmark results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(json.load(f)["results"], results)
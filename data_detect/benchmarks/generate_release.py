@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic Gen3 Release Generator
+
+This script generates a directory of synthetic node TSV files and a matching
+critical_data.csv, used to benchmark the data feature analysis tool.
+"""
+
+import os
+import csv
+import argparse
+import logging
+from typing import Dict, Any
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Number of columns in critical_data.csv; column D (index 3) marks critical rows and column K (index 10) holds the property
+CRITICAL_DATA_COLUMNS = 11
+
+
+def generate_release(output_dir: str, num_files: int = 10, num_rows: int = 1000, num_columns: int = 20,
+                     null_density: float = 0.2, dictionary_size: int = 200, critical_ratio: float = 0.3,
+                     distinct_values: int = 50, seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate a synthetic release directory
+
+    Each node file has the Gen3 *type, project_id and *submitter_id columns,
+    a link to the previous node file, and num_columns property columns drawn
+    from a dictionary of dictionary_size properties.
+
+    Parameters:
+        output_dir: Directory receiving critical_data.csv and the data/ directory
+        num_files: Number of node files
+        num_rows: Number of rows per node file
+        num_columns: Number of property columns per node file
+        null_density: Share of empty property values (0.0-1.0)
+        dictionary_size: Number of properties in the dictionary
+        critical_ratio: Share of dictionary properties marked "Critical" (0.0-1.0)
+        distinct_values: Number of distinct values per property column
+        seed: Random seed
+
+    Returns:
+        Dictionary describing the generated release, including its paths
+    """
+    rng = np.random.default_rng(seed)
+    data_dir = os.path.join(output_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+
+    properties = [f"property_{i}" for i in range(dictionary_size)]
+
+    # Write the dictionary layout: name in column A, "Critical" in column D, property in column K
+    critical_data_path = os.path.join(output_dir, "critical_data.csv")
+    is_critical = rng.random(dictionary_size) < critical_ratio
+    with open(critical_data_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Variable", "Description", "Values", "Is it crit?", "", "", "", "", "", "", "property"])
+        for i, prop in enumerate(properties):
+            row = [""] * CRITICAL_DATA_COLUMNS
+            row[0] = f"variable_{i}"
+            row[3] = "Critical" if is_critical[i] else ""
+            row[10] = prop
+            writer.writerow(row)
+
+    vocabulary = np.array([f"value_{i}" for i in range(distinct_values)], dtype=object)
+    total_bytes = 0
+    for file_index in range(num_files):
+        node_type = f"node_{file_index}"
+        columns: Dict[str, Any] = {
+            "*type": np.full(num_rows, node_type, dtype=object),
+            "project_id": np.full(num_rows, "SYNTH-bench", dtype=object),
+            "*submitter_id": np.array([f"{node_type}_{row}" for row in range(num_rows)], dtype=object),
+        }
+        if file_index > 0:
+            parent = f"node_{file_index - 1}"
+            columns[f"*{parent}s.submitter_id"] = np.array(
+                [f"{parent}_{row}" for row in rng.integers(0, num_rows, num_rows)], dtype=object
+            )
+
+        chosen = rng.choice(dictionary_size, size=min(num_columns, dictionary_size), replace=False)
+        for prop_index in sorted(chosen):
+            values = vocabulary[rng.integers(0, distinct_values, num_rows)]
+            values[rng.random(num_rows) < null_density] = None
+            columns[properties[prop_index]] = values
+
+        file_path = os.path.join(data_dir, f"{node_type}_SYNTH_data_release_v1-0-0.tsv")
+        pd.DataFrame(columns).to_csv(file_path, sep='\t', index=False, na_rep="")
+        total_bytes += os.path.getsize(file_path)
+
+    logger.info(f"Generated {num_files} node files ({total_bytes} bytes) in {data_dir}")
+    return {
+        "critical_data_path": critical_data_path,
+        "data_dir": data_dir,
+        "num_files": num_files,
+        "num_rows": num_rows,
+        "num_columns": num_columns,
+        "null_density": null_density,
+        "dictionary_size": dictionary_size,
+        "critical_ratio": critical_ratio,
+        "distinct_values": distinct_values,
+        "seed": seed,
+        "total_bytes": total_bytes
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic Gen3 Release Generator")
+    parser.add_argument("--output-dir", required=True, help="Directory receiving critical_data.csv and data/")
+    parser.add_argument("--files", type=int, default=10, help="Number of node files")
+    parser.add_argument("--rows", type=int, default=1000, help="Number of rows per node file")
+    parser.add_argument("--columns", type=int, default=20, help="Number of property columns per node file")
+    parser.add_argument("--null-density", type=float, default=0.2, help="Share of empty property values (0.0-1.0)")
+    parser.add_argument("--dictionary-size", type=int, default=200, help="Number of properties in the dictionary")
+    parser.add_argument("--critical-ratio", type=float, default=0.3, help="Share of critical properties (0.0-1.0)")
+    parser.add_argument("--distinct-values", type=int, default=50, help="Number of distinct values per column")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    args = parser.parse_args()
+
+    generate_release(
+        output_dir=args.output_dir,
+        num_files=args.files,
+        num_rows=args.rows,
+        num_columns=args.columns,
+        null_density=args.null_density,
+        dictionary_size=args.dictionary_size,
+        critical_ratio=args.critical_ratio,
+        distinct_values=args.distinct_values,
+        seed=args.seed
+    )
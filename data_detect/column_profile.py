@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Column Profiling
+
+This module computes rich per-column statistics (distinct count, top values,
+min/max, inferred type, placeholder share) with bounded-memory sketches that
+can be merged across chunks, byte ranges and files.
+"""
+
+from typing import List, Dict, Any, Optional, Iterable
+import numpy as np
+import pandas as pd
+
+# Gen3 placeholder values that carry no information and count as missing.
+# Empty strings are already parsed as missing values by pandas.
+DEFAULT_SENTINELS = (
+    "Not Assigned",
+    "Not Reported",
+    "not reported",
+    "Not Applicable",
+    "Not Allowed To Collect",
+    "Unknown",
+    "unknown",
+)
+
+# Number of top values written to the profile report
+TOP_VALUES = 5
+
+
+class HyperLogLog:
+    """HyperLogLog cardinality sketch"""
+
+    def __init__(self, precision: int = 12):
+        """
+        Initialize an empty sketch
+
+        Parameters:
+            precision: Number of index bits; the sketch uses 2 ** precision registers
+        """
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values: pd.Series) -> None:
+        """
+        Add a series of values to the sketch
+
+        Parameters:
+            values: Values to add
+        """
+        if values.empty:
+            return
+
+        # pandas hashing is stable across processes, so sketches stay mergeable
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        value_bits = 64 - self.precision
+        indexes = (hashes >> np.uint64(value_bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << value_bits) - 1)
+
+        # Rank is the position of the leftmost 1-bit in the remaining bits
+        ranks = np.full(len(hashes), value_bits + 1, dtype=np.uint8)
+        nonzero = remainder > 0
+        ranks[nonzero] = value_bits - np.floor(np.log2(remainder[nonzero].astype(np.float64))).astype(np.uint8)
+        np.maximum.at(self.registers, indexes, ranks)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Merge another sketch with the same precision into this one
+
+        Parameters:
+            other: Sketch to merge
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """
+        Estimate the number of distinct values added
+
+        Returns:
+            Estimated cardinality
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+
+        # Use linear counting for small cardinalities
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros > 0:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+
+class HeavyHitters:
+    """
+    Most frequent values: exact counts up to a number of distinct values, then a Misra-Gries summary
+
+    While a column has at most exact_limit distinct values, every value is
+    counted exactly, so the top values do not depend on how the column was
+    split into chunks. Past that point the counters are pruned Misra-Gries
+    style and error keeps the total subtracted, which bounds how much any
+    count is too low and how often any dropped value occurred. Only values
+    whose lower bound is above error are reported then, so a large column of
+    unique values lists none; a column within exact_limit lists all its
+    values, including those seen once.
+    """
+
+    def __init__(self, exact_limit: int = 1024, capacity: int = 64):
+        """
+        Initialize an empty summary
+
+        Parameters:
+            exact_limit: Maximum number of distinct values counted exactly
+            capacity: Number of counters kept once there are more distinct values
+        """
+        self.exact_limit = exact_limit
+        self.capacity = capacity
+        self.counters: Dict[Any, int] = {}
+        self.exact = True
+        self.error = 0
+
+    def add_counts(self, counts: Dict[Any, int], error: int = 0) -> None:
+        """
+        Add value counts to the summary
+
+        Parameters:
+            counts: Dictionary mapping values to their counts
+            error: Maximum undercount of the given counts
+        """
+        for value, count in counts.items():
+            self.counters[value] = self.counters.get(value, 0) + int(count)
+        self.error += error
+        if self.exact and len(self.counters) > self.exact_limit:
+            self.exact = False
+        if not self.exact:
+            self._prune()
+
+    def add(self, values: pd.Series) -> None:
+        """
+        Add a series of values to the summary
+
+        Parameters:
+            values: Values to add
+        """
+        if not values.empty:
+            self.add_counts(values.value_counts().to_dict())
+
+    def merge(self, other: "HeavyHitters") -> None:
+        """
+        Merge another summary into this one
+
+        Parameters:
+            other: Summary to merge
+        """
+        if not other.exact:
+            self.exact = False
+        self.add_counts(other.counters, other.error)
+
+    def _prune(self) -> None:
+        """Subtract the (capacity + 1)-th largest count and drop counters that reach zero"""
+        if len(self.counters) <= self.capacity:
+            return
+        threshold = sorted(self.counters.values(), reverse=True)[self.capacity]
+        self.counters = {
+            value: count - threshold for value, count in self.counters.items() if count > threshold
+        }
+        self.error += threshold
+
+    def top(self, n: int = TOP_VALUES) -> List[tuple]:
+        """
+        Get the most frequent values
+
+        Parameters:
+            n: Number of values returned
+
+        Returns:
+            List of (value, count) tuples; once the summary is not exact, counts are lower bounds
+            and only values more frequent than any value left out are returned
+        """
+        items = [(value, count) for value, count in self.counters.items() if self.exact or count > self.error]
+        return sorted(items, key=lambda item: (-item[1], str(item[0])))[:n]
+
+
+class ColumnProfile:
+    """Mergeable statistics of one column"""
+
+    def __init__(self):
+        """
+        Initialize an empty profile
+        """
+        self.sentinel_count = 0
+        self.value_count = 0
+        self.numeric_count = 0
+        self.integer_count = 0
+        self.boolean_count = 0
+        self.numeric_min: Optional[float] = None
+        self.numeric_max: Optional[float] = None
+        self.text_min: Optional[str] = None
+        self.text_max: Optional[str] = None
+        self.distinct = HyperLogLog()
+        self.top_values = HeavyHitters()
+
+    def update(self, values: pd.Series, sentinels: Iterable[str]) -> None:
+        """
+        Add the non-null string values of one chunk to the profile
+
+        Parameters:
+            values: Non-null values of the column
+            sentinels: Placeholder values treated as missing
+        """
+        is_sentinel = values.isin(sentinels)
+        self.sentinel_count += int(is_sentinel.sum())
+        values = values[~is_sentinel]
+        if values.empty:
+            return
+
+        self.value_count += len(values)
+        self.distinct.add(values)
+        self.top_values.add(values)
+        self.text_min = _min(self.text_min, values.min())
+        self.text_max = _max(self.text_max, values.max())
+
+        numbers = pd.to_numeric(values, errors='coerce').dropna()
+        if not numbers.empty:
+            self.numeric_count += len(numbers)
+            self.integer_count += int((numbers == np.floor(numbers)).sum())
+            self.numeric_min = _min(self.numeric_min, float(numbers.min()))
+            self.numeric_max = _max(self.numeric_max, float(numbers.max()))
+
+        self.boolean_count += int(values.str.lower().isin(("true", "false")).sum())
+
+    def merge(self, other: "ColumnProfile") -> None:
+        """
+        Merge another profile of the same column into this one
+
+        Parameters:
+            other: Profile to merge
+        """
+        self.sentinel_count += other.sentinel_count
+        self.value_count += other.value_count
+        self.numeric_count += other.numeric_count
+        self.integer_count += other.integer_count
+        self.boolean_count += other.boolean_count
+        self.numeric_min = _min(self.numeric_min, other.numeric_min)
+        self.numeric_max = _max(self.numeric_max, other.numeric_max)
+        self.text_min = _min(self.text_min, other.text_min)
+        self.text_max = _max(self.text_max, other.text_max)
+        self.distinct.merge(other.distinct)
+        self.top_values.merge(other.top_values)
+
+    def inferred_type(self) -> str:
+        """
+        Infer the column type from the values seen
+
+        Returns:
+            One of "empty", "boolean", "integer", "float" or "string"
+        """
+        if self.value_count == 0:
+            return "empty"
+        if self.boolean_count == self.value_count:
+            return "boolean"
+        if self.numeric_count == self.value_count:
+            return "integer" if self.integer_count == self.numeric_count else "float"
+        return "string"
+
+    def summary(self, non_null_count: int, total_count: int) -> Dict[str, Any]:
+        """
+        Summarize the profile for reporting
+
+        Parameters:
+            non_null_count: Number of non-null values in the column
+            total_count: Number of rows
+
+        Returns:
+            Dictionary of profile statistics
+        """
+        inferred_type = self.inferred_type()
+        numeric = inferred_type in ("integer", "float")
+        placeholder_count = total_count - non_null_count + self.sentinel_count
+        return {
+            "distinct_count": self.distinct.estimate() if self.value_count else 0,
+            "top_values": self.top_values.top(),
+            "top_values_exact": self.top_values.exact,
+            "min": self.numeric_min if numeric else self.text_min,
+            "max": self.numeric_max if numeric else self.text_max,
+            "inferred_type": inferred_type,
+            "placeholder_share": placeholder_count / total_count if total_count > 0 else 0,
+            "effective_coverage": (non_null_count - self.sentinel_count) / total_count if total_count > 0 else 0
+        }
+
+
+def profile_chunk(chunk: pd.DataFrame, profiles: Dict[str, ColumnProfile], sentinels: Iterable[str]) -> None:
+    """
+    Update the column profiles with one chunk of string values
+
+    Parameters:
+        chunk: Chunk read with dtype=str
+        profiles: Dictionary mapping column names to profiles, updated in place
+        sentinels: Placeholder values treated as missing
+    """
+    for column in chunk.columns:
+        if column not in profiles:
+            profiles[column] = ColumnProfile()
+        profiles[column].update(chunk[column].dropna(), sentinels)
+
+
+def merge_profiles(target: Dict[str, ColumnProfile], source: Dict[str, ColumnProfile]) -> Dict[str, ColumnProfile]:
+    """
+    Merge column profiles of the same file
+
+    Parameters:
+        target: Profiles updated in place
+        source: Profiles to merge
+
+    Returns:
+        The target profiles
+    """
+    for column, profile in source.items():
+        if column in target:
+            target[column].merge(profile)
+        else:
+            target[column] = profile
+    return target
+
+
+def _min(current, value):
+    """Return the smaller value, ignoring None"""
+    if current is None:
+        return value
+    if value is None:
+        return current
+    return min(current, value)
+
+
+def _max(current, value):
+    """Return the larger value, ignoring None"""
+    if current is None:
+        return value
+    if value is None:
+        return current
+    return max(current, value)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Columnar Coverage Table
+
+This module keeps coverage results as one compact table with a row per
+(feature, file) pair, categorical feature and file codes, and vectorized
+report writing and summaries.
+"""
+
+import os
+import importlib.util
+import logging
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns of the coverage table
+COLUMNS = ["feature", "file", "non_null_count", "total_count", "coverage", "is_critical"]
+
+# Columnar output formats and their file extensions
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _format_percent(values: pd.Series) -> np.ndarray:
+    """Format fractions like f"{value:.2%}", for a whole column at once"""
+    return np.char.mod("%.2f%%", values.to_numpy(dtype=np.float64) * 100)
+
+
+class CoverageTable:
+    """Coverage of every feature in every file, stored column-wise"""
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None):
+        """
+        Initialize the table
+
+        Parameters:
+            frame: DataFrame with the COLUMNS columns; an empty table if None
+        """
+        if frame is None:
+            frame = pd.DataFrame({
+                "feature": pd.Categorical([]),
+                "file": pd.Categorical([]),
+                "non_null_count": np.array([], dtype=np.int64),
+                "total_count": np.array([], dtype=np.int64),
+                "coverage": np.array([], dtype=np.float64),
+                "is_critical": np.array([], dtype=bool)
+            })
+        self.frame = frame
+
+    @classmethod
+    def from_counts(cls, file_counts: Iterable[Tuple[str, Iterable[str], Dict[str, int], int]],
+                    critical_features: Iterable[str]) -> "CoverageTable":
+        """
+        Build the table from per-file non-null counts
+
+        Rows are grouped by feature in order of first appearance, then by
+        file in the given order.
+
+        Parameters:
+            file_counts: Iterable of (file name, features, non_null_counts, total_count) tuples;
+                features missing from non_null_counts are left out
+            critical_features: Names of the critical features
+
+        Returns:
+            Coverage table
+        """
+        features: List[str] = []
+        file_codes: List[int] = []
+        non_null: List[int] = []
+        totals: List[int] = []
+        file_names: List[str] = []
+        for file_code, (file_name, file_features, non_null_counts, total_count) in enumerate(file_counts):
+            file_names.append(file_name)
+            for feature in file_features:
+                if feature in non_null_counts:
+                    features.append(feature)
+                    file_codes.append(file_code)
+                    non_null.append(non_null_counts[feature])
+                    totals.append(total_count)
+
+        feature_codes, feature_names = pd.factorize(pd.Series(features, dtype=object))
+        file_codes_array = np.asarray(file_codes, dtype=np.int32)
+        # Group rows by feature, keeping the file order within each feature
+        order = np.argsort(feature_codes, kind="stable")
+        non_null_array = np.asarray(non_null, dtype=np.int64)[order]
+        total_array = np.asarray(totals, dtype=np.int64)[order]
+        coverage = np.divide(non_null_array, total_array, out=np.zeros(len(order), dtype=np.float64),
+                             where=total_array > 0)
+
+        feature_categorical = pd.Categorical.from_codes(feature_codes[order], categories=feature_names)
+        return cls(pd.DataFrame({
+            "feature": feature_categorical,
+            "file": pd.Categorical.from_codes(file_codes_array[order],
+                                              categories=pd.Index(file_names, dtype=object)),
+            "non_null_count": non_null_array,
+            "total_count": total_array,
+            "coverage": coverage,
+            "is_critical": feature_categorical.isin(list(critical_features))
+        }))
+
+    def to_dict(self) -> Dict[str, list]:
+        """
+        Convert the table to a JSON-serializable dictionary of columns, with categories stored once
+
+        Returns:
+            Dictionary with features, files, feature_code, file_code, non_null_count, total_count and is_critical
+        """
+        return {
+            "features": [str(feature) for feature in self.frame["feature"].cat.categories],
+            "files": [str(file_name) for file_name in self.frame["file"].cat.categories],
+            "feature_code": self.frame["feature"].cat.codes.tolist(),
+            "file_code": self.frame["file"].cat.codes.tolist(),
+            "non_null_count": self.frame["non_null_count"].tolist(),
+            "total_count": self.frame["total_count"].tolist(),
+            "is_critical": self.frame["is_critical"].tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, list]) -> "CoverageTable":
+        """
+        Rebuild a table from to_dict output
+
+        Parameters:
+            data: Dictionary of columns
+
+        Returns:
+            Coverage table
+        """
+        non_null = np.asarray(data["non_null_count"], dtype=np.int64)
+        totals = np.asarray(data["total_count"], dtype=np.int64)
+        return cls(pd.DataFrame({
+            "feature": pd.Categorical.from_codes(np.asarray(data["feature_code"], dtype=np.int32),
+                                                 categories=pd.Index(data["features"], dtype=object)),
+            "file": pd.Categorical.from_codes(np.asarray(data["file_code"], dtype=np.int32),
+                                              categories=pd.Index(data["files"], dtype=object)),
+            "non_null_count": non_null,
+            "total_count": totals,
+            "coverage": np.divide(non_null, totals, out=np.zeros(len(non_null), dtype=np.float64),
+                                  where=totals > 0),
+            "is_critical": np.asarray(data["is_critical"], dtype=bool)
+        }))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def critical(self) -> pd.DataFrame:
+        """
+        Get the rows of critical features
+
+        Returns:
+            DataFrame with the rows whose is_critical is True
+        """
+        return self.frame[self.frame["is_critical"].to_numpy()]
+
+    def average_coverage(self, critical_only: bool = True) -> pd.Series:
+        """
+        Average the coverage of each feature over the files that contain it
+
+        Parameters:
+            critical_only: Only average critical features
+
+        Returns:
+            Series mapping feature names to average coverage
+        """
+        frame = self.critical() if critical_only else self.frame
+        return frame.groupby("feature", observed=True, sort=False)["coverage"].mean()
+
+    def count_above(self, threshold: float) -> int:
+        """
+        Count the critical features whose average coverage reaches a threshold
+
+        Parameters:
+            threshold: Coverage threshold (0.0-1.0)
+
+        Returns:
+            Number of critical features
+        """
+        return int((self.average_coverage() >= threshold).sum())
+
+    def to_nested(self, critical_only: bool = False) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Convert the table to the nested feature -> file -> info dictionaries of earlier versions
+
+        Parameters:
+            critical_only: Return critical features with counts, like critical_features_coverage
+
+        Returns:
+            Nested dictionary
+        """
+        frame = self.critical() if critical_only else self.frame
+        nested: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for feature, file_name, non_null_count, total_count, coverage, is_critical in zip(
+                frame["feature"], frame["file"], frame["non_null_count"], frame["total_count"],
+                frame["coverage"], frame["is_critical"]):
+            if critical_only:
+                info = {"coverage": float(coverage), "non_null_count": int(non_null_count),
+                        "total_count": int(total_count)}
+            else:
+                info = {"coverage": float(coverage), "is_critical": bool(is_critical)}
+            nested.setdefault(feature, {})[file_name] = info
+        return nested
+
+    def write_coverage_csv(self, output_path: str) -> None:
+        """
+        Write feature_coverage.csv
+
+        Parameters:
+            output_path: Output CSV file path
+        """
+        pd.DataFrame({
+            "Feature Name": self.frame["feature"].astype(object),
+            "File Name": self.frame["file"].astype(object),
+            "Coverage": _format_percent(self.frame["coverage"]),
+            "Is Critical Feature": np.where(self.frame["is_critical"].to_numpy(), "Yes", "No")
+        }).to_csv(output_path, index=False, lineterminator="\r\n")
+
+    def write_critical_csv(self, output_path: str) -> None:
+        """
+        Write critical_features_coverage.csv
+
+        Parameters:
+            output_path: Output CSV file path
+        """
+        critical = self.critical()
+        pd.DataFrame({
+            "Critical Feature": critical["feature"].astype(object),
+            "File Name": critical["file"].astype(object),
+            "Coverage": _format_percent(critical["coverage"]),
+            "Non-Null Count": critical["non_null_count"],
+            "Total Count": critical["total_count"]
+        }).to_csv(output_path, index=False, lineterminator="\r\n")
+
+    def write_columnar(self, output_dir: str, columnar_format: str) -> str:
+        """
+        Write the table as Parquet or Arrow IPC (Feather v2), keeping the categorical codes
+
+        Parameters:
+            output_dir: Output directory path
+            columnar_format: "parquet" or "arrow"
+
+        Returns:
+            Path of the written file
+        """
+        # pandas imports pyarrow itself; only check that it is installed
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ImportError("The pyarrow package is required for Parquet/Arrow output: pip install pyarrow")
+
+        output_path = os.path.join(output_dir, "feature_coverage" + COLUMNAR_FORMATS[columnar_format])
+        if columnar_format == "parquet":
+            self.frame.to_parquet(output_path, index=False)
+        else:
+            self.frame.reset_index(drop=True).to_feather(output_path)
+        logger.info(f"Coverage table written to {output_path}")
+        return output_path
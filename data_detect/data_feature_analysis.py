@@ -9,14 +9,31 @@ evaluate data integrity and coverage.
 """
 
 import os
+import sys
+import io
+import mmap
 import pandas as pd
 import numpy as np
 import csv
-import glob
+import time
 import argparse
-from typing import List, Dict, Tuple, Set, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Tuple, Set, Any, Optional
 import logging
 
+from stats_cache import StatsCache, DEFAULT_MAX_ENTRIES, new_digest, range_hash, combine_hashes
+from feature_index import FeatureIndex
+from column_profile import ColumnProfile, DEFAULT_SENTINELS, profile_chunk, merge_profiles
+from integrity import ReferentialIntegrityChecker
+from metrics import MetricsRecorder, instrumented, timed_call
+from readers import list_node_files, is_compressed, open_node_file, read_header, next_line_start
+from export_source import NodeSource, open_source, reusable_source
+from pipeline import StageGraph, stage
+from coverage_table import CoverageTable, COLUMNAR_FORMATS
+from snapshot import build_snapshot, save_snapshot
+from shards import parse_shard, shard_of, build_partial, save_partial, merge_partials
+from watch import AnalysisWatcher, serve, DEFAULT_INTERVAL, DEFAULT_HOST, DEFAULT_PORT
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,10 +41,319 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of rows parsed per chunk when streaming a TSV file
+DEFAULT_CHUNK_SIZE = 100000
+
+# Files larger than this are split into byte ranges that are counted in parallel
+DEFAULT_SPLIT_SIZE = 256 * 1024 * 1024
+
+# Non-null counts per column, row count and optional column profiles of one file
+FileCounts = Tuple[Dict[str, int], int, Optional[Dict[str, ColumnProfile]]]
+
+
+def _usecols_filter(usecols: Optional[List[str]]):
+    """Build a pandas usecols callable that ignores names missing from the file"""
+    if usecols is None:
+        return None
+    wanted = set(usecols)
+    return lambda column: column in wanted
+
+
+def count_non_null(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   usecols: Optional[List[str]] = None,
+                   sentinels: Optional[Tuple[str, ...]] = None, digest=None) -> FileCounts:
+    """
+    Count non-null values per column of a TSV file by streaming it in row chunks
+    
+    Only one chunk is held in memory at a time, so peak memory depends on
+    chunk_size and the number of columns rather than on the file size. Values
+    are read as strings, which applies the same missing-value rules as a full
+    pd.read_csv without any per-chunk type inference.
+    
+    Parameters:
+        file_path: Path to the tsv file
+        chunk_size: Number of rows parsed per chunk
+        usecols: Names of the columns to parse; all columns are parsed if None
+        sentinels: Placeholder values for column profiling; profiling is skipped if None
+        digest: Hash object updated with the (compressed) bytes of the file in the same pass
+        
+    Returns:
+        Tuple containing:
+        - Dictionary mapping column names to non-null counts
+        - Total number of data rows
+        - Dictionary mapping column names to profiles, or None if not profiling
+    """
+    columns = pd.read_csv(file_path, sep='\t', nrows=0, usecols=_usecols_filter(usecols)).columns
+    non_null_counts: Dict[str, int] = {column: 0 for column in columns}
+    total_count = 0
+    profiles = None if sentinels is None else {column: ColumnProfile() for column in columns}
+    
+    raw = None
+    source = file_path
+    if digest is not None:
+        raw = _ByteRangeReader(file_path, 0, os.path.getsize(file_path), digest)
+        source = open_node_file(file_path, io.BufferedReader(raw))
+    try:
+        with pd.read_csv(source, sep='\t', dtype=str, chunksize=chunk_size,
+                         usecols=_usecols_filter(usecols)) as reader:
+            for chunk in reader:
+                for column, count in chunk.count().items():
+                    non_null_counts[column] += int(count)
+                total_count += len(chunk)
+                if profiles is not None:
+                    profile_chunk(chunk, profiles, sentinels)
+        if raw is not None:
+            raw.drain()
+    finally:
+        if raw is not None:
+            source.close()
+            raw.close()
+    
+    return non_null_counts, total_count, profiles
+
+
+def count_and_hash(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   usecols: Optional[List[str]] = None,
+                   sentinels: Optional[Tuple[str, ...]] = None) -> Tuple[FileCounts, str]:
+    """
+    Count non-null values of a TSV file and hash its content in the same pass, for the stats cache
+    
+    Parameters:
+        file_path: Path to the tsv file
+        chunk_size: Number of rows parsed per chunk
+        usecols: Names of the columns to parse; all columns are parsed if None
+        sentinels: Placeholder values for column profiling; profiling is skipped if None
+        
+    Returns:
+        Tuple of the counts returned by count_non_null and the content hash of the file
+    """
+    digest = new_digest()
+    counts = count_non_null(file_path, chunk_size, usecols, sentinels, digest)
+    return counts, digest.hexdigest()
+
+
+class _ByteRangeReader(io.RawIOBase):
+    """Read-only view of the bytes between start and end of a file, optionally hashing them as they are read"""
+    
+    def __init__(self, file_path: str, start: int, end: int, digest=None):
+        self._file = open(file_path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+        self._digest = digest
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        if self._digest is not None:
+            self._digest.update(data)
+        return len(data)
+    
+    def drain(self) -> None:
+        """Read the bytes the parser left unread, so the digest covers the whole range"""
+        while self.read(1024 * 1024):
+            pass
+    
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def split_byte_ranges(file_path: str, split_size: int = DEFAULT_SPLIT_SIZE) -> List[Tuple[int, int]]:
+    """
+    Split the data rows of a TSV file into byte ranges that start and end on line boundaries
+    
+    The header line is excluded. Rows must not contain quoted line breaks,
+    which holds for Gen3 TSV exports. The file is memory-mapped, so finding
+    the line boundaries does not read the data in between. Only plain files
+    can be split.
+    
+    Parameters:
+        file_path: Path to the tsv file
+        split_size: Approximate size of each range in bytes
+        
+    Returns:
+        List of (start, end) byte offsets
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        return []
+    
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        boundaries = [next_line_start(mm, 0)]
+        
+        position = boundaries[0] + split_size
+        while position < file_size:
+            # Move the split point forward to the start of the next line
+            boundary = next_line_start(mm, position)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            position = boundaries[-1] + split_size
+    
+    if boundaries[-1] < file_size:
+        boundaries.append(file_size)
+    
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def count_non_null_range(file_path: str, columns: List[str], start: int, end: int,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         usecols: Optional[List[str]] = None,
+                         sentinels: Optional[Tuple[str, ...]] = None, digest=None) -> FileCounts:
+    """
+    Count non-null values per column in one byte range of a TSV file
+    
+    Parameters:
+        file_path: Path to the tsv file
+        columns: Column names of the file, as parsed by pandas
+        start: Byte offset of the first row in the range
+        end: Byte offset just past the last row in the range
+        chunk_size: Number of rows parsed per chunk
+        usecols: Names of the columns to parse; all columns are parsed if None
+        sentinels: Placeholder values for column profiling; profiling is skipped if None
+        digest: Hash object updated with the bytes of the range in the same pass
+        
+    Returns:
+        Tuple containing:
+        - Dictionary mapping column names to non-null counts
+        - Number of data rows in the range
+        - Dictionary mapping column names to profiles, or None if not profiling
+    """
+    selected = columns if usecols is None else [column for column in columns if column in set(usecols)]
+    non_null_counts: Dict[str, int] = {column: 0 for column in selected}
+    total_count = 0
+    profiles = None if sentinels is None else {column: ColumnProfile() for column in selected}
+    
+    raw = _ByteRangeReader(file_path, start, end, digest)
+    with io.BufferedReader(raw) as buffer:
+        with pd.read_csv(buffer, sep='\t', header=None, names=columns, dtype=str,
+                         chunksize=chunk_size, usecols=_usecols_filter(usecols)) as reader:
+            for chunk in reader:
+                for column, count in chunk.count().items():
+                    non_null_counts[column] += int(count)
+                total_count += len(chunk)
+                if profiles is not None:
+                    profile_chunk(chunk, profiles, sentinels)
+        if digest is not None:
+            raw.drain()
+    
+    return non_null_counts, total_count, profiles
+
+
+def count_and_hash_range(file_path: str, columns: List[str], start: int, end: int,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         usecols: Optional[List[str]] = None,
+                         sentinels: Optional[Tuple[str, ...]] = None) -> Tuple[FileCounts, str]:
+    """
+    Count non-null values in one byte range of a TSV file and hash the range in the same pass
+    
+    The range hashes of a file are combined with stats_cache.combine_hashes.
+    
+    Parameters:
+        file_path: Path to the tsv file
+        columns: Column names of the file, as parsed by pandas
+        start: Byte offset of the first row in the range
+        end: Byte offset just past the last row in the range
+        chunk_size: Number of rows parsed per chunk
+        usecols: Names of the columns to parse; all columns are parsed if None
+        sentinels: Placeholder values for column profiling; profiling is skipped if None
+        
+    Returns:
+        Tuple of the counts returned by count_non_null_range and the hash of the range
+    """
+    digest = new_digest()
+    counts = count_non_null_range(file_path, columns, start, end, chunk_size, usecols, sentinels, digest)
+    return counts, digest.hexdigest()
+
+
+def count_non_null_stream(stream: io.RawIOBase, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          usecols: Optional[List[str]] = None,
+                          sentinels: Optional[Tuple[str, ...]] = None,
+                          on_header=None) -> Tuple[List[str], Optional[FileCounts]]:
+    """
+    Read the header and count non-null values of a TSV stream in a single pass
+    
+    The stream is parsed in row chunks while its bytes arrive, so a node
+    export never has to be written to disk or held in memory as a whole.
+    
+    Parameters:
+        stream: Raw binary stream of the TSV content
+        chunk_size: Number of rows parsed per chunk
+        usecols: Names of the columns to parse; all columns are parsed if None
+        sentinels: Placeholder values for column profiling; profiling is skipped if None
+        on_header: Called with the column names as soon as the header has arrived; if it
+            returns False, the rows are not counted
+        
+    Returns:
+        Tuple containing:
+        - List of column names, empty if the stream is empty
+        - (non_null_counts, total_count, profiles), or None if the rows were not counted
+    """
+    with io.BufferedReader(stream) as buffer:
+        first_line = buffer.readline()
+        if not first_line.strip():
+            return [], None
+        columns = first_line.decode('utf-8').strip().split('\t')
+        if on_header is not None and on_header(columns) is False:
+            return columns, None
+        
+        selected = columns if usecols is None else [column for column in columns if column in set(usecols)]
+        non_null_counts: Dict[str, int] = {column: 0 for column in selected}
+        total_count = 0
+        profiles = None if sentinels is None else {column: ColumnProfile() for column in selected}
+        
+        if buffer.peek(1):
+            with pd.read_csv(buffer, sep='\t', header=None, names=columns, dtype=str,
+                             chunksize=chunk_size, usecols=_usecols_filter(usecols)) as reader:
+                for chunk in reader:
+                    for column, count in chunk.count().items():
+                        non_null_counts[column] += int(count)
+                    total_count += len(chunk)
+                    if profiles is not None:
+                        profile_chunk(chunk, profiles, sentinels)
+    
+    return columns, (non_null_counts, total_count, profiles)
+
+
+def merge_counts(partials: List[FileCounts]) -> FileCounts:
+    """
+    Merge partial non-null counts and column profiles of the same file
+    
+    Parameters:
+        partials: List of (non_null_counts, total_count, profiles) tuples
+        
+    Returns:
+        Tuple containing the summed non-null counts, total row count and merged profiles
+    """
+    non_null_counts: Dict[str, int] = {}
+    total_count = 0
+    profiles = None
+    for counts, rows, partial_profiles in partials:
+        for column, count in counts.items():
+            non_null_counts[column] = non_null_counts.get(column, 0) + count
+        total_count += rows
+        if partial_profiles is not None:
+            profiles = merge_profiles(profiles if profiles is not None else {}, partial_profiles)
+    return non_null_counts, total_count, profiles
+
+
 class DataFeatureAnalyzer:
     """Data Feature Analyzer Class"""
     
-    def __init__(self, critical_data_path: str, data_dir: str, coverage_threshold: float = 0.8):
+    def __init__(self, critical_data_path: str, data_dir: str, coverage_threshold: float = 0.8,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1,
+                 split_size: int = DEFAULT_SPLIT_SIZE, cache_dir: Optional[str] = None,
+                 cache_max_entries: int = DEFAULT_MAX_ENTRIES, critical_only: bool = False,
+                 profile_columns: bool = False, sentinel_values: Tuple[str, ...] = DEFAULT_SENTINELS,
+                 profile_stages: Optional[List[str]] = None, profile_dir: str = ".",
+                 sources: Optional[Dict[str, NodeSource]] = None, shard: Optional[Tuple[int, int]] = None,
+                 partials: Optional[List[str]] = None):
         """
         Initialize the data feature analyzer
         
@@ -35,23 +361,122 @@ class DataFeatureAnalyzer:
             critical_data_path: Path to the critical_data_v2.csv file
             data_dir: Path to the directory containing tsv files
             coverage_threshold: Threshold for considering a feature's coverage as sufficient (default: 0.8)
+            chunk_size: Number of rows read at a time when calculating coverage (default: 100000)
+            workers: Number of worker processes used to scan files (default: 1)
+            split_size: Files larger than this many bytes are counted in parallel byte ranges
+            cache_dir: Directory of the persistent stats cache; caching is disabled if None
+            cache_max_entries: Maximum number of files kept in the stats cache
+            critical_only: Only parse the columns that match mapped critical features (default: False)
+            profile_columns: Profile every column in the same pass as coverage (default: False)
+            sentinel_values: Gen3 placeholder values treated as missing when profiling
+            profile_stages: Names of the stages to run under cProfile
+            profile_dir: Directory receiving the cProfile stats files
+            sources: Node sources by name (file-like objects, byte iterators or callables opening
+                either), such as commons export streams; read instead of the files in data_dir
+            shard: (index, count) to only analyze the node files or sources of one shard, by hash of name
+            partials: Partial results files of sharded runs; merged instead of reading node files
         """
         self.critical_data_path = critical_data_path
         self.data_dir = data_dir
         self.coverage_threshold = coverage_threshold
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        self.split_size = split_size
+        self.stats_cache = StatsCache(cache_dir, cache_max_entries) if cache_dir else None
+        self.critical_only = critical_only
+        self.profile_columns = profile_columns
+        self.sentinel_values = tuple(sentinel_values)
+        self.metrics = MetricsRecorder(profile_stages, profile_dir)
+        # 各阶段结果的缓存及其依赖关系
+        self.stage_graph = StageGraph()
+        self.sources = sources
+        self.shard = shard
+        self.partials = partials
+        # 流式数据源在读取表头的同一遍中统计的非空计数，或分片结果中的非空计数
+        self.source_counts: Dict[str, FileCounts] = {}
+        # 已读取过的流式数据源名称；只能读取一次的数据源不能再次读取
+        self.read_sources: Set[str] = set()
         self.critical_features: List[str] = []  # 原始关键特征
         self.mapped_critical_features: List[str] = []  # 映射后的关键特征
         self.feature_mapping: Dict[str, str] = {}  # 原始特征到映射特征的映射关系
         self.nodes_features: Dict[str, List[str]] = {}
         self.feature_existence: Dict[str, Dict[str, Any]] = {}
-        self.coverage_report: Dict[str, Dict[str, Any]] = {}
+        # 特征到文件的倒排索引
+        self.feature_index: Optional[FeatureIndex] = None
+        # 覆盖率结果：每个 (特征, 文件) 一行的列式表
+        self.coverage_table = CoverageTable()
+        # 列画像：特征 -> 文件 -> 统计信息
+        self.column_profiles: Dict[str, Dict[str, Any]] = {}
         # 新增：存储缺失的关键特征
         self.missing_critical_features: List[str] = []
-        # 新增：存储存在的关键特征的覆盖率
-        self.critical_features_coverage: Dict[str, Dict[str, Any]] = {}
         # 新增：存储存在的关键特征
         self.existing_critical_features: List[str] = []
+        # 引用完整性检查结果
+        self.integrity_report: Dict[str, List[Dict[str, Any]]] = {}
+    
+    @property
+    def coverage_report(self) -> Dict[str, Dict[str, Any]]:
+        """Coverage as feature -> file -> {"coverage", "is_critical"}, built from the coverage table"""
+        return self.coverage_table.to_nested()
+    
+    @property
+    def critical_features_coverage(self) -> Dict[str, Dict[str, Any]]:
+        """Critical feature coverage as feature -> file -> {"coverage", "non_null_count", "total_count"}"""
+        return self.coverage_table.to_nested(critical_only=True)
+    
+    def _path_state(self, file_path: str) -> Optional[Tuple[str, int, int]]:
+        """Path, size and modification time of a file, or None if it does not exist"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return file_path, stat.st_size, stat.st_mtime_ns
+    
+    def _partials_state(self) -> Tuple[Optional[Tuple[str, int, int]], ...]:
+        """Stats of the partial results files being merged"""
+        return tuple(self._path_state(path) for path in self.partials)
+    
+    def _node_files_state(self) -> Any:
+        """Input state of the node files: the stats of the files in data_dir, the identity of the sources
+        and the critical features they are counted for, or the stats of the partial results files"""
+        if self.partials is not None:
+            return "partials", self._partials_state()
+        if self.sources is not None:
+            # In critical-only mode, the sources are counted for the critical features while their headers are read
+            critical = None
+            if self.critical_only:
+                self.extract_critical_features()
+                critical = self.stage_graph.version("extract_critical_features")
+            return "sources", id(self.sources), self.shard, self.critical_only, critical
+        return tuple(self._path_state(file_path) for file_path in self._node_file_paths())
+    
+    def _in_shard(self, file_name: str) -> bool:
+        """Check whether a node file or source belongs to the shard of this analyzer"""
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return shard_of(file_name, count) == index
+    
+    def _node_file_paths(self) -> List[str]:
+        """Paths of the node files in data_dir that belong to the shard of this analyzer"""
+        return [file_path for file_path in list_node_files(self.data_dir)
+                if self._in_shard(os.path.basename(file_path))]
+    
+    def invalidate(self, stage_name: Optional[str] = None) -> None:
+        """
+        Drop memoized stage results, e.g. after changing analyzer options
+        
+        Results are also recomputed automatically when the critical data file
+        or the node files change.
+        
+        Parameters:
+            stage_name: Name of the stage method; all stages if None
+        """
+        self.stage_graph.invalidate(stage_name)
     
+    @stage(state=lambda self: self._path_state(self.critical_data_path) if self.partials is None
+           else self._partials_state())
+    @instrumented
     def extract_critical_features(self) -> Tuple[List[str], List[str], Dict[str, str]]:
         """
         Extract critical feature names from the critical_data_v2.csv file
@@ -64,33 +489,58 @@ class DataFeatureAnalyzer:
         """
         try:
             logger.info(f"Extracting critical features from {self.critical_data_path}...")
-            df = pd.read_csv(self.critical_data_path, low_memory=False)
-            
-            # Filter rows where column 4 (index 3) is marked as "Critical"
-            critical_rows = df[df.iloc[:, 3] == "Critical"]
-            
-            # Get names from column 1 (index 0) for the corresponding rows
-            self.critical_features = critical_rows.iloc[:, 0].tolist()
-            
-            # Get mapped feature names from 'property' column (index 10)
-            property_values = critical_rows.iloc[:, 10].tolist()
             
-            # Create mapping dictionary
-            self.feature_mapping = {}
-            for i, feature in enumerate(self.critical_features):
-                if isinstance(feature, str) and feature.strip():
-                    property_value = property_values[i]
-                    if isinstance(property_value, str) and property_value.strip():
-                        self.feature_mapping[feature] = property_value
-                    else:
-                        # If no mapping, use original feature name
-                        self.feature_mapping[feature] = feature
-            
-            # Get unique mapped feature names
-            self.mapped_critical_features = list(set(self.feature_mapping.values()))
+            merged = self.load_partials() if self.partials is not None else None
+            cached = self._cached_stats(self.critical_data_path) if merged is None else None
+            if merged is not None:
+                logger.info("Using the critical features of the merged shards")
+                self.critical_features = merged["critical_features"]
+                self.feature_mapping = merged["feature_mapping"]
+            elif cached is not None:
+                logger.info("Using cached critical features")
+                self.critical_features = cached["critical_features"]
+                self.feature_mapping = cached["feature_mapping"]
+            else:
+                # Read the file once for both parsing and the stats cache hash
+                with open(self.critical_data_path, 'rb') as f:
+                    content = f.read()
+                df = pd.read_csv(io.BytesIO(content), low_memory=False)
+                self.metrics.add_io(len(content), len(df))
+                
+                # Filter rows where column 4 (index 3) is marked as "Critical"
+                critical_rows = df[df.iloc[:, 3] == "Critical"]
+                
+                # Get names from column 1 (index 0) for the corresponding rows
+                self.critical_features = critical_rows.iloc[:, 0].tolist()
+                
+                # Get mapped feature names from 'property' column (index 10)
+                property_values = critical_rows.iloc[:, 10].tolist()
+                
+                # Create mapping dictionary
+                self.feature_mapping = {}
+                for i, feature in enumerate(self.critical_features):
+                    if isinstance(feature, str) and feature.strip():
+                        property_value = property_values[i]
+                        if isinstance(property_value, str) and property_value.strip():
+                            self.feature_mapping[feature] = property_value
+                        else:
+                            # If no mapping, use original feature name
+                            self.feature_mapping[feature] = feature
+                
+                # Remove possible empty values
+                self.critical_features = [f for f in self.critical_features if isinstance(f, str) and f.strip()]
+                
+                if self.stats_cache is not None:
+                    file_hash = new_digest()
+                    file_hash.update(content)
+                    self.stats_cache.put(self.critical_data_path, {
+                        "critical_features": self.critical_features,
+                        "feature_mapping": self.feature_mapping
+                    }, file_hash.hexdigest())
+                    self.stats_cache.save()
             
-            # Remove possible empty values
-            self.critical_features = [f for f in self.critical_features if isinstance(f, str) and f.strip()]
+            # Get unique mapped feature names, in the order of the critical data file so every process agrees
+            self.mapped_critical_features = list(dict.fromkeys(self.feature_mapping.values()))
             self.mapped_critical_features = [f for f in self.mapped_critical_features if isinstance(f, str) and f.strip()]
             
             logger.info(f"Successfully extracted {len(self.critical_features)} original critical features")
@@ -102,31 +552,67 @@ class DataFeatureAnalyzer:
             logger.error(f"Error extracting critical features: {str(e)}")
             return [], [], {}
     
+    @stage(state=lambda self: self._node_files_state())
+    @instrumented
     def get_nodes_features(self) -> Dict[str, List[str]]:
         """
         Extract feature information from tsv files in the data directory
         
+        Plain .tsv files and .tsv.gz/.tsv.zst compressed files are included.
+        With streaming sources, the sources are read instead, see _scan_sources
+        (in critical-only mode, they are counted for the critical features, and
+        the stage runs again when those change);
+        with partial results, the headers of the merged shards are used.
+        Only the files of the analyzer's shard are included.
+        
         Returns:
             Feature mapping table classified by file name
         """
+        self.nodes_features = {}
+        if self.sources is not None:
+            return self._scan_sources()
+        if self.partials is not None:
+            return self._load_partial_files()
+        
         try:
             logger.info(f"Scanning tsv files in {self.data_dir} directory...")
-            tsv_files = glob.glob(os.path.join(self.data_dir, "*.tsv"))
+            tsv_files = self._node_file_paths()
+            headers: Dict[str, List[str]] = {}
             
+            # Reuse the headers of unchanged files from the stats cache
+            pending_files = []
             for tsv_file in tsv_files:
-                file_name = os.path.basename(tsv_file)
-                logger.info(f"Processing file: {file_name}")
-                
-                try:
-                    # Read the first line of the TSV file to get column names
-                    with open(tsv_file, 'r', encoding='utf-8') as f:
-                        header = f.readline().strip().split('\t')
-                    
-                    # Store column names
-                    self.nodes_features[file_name] = header
+                cached = self._cached_stats(tsv_file)
+                if cached is not None:
+                    headers[tsv_file] = cached["header"]
+                else:
+                    pending_files.append(tsv_file)
+            
+            if self.workers > 1:
+                # Read headers in a process pool
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    futures = [(tsv_file, executor.submit(read_header, tsv_file)) for tsv_file in pending_files]
+                    for tsv_file, future in futures:
+                        try:
+                            headers[tsv_file] = future.result()
+                        except Exception as e:
+                            logger.error(f"Error processing file {os.path.basename(tsv_file)}: {str(e)}")
+            else:
+                for tsv_file in pending_files:
+                    file_name = os.path.basename(tsv_file)
+                    logger.info(f"Processing file: {file_name}")
                     
-                except Exception as e:
-                    logger.error(f"Error processing file {file_name}: {str(e)}")
+                    try:
+                        # Read the first line of the TSV file to get column names
+                        headers[tsv_file] = read_header(tsv_file)
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing file {file_name}: {str(e)}")
+            
+            # Store column names in the glob order
+            for tsv_file in tsv_files:
+                if tsv_file in headers:
+                    self.nodes_features[os.path.basename(tsv_file)] = headers[tsv_file]
             
             logger.info(f"Successfully processed {len(self.nodes_features)} tsv files")
             return self.nodes_features
@@ -135,6 +621,118 @@ class DataFeatureAnalyzer:
             logger.error(f"Error getting node features: {str(e)}")
             return {}
     
+    def _scan_sources(self) -> Dict[str, List[str]]:
+        """
+        Read the headers and non-null counts of the streaming sources, several at a time
+        
+        Each source is read once: its header is logged as soon as it arrives,
+        and its rows are counted in the same pass. Up to `workers` sources are
+        read concurrently in threads. Sources are read again when the scan is
+        repeated, e.g. after the critical features changed in critical-only
+        mode, so file-like objects and iterators, which can only be read once,
+        raise a ValueError then instead of coming back empty.
+        
+        Returns:
+            Feature mapping table classified by source name
+        """
+        names = [name for name in self.sources if self._in_shard(name)]
+        exhausted = [name for name in names if name in self.read_sources and not reusable_source(self.sources[name])]
+        if exhausted:
+            raise ValueError(f"Sources {', '.join(exhausted)} were already read and cannot be read again; "
+                             f"pass callables opening them instead")
+        
+        try:
+            logger.info(f"Reading {len(self.sources)} streaming sources with {self.workers} workers...")
+            self.source_counts = {}
+            if self.critical_only:
+                self.extract_critical_features()
+            critical_set = set(self.mapped_critical_features)
+            usecols = list(critical_set) if self.critical_only else None
+            
+            def scan(name: str, source: NodeSource) -> Tuple[List[str], Optional[FileCounts], int, float, float]:
+                start_wall = time.perf_counter()
+                start_cpu = time.thread_time()
+                stream = open_source(source)
+                
+                def on_header(columns: List[str]) -> bool:
+                    logger.info(f"Header of {name} received: {len(columns)} columns")
+                    # In critical-only mode, sources without critical features are not counted
+                    return not self.critical_only or any(column in critical_set for column in columns)
+                
+                try:
+                    columns, counts = count_non_null_stream(stream, self.chunk_size, usecols, self._sentinels(),
+                                                            on_header)
+                finally:
+                    stream.close()
+                return (columns, counts, stream.bytes_read, time.perf_counter() - start_wall,
+                        time.thread_time() - start_cpu)
+            
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [(name, executor.submit(scan, name, self.sources[name])) for name in names]
+                self.read_sources.update(names)
+                # Store column names in the source order
+                for name, future in futures:
+                    try:
+                        columns, counts, bytes_read, wall_seconds, cpu_seconds = future.result()
+                        if not columns:
+                            logger.warning(f"Source {name} is empty, skipping it")
+                            continue
+                        self.nodes_features[name] = columns
+                        rows = 0
+                        if counts is not None:
+                            self.source_counts[name] = counts
+                            rows = counts[1]
+                        self.metrics.record_file(name, bytes_read, rows, wall_seconds, cpu_seconds)
+                    except Exception as e:
+                        logger.error(f"Error reading source {name}: {str(e)}")
+            
+            logger.info(f"Successfully processed {len(self.nodes_features)} sources")
+            return self.nodes_features
+            
+        except Exception as e:
+            logger.error(f"Error reading sources: {str(e)}")
+            return {}
+    
+    @stage(state=lambda self: self._partials_state())
+    def load_partials(self) -> Dict[str, Any]:
+        """
+        Load and merge the partial results files of sharded runs
+        
+        The merged runs' options (critical-only, column profiling, sentinel
+        values) are adopted, so the reports match those of a single run.
+        
+        Returns:
+            Merged partial results, see shards.merge_partials
+        """
+        merged = merge_partials(self.partials)
+        self.critical_only = merged["options"]["critical_only"]
+        self.profile_columns = merged["options"]["profile_columns"]
+        self.sentinel_values = tuple(merged["options"]["sentinel_values"])
+        return merged
+    
+    def _load_partial_files(self) -> Dict[str, List[str]]:
+        """
+        Read the headers and non-null counts of the merged shards
+        
+        Returns:
+            Feature mapping table classified by file name, in the order of an unsharded run
+        """
+        try:
+            self.source_counts = {}
+            for info in self.load_partials()["files"]:
+                self.nodes_features[info["name"]] = info["header"]
+                if info["non_null_counts"] is not None:
+                    self.source_counts[info["name"]] = (info["non_null_counts"], info["total_count"], None)
+            
+            logger.info(f"Successfully merged {len(self.nodes_features)} files from {len(self.partials)} shards")
+            return self.nodes_features
+            
+        except Exception as e:
+            logger.error(f"Error merging partial results: {str(e)}")
+            return {}
+    
+    @stage("extract_critical_features", "build_feature_index")
+    @instrumented
     def analyze_feature_existence(self) -> Dict[str, Dict[str, Any]]:
         """
         Analyze whether mapped critical features exist in node features
@@ -145,29 +743,20 @@ class DataFeatureAnalyzer:
         try:
             logger.info("Analyzing feature existence...")
             
-            # Ensure critical features and node features have been extracted
-            if not self.mapped_critical_features:
-                self.extract_critical_features()
-            
-            if not self.nodes_features:
-                self.get_nodes_features()
-            
             # 重置缺失的关键特征列表和存在的关键特征列表
+            self.feature_existence = {}
             self.missing_critical_features = []
             self.existing_critical_features = []
             
-            # Analyze whether each mapped critical feature exists in node features
+            # Look up each mapped critical feature in the inverted feature index
+            feature_index = self.build_feature_index()
             for feature in self.mapped_critical_features:
+                files = feature_index.files_for(feature)
                 self.feature_existence[feature] = {
-                    "exists": "n",
-                    "files": []
+                    "exists": "y" if files else "n",
+                    "files": files
                 }
                 
-                for file_name, features in self.nodes_features.items():
-                    if feature in features:
-                        self.feature_existence[feature]["exists"] = "y"
-                        self.feature_existence[feature]["files"].append(file_name)
-                
                 # 如果特征不存在于任何文件中，添加到缺失列表
                 if self.feature_existence[feature]["exists"] == "n":
                     self.missing_critical_features.append(feature)
@@ -181,92 +770,358 @@ class DataFeatureAnalyzer:
             logger.error(f"Error analyzing feature existence: {str(e)}")
             return {}
     
-    def calculate_coverage(self) -> Dict[str, Dict[str, Any]]:
+    @stage("get_nodes_features")
+    @instrumented
+    def check_referential_integrity(self, bloom: bool = False, bloom_error_rate: float = 0.001) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Check link columns between node files for dangling references and duplicate submitter_ids
+        
+        Parameters:
+            bloom: Use Bloom filters instead of exact key sets, for very large releases
+            bloom_error_rate: Target false positive rate of the Bloom filters of each key set
+            
+        Returns:
+            Referential integrity report with dangling, duplicate and unchecked entries
+        """
+        try:
+            logger.info("Checking referential integrity...")
+            
+            if self.sources is not None or self.partials is not None:
+                logger.warning("The referential integrity check reads node files and is not available for "
+                               "streaming sources or merged shards")
+                return {}
+            
+            checker = ReferentialIntegrityChecker(bloom=bloom, bloom_error_rate=bloom_error_rate,
+                                                  chunk_size=self.chunk_size)
+            for file_name in self.nodes_features:
+                file_path = os.path.join(self.data_dir, file_name)
+                try:
+                    rows_before = sum(checker.row_counts.values())
+                    _, wall_seconds, cpu_seconds, peak_rss = timed_call(checker.add_file, file_path)
+                    self.metrics.record_file(file_name, os.path.getsize(file_path),
+                                             sum(checker.row_counts.values()) - rows_before,
+                                             wall_seconds, cpu_seconds, peak_rss)
+                except Exception as e:
+                    logger.error(f"Error checking referential integrity for file {file_name}: {str(e)}")
+            
+            self.integrity_report = checker.report()
+            logger.info(f"Referential integrity check completed. Found {len(self.integrity_report['dangling'])} "
+                        f"dangling references and {len(self.integrity_report['duplicates'])} duplicate submitter_ids")
+            return self.integrity_report
+            
+        except Exception as e:
+            logger.error(f"Error checking referential integrity: {str(e)}")
+            return {}
+    
+    @stage("get_nodes_features")
+    def build_feature_index(self) -> FeatureIndex:
+        """
+        Build the inverted feature index from the node features
+        
+        Returns:
+            Index from feature names to the files that contain them
+        """
+        self.feature_index = FeatureIndex.from_nodes_features(self.nodes_features)
+        return self.feature_index
+    
+    def find_feature(self, feature: str) -> List[str]:
+        """
+        Find the node files whose header contains a feature
+        
+        Parameters:
+            feature: Feature name, e.g. a Gen3 property
+            
+        Returns:
+            List of file names
+        """
+        return self.build_feature_index().files_for(feature)
+    
+    @stage("extract_critical_features", "get_nodes_features",
+           state=lambda self: (self.critical_only, self.profile_columns, self.sentinel_values))
+    @instrumented
+    def calculate_coverage(self) -> CoverageTable:
         """
         Calculate the data coverage of each feature in the original tsv files
         
         Returns:
-            Feature coverage statistical report
+            Coverage table with one row per (feature, file) pair
         """
         try:
             logger.info("Calculating feature coverage...")
             
-            # Ensure critical features and node features have been extracted
-            if not self.mapped_critical_features:
-                self.extract_critical_features()
+            # 重置覆盖率结果，避免多次调用时累积
+            self.coverage_table = CoverageTable()
+            self.column_profiles = {}
             
-            if not self.nodes_features:
-                self.get_nodes_features()
+            # In critical-only mode, parse just the critical columns and skip files without any
+            critical_set = set(self.mapped_critical_features)
+            file_columns: Dict[str, Optional[List[str]]] = {}
+            for file_name, features in self.nodes_features.items():
+                if self.critical_only:
+                    columns = [feature for feature in features if feature in critical_set]
+                    if columns:
+                        file_columns[file_name] = columns
+                else:
+                    file_columns[file_name] = None
             
-            # 重置关键特征覆盖率字典
-            self.critical_features_coverage = {}
+            if self.critical_only:
+                logger.info(f"Critical-only mode: parsing {len(file_columns)} of {len(self.nodes_features)} files")
             
-            # Calculate coverage for each feature in each file
-            for file_name, features in self.nodes_features.items():
+            # Reuse the counts (and column profile summaries) of unchanged files from the stats cache
+            # Streaming sources were already counted while their headers were read,
+            # and merged shards carry their counts
+            file_counts: Dict[str, FileCounts] = {}
+            cached_profiles: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            pending_files = []
+            for file_name, columns in file_columns.items():
+                if file_name in self.source_counts:
+                    file_counts[file_name] = self.source_counts[file_name]
+                    continue
+                if self.sources is not None or self.partials is not None:
+                    continue
+                cached = self._cached_stats(os.path.join(self.data_dir, file_name))
+                if cached is not None and self._covers_columns(cached, columns) and \
+                        (not self.profile_columns or self._covers_profiles(cached, columns)):
+                    file_counts[file_name] = (cached["non_null_counts"], cached["total_count"], None)
+                    if self.profile_columns:
+                        cached_profiles[file_name] = cached["profiles"]
+                else:
+                    pending_files.append(file_name)
+            
+            # Count non-null values for new or changed files, in parallel if workers are configured
+            if self.workers > 1:
+                new_counts, file_hashes = self._count_files_parallel(pending_files, file_columns)
+            else:
+                new_counts, file_hashes = self._count_files(pending_files, file_columns)
+            file_counts.update(new_counts)
+            
+            # Calculate coverage for each feature in each file as one columnar table
+            counted_files = [
+                (file_name, file_columns[file_name] or features, file_counts[file_name][0],
+                 file_counts[file_name][1])
+                for file_name, features in self.nodes_features.items() if file_name in file_counts
+            ]
+            self.coverage_table = CoverageTable.from_counts(counted_files, critical_set)
+            
+            # Summarize column profiles of the counted columns; merged shards and cached files carry their summaries
+            merged_profiles = self.load_partials()["column_profiles"] if self.partials is not None else {}
+            for file_name, features, non_null_counts, total_count in counted_files:
+                profiles = file_counts[file_name][2]
+                for feature in features:
+                    if file_name in merged_profiles.get(feature, {}):
+                        self.column_profiles.setdefault(feature, {})[file_name] = merged_profiles[feature][file_name]
+                    elif feature in cached_profiles.get(file_name, {}):
+                        self.column_profiles.setdefault(feature, {})[file_name] = cached_profiles[file_name][feature]
+                    elif profiles is not None and feature in non_null_counts and feature in profiles:
+                        self.column_profiles.setdefault(feature, {})[file_name] = \
+                            profiles[feature].summary(non_null_counts[feature], total_count)
+            
+            if self.stats_cache is not None:
+                for file_name, (non_null_counts, total_count, profiles) in new_counts.items():
+                    stats = {
+                        "header": self.nodes_features[file_name],
+                        "non_null_counts": non_null_counts,
+                        "total_count": total_count,
+                        "partial": file_columns[file_name] is not None
+                    }
+                    if profiles is not None:
+                        # Profile summaries are only reused with the same placeholder values
+                        stats["sentinel_values"] = list(self.sentinel_values)
+                        stats["profiles"] = {feature: self.column_profiles[feature][file_name]
+                                             for feature in non_null_counts
+                                             if file_name in self.column_profiles.get(feature, {})}
+                    self.stats_cache.put(os.path.join(self.data_dir, file_name), stats,
+                                         *file_hashes.get(file_name, (None, None)))
+                self.stats_cache.save()
+            
+            logger.info(f"Feature coverage calculation completed: {len(self.coverage_table)} (feature, file) pairs")
+            return self.coverage_table
+            
+        except Exception as e:
+            logger.error(f"Error calculating coverage: {str(e)}")
+            return CoverageTable()
+    
+    def _cached_stats(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached statistics of a file if caching is enabled and the file is unchanged
+        
+        Parameters:
+            file_path: Path to the file
+            
+        Returns:
+            Cached statistics, or None
+        """
+        if self.stats_cache is None:
+            return None
+        return self.stats_cache.get(file_path)
+    
+    @staticmethod
+    def _covers_columns(cached: Dict[str, Any], columns: Optional[List[str]]) -> bool:
+        """
+        Check whether cached counts include the requested columns
+        
+        Parameters:
+            cached: Cached statistics of a file
+            columns: Requested column names, or None for all columns
+            
+        Returns:
+            True if the cached counts can be reused
+        """
+        if columns is None:
+            return not cached.get("partial", False)
+        return all(column in cached["non_null_counts"] for column in columns)
+    
+    def _covers_profiles(self, cached: Dict[str, Any], columns: Optional[List[str]]) -> bool:
+        """
+        Check whether cached statistics include the column profiles of the requested columns
+        
+        Parameters:
+            cached: Cached statistics of a file
+            columns: Requested column names, or None for all columns
+            
+        Returns:
+            True if the cached profile summaries can be reused
+        """
+        if cached.get("sentinel_values") != list(self.sentinel_values) or "profiles" not in cached:
+            return False
+        return all(column in cached["profiles"] for column in (columns or cached["non_null_counts"]))
+    
+    def _sentinels(self) -> Optional[Tuple[str, ...]]:
+        """Placeholder values passed to the counting functions, or None if not profiling"""
+        return self.sentinel_values if self.profile_columns else None
+    
+    def _count_files(self, file_names: List[str], file_columns: Dict[str, Optional[List[str]]]
+                     ) -> Tuple[Dict[str, FileCounts], Dict[str, Tuple[str, Optional[List[int]]]]]:
+        """
+        Count non-null values for the given node files, one file at a time
+        
+        With the stats cache enabled, each file is hashed in the same pass.
+        
+        Parameters:
+            file_names: Names of the files in the data directory
+            file_columns: Columns to parse per file, or None for all columns
+            
+        Returns:
+            Tuple containing:
+            - Dictionary mapping file names to (non_null_counts, total_count, profiles)
+            - Dictionary mapping file names to (content hash, hash range boundaries), if hashed
+        """
+        file_counts = {}
+        file_hashes = {}
+        for file_name in file_names:
+            file_path = os.path.join(self.data_dir, file_name)
+            try:
+                # Stream the TSV file in chunks and keep running counters per column
+                if self.stats_cache is not None:
+                    (counts, file_hash), wall_seconds, cpu_seconds, peak_rss = timed_call(
+                        count_and_hash, file_path, self.chunk_size, file_columns[file_name], self._sentinels())
+                    file_hashes[file_name] = (file_hash, None)
+                else:
+                    counts, wall_seconds, cpu_seconds, peak_rss = timed_call(
+                        count_non_null, file_path, self.chunk_size, file_columns[file_name], self._sentinels())
+                file_counts[file_name] = counts
+                self.metrics.record_file(file_name, os.path.getsize(file_path), counts[1], wall_seconds, cpu_seconds,
+                                         peak_rss)
+            except Exception as e:
+                logger.error(f"Error calculating coverage for file {file_name}: {str(e)}")
+        return file_counts, file_hashes
+    
+    def _count_files_parallel(self, file_names: List[str], file_columns: Dict[str, Optional[List[str]]]
+                              ) -> Tuple[Dict[str, FileCounts], Dict[str, Tuple[str, Optional[List[int]]]]]:
+        """
+        Count non-null values for the given node files in a process pool
+        
+        Files larger than split_size are split into byte ranges on line
+        boundaries and the partial counts are merged per file, unless columns
+        are profiled. With the stats
+        cache enabled, every worker hashes the bytes it reads, and the range
+        hashes of a split file are combined.
+        
+        Parameters:
+            file_names: Names of the files in the data directory
+            file_columns: Columns to parse per file, or None for all columns
+            
+        Returns:
+            Tuple containing:
+            - Dictionary mapping file names to (non_null_counts, total_count, profiles)
+            - Dictionary mapping file names to (content hash, hash range boundaries), if hashed
+        """
+        file_counts = {}
+        file_hashes = {}
+        # Header bytes of split files, hashed as the first range: file name -> (hash, boundaries)
+        split_hashes: Dict[str, Tuple[str, List[int]]] = {}
+        hashing = self.stats_cache is not None
+        sentinels = self._sentinels()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures: Dict[str, list] = {}
+            for file_name in file_names:
                 file_path = os.path.join(self.data_dir, file_name)
-                
+                usecols = file_columns[file_name]
                 try:
-                    # Read TSV file
-                    df = pd.read_csv(file_path, sep='\t', low_memory=False)
-                    
-                    # Calculate the proportion of non-null values for each column
-                    for feature in features:
-                        if feature not in self.coverage_report:
-                            self.coverage_report[feature] = {}
-                        
-                        if feature in df.columns:
-                            non_null_count = df[feature].count()
-                            total_count = len(df)
-                            coverage = non_null_count / total_count if total_count > 0 else 0
-                            
-                            self.coverage_report[feature][file_name] = {
-                                "coverage": coverage,
-                                "is_critical": feature in self.mapped_critical_features
-                            }
-                            
-                            # 如果是关键特征，添加到关键特征覆盖率字典
-                            if feature in self.mapped_critical_features:
-                                if feature not in self.critical_features_coverage:
-                                    self.critical_features_coverage[feature] = {}
-                                
-                                self.critical_features_coverage[feature][file_name] = {
-                                    "coverage": coverage,
-                                    "non_null_count": non_null_count,
-                                    "total_count": total_count
-                                }
-                
+                    # Profiled files are read in one pass, so their top values do not depend on the split
+                    splittable = not is_compressed(file_path) and os.path.getsize(file_path) > self.split_size
+                    if splittable and self.profile_columns:
+                        logger.info(f"Not splitting {file_name}: column profiles are computed in a single pass")
+                    if splittable and not self.profile_columns:
+                        columns = list(pd.read_csv(file_path, sep='\t', nrows=0).columns)
+                        ranges = split_byte_ranges(file_path, self.split_size)
+                        logger.info(f"Splitting {file_name} into {len(ranges)} byte ranges")
+                        futures[file_name] = [
+                            executor.submit(timed_call, count_and_hash_range if hashing else count_non_null_range,
+                                            file_path, columns, start, end, self.chunk_size, usecols, sentinels)
+                            for start, end in ranges
+                        ]
+                        if not ranges:
+                            selected = columns if usecols is None else [c for c in columns if c in set(usecols)]
+                            file_counts[file_name] = ({column: 0 for column in selected}, 0, None)
+                        elif hashing:
+                            split_hashes[file_name] = (range_hash(file_path, 0, ranges[0][0]),
+                                                       [0] + [start for start, _ in ranges] + [ranges[-1][1]])
+                    else:
+                        futures[file_name] = [executor.submit(timed_call, count_and_hash if hashing else count_non_null,
+                                                              file_path, self.chunk_size, usecols, sentinels)]
                 except Exception as e:
                     logger.error(f"Error calculating coverage for file {file_name}: {str(e)}")
             
-            logger.info("Feature coverage calculation completed")
-            return self.coverage_report
-            
-        except Exception as e:
-            logger.error(f"Error calculating coverage: {str(e)}")
-            return {}
+            for file_name, file_futures in futures.items():
+                if not file_futures:
+                    continue
+                try:
+                    results = [future.result() for future in file_futures]
+                    if hashing:
+                        range_hashes = [file_hash for (_, file_hash), _, _, _ in results]
+                        results = [(counts, wall, cpu, peak) for (counts, _), wall, cpu, peak in results]
+                        if file_name in split_hashes:
+                            header_hash, boundaries = split_hashes[file_name]
+                            file_hashes[file_name] = (combine_hashes([header_hash] + range_hashes), boundaries)
+                        else:
+                            file_hashes[file_name] = (range_hashes[0], None)
+                    file_counts[file_name] = merge_counts([counts for counts, _, _, _ in results])
+                    peaks = [peak for _, _, _, peak in results if peak is not None]
+                    self.metrics.record_file(file_name, os.path.getsize(os.path.join(self.data_dir, file_name)),
+                                             file_counts[file_name][1],
+                                             sum(wall for _, wall, _, _ in results),
+                                             sum(cpu for _, _, cpu, _ in results),
+                                             max(peaks) if peaks else None)
+                except Exception as e:
+                    logger.error(f"Error calculating coverage for file {file_name}: {str(e)}")
+        return file_counts, file_hashes
     
-    def generate_reports(self, output_dir: str = ".") -> None:
+    @instrumented
+    def generate_reports(self, output_dir: str = ".", columnar_format: Optional[str] = None) -> None:
         """
         Generate analysis reports
         
         Parameters:
             output_dir: Output directory path
+            columnar_format: Also write the coverage table as "parquet" or "arrow" (requires pyarrow)
         """
         try:
             logger.info("Generating analysis reports...")
             
-            # Ensure all analyses have been completed
-            if not self.mapped_critical_features:
-                self.extract_critical_features()
-            
-            if not self.nodes_features:
-                self.get_nodes_features()
-            
-            if not self.feature_existence:
-                self.analyze_feature_existence()
-            
-            if not self.coverage_report:
-                self.calculate_coverage()
+            # Ensure all analyses have been completed; memoized stages do not run again
+            self.analyze_feature_existence()
+            self.calculate_coverage()
             
             # Generate critical feature list report
             critical_features_path = os.path.join(output_dir, "critical_features.csv")
@@ -294,18 +1149,7 @@ class DataFeatureAnalyzer:
                     writer.writerow([feature, info["exists"], ", ".join(info["files"])])
             
             # Generate feature coverage statistical report
-            coverage_path = os.path.join(output_dir, "feature_coverage.csv")
-            with open(coverage_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Feature Name", "File Name", "Coverage", "Is Critical Feature"])
-                for feature, file_info in self.coverage_report.items():
-                    for file_name, info in file_info.items():
-                        writer.writerow([
-                            feature,
-                            file_name,
-                            f"{info['coverage']:.2%}",
-                            "Yes" if info["is_critical"] else "No"
-                        ])
+            self.coverage_table.write_coverage_csv(os.path.join(output_dir, "feature_coverage.csv"))
             
             # 新增：生成缺失的关键特征报告
             missing_critical_path = os.path.join(output_dir, "missing_critical_features.csv")
@@ -316,72 +1160,142 @@ class DataFeatureAnalyzer:
                     writer.writerow([feature])
             
             # 新增：生成存在的关键特征覆盖率报告
-            critical_coverage_path = os.path.join(output_dir, "critical_features_coverage.csv")
-            with open(critical_coverage_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Critical Feature", "File Name", "Coverage", "Non-Null Count", "Total Count"])
-                for feature, file_info in self.critical_features_coverage.items():
-                    for file_name, info in file_info.items():
-                        writer.writerow([
-                            feature,
-                            file_name,
-                            f"{info['coverage']:.2%}",
-                            info["non_null_count"],
-                            info["total_count"]
-                        ])
+            self.coverage_table.write_critical_csv(os.path.join(output_dir, "critical_features_coverage.csv"))
+            
+            # Write the coverage table in a columnar format for dashboards
+            if columnar_format:
+                try:
+                    self.coverage_table.write_columnar(output_dir, columnar_format)
+                except ImportError as e:
+                    logger.error(str(e))
+            
+            # Generate referential integrity report when the check has been run
+            if self.integrity_report:
+                integrity_path = os.path.join(output_dir, "referential_integrity.csv")
+                with open(integrity_path, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(["Issue", "Node Type", "Column", "Target Node Type", "Value", "Count"])
+                    for info in self.integrity_report["dangling"]:
+                        writer.writerow(["dangling_reference", info["node_type"], info["column"], info["target"],
+                                         info["value"], info["count"]])
+                    for info in self.integrity_report["duplicates"]:
+                        writer.writerow(["duplicate_submitter_id", info["node_type"], "submitter_id", "",
+                                         info["value"], info["count"]])
+                    for info in self.integrity_report["unchecked"]:
+                        writer.writerow(["unchecked_link", info["node_type"], info["column"], "", "",
+                                         info["references"]])
+            
+            # Generate column profile report when profiling is enabled
+            if self.profile_columns:
+                profile_path = os.path.join(output_dir, "column_profile.csv")
+                with open(profile_path, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(["Feature Name", "File Name", "Distinct Count", "Top Values", "Min", "Max",
+                                     "Inferred Type", "Placeholder Share", "Effective Coverage"])
+                    for feature, file_info in self.column_profiles.items():
+                        for file_name, info in file_info.items():
+                            # Counts of high-cardinality columns are lower bounds
+                            bound = "" if info.get("top_values_exact", True) else ">="
+                            writer.writerow([
+                                feature,
+                                file_name,
+                                info["distinct_count"],
+                                "; ".join(f"{value} ({bound}{count})" for value, count in info["top_values"]),
+                                "" if info["min"] is None else info["min"],
+                                "" if info["max"] is None else info["max"],
+                                info["inferred_type"],
+                                f"{info['placeholder_share']:.2%}",
+                                f"{info['effective_coverage']:.2%}"
+                            ])
             
             logger.info(f"Analysis reports generated in {output_dir}")
             
         except Exception as e:
             logger.error(f"Error generating reports: {str(e)}")
     
+    def save_snapshot(self, path: str, release: Optional[str] = None) -> None:
+        """
+        Save a compact stats snapshot of this release for snapshot.py diff
+        
+        Parameters:
+            path: Snapshot JSON file path
+            release: Release label; inferred from the node file names if None
+        """
+        try:
+            save_snapshot(build_snapshot(self, release), path)
+        except Exception as e:
+            logger.error(f"Error saving snapshot: {str(e)}")
+    
+    def save_partial(self, path: str) -> None:
+        """
+        Save the mergeable partial results of this analyzer's shard
+        
+        Parameters:
+            path: Partial results JSON file path
+        """
+        try:
+            # Position of every file in an unsharded run, so the merge restores the report order
+            if self.sources is not None:
+                names = list(self.sources)
+            else:
+                names = [os.path.basename(file_path) for file_path in list_node_files(self.data_dir)]
+            save_partial(build_partial(self, {name: position for position, name in enumerate(names)}), path)
+        except Exception as e:
+            logger.error(f"Error saving partial results: {str(e)}")
+    
+    def summary(self) -> Dict[str, int]:
+        """
+        Count the summary figures of the analysis results
+        
+        Returns:
+            Dictionary with the numbers printed by print_summary
+        """
+        # Ensure all analyses have been completed; memoized stages do not run again
+        self.analyze_feature_existence()
+        self.calculate_coverage()
+        
+        # Get all unique features from all files
+        all_features = set()
+        for file_name, features in self.nodes_features.items():
+            all_features.update(features)
+        
+        return {
+            "critical_features": len(self.critical_features),
+            "mapped_critical_features": len(self.mapped_critical_features),
+            "total_features": len(all_features),
+            "missing_critical_features": len(self.missing_critical_features),
+            "existing_critical_features": len(self.existing_critical_features),
+            # Critical features whose average coverage across files reaches the threshold
+            "features_above_threshold": self.coverage_table.count_above(self.coverage_threshold)
+        }
+    
+    def input_state(self) -> Any:
+        """
+        Get the stats of the critical data file and node files, which change whenever an input file changes
+        
+        Returns:
+            Comparable input state
+        """
+        return self._path_state(self.critical_data_path), self._node_files_state()
+    
     def print_summary(self) -> None:
         """
         Print a summary of the analysis results to the console
         """
         try:
-            # Ensure all analyses have been completed
-            if not self.mapped_critical_features:
-                self.extract_critical_features()
-            
-            if not self.nodes_features:
-                self.get_nodes_features()
-            
-            if not self.feature_existence:
-                self.analyze_feature_existence()
-            
-            if not self.coverage_report:
-                self.calculate_coverage()
-            
-            # Count features with coverage above threshold
-            features_above_threshold = 0
-            for feature, file_info in self.critical_features_coverage.items():
-                # Calculate average coverage across all files for this feature
-                total_coverage = 0
-                file_count = 0
-                for file_name, info in file_info.items():
-                    total_coverage += info["coverage"]
-                    file_count += 1
-                
-                avg_coverage = total_coverage / file_count if file_count > 0 else 0
-                if avg_coverage >= self.coverage_threshold:
-                    features_above_threshold += 1
-            
-            # Get all unique features from all files
-            all_features = set()
-            for file_name, features in self.nodes_features.items():
-                all_features.update(features)
+            summary = self.summary()
             
             # Print summary
             print("\n" + "="*80)
             print("DATA FEATURE ANALYSIS SUMMARY")
             print("="*80)
-            print(f"1. Original critical features extracted: {len(self.critical_features)}")
-            print(f"2. Unique mapped critical features: {len(self.mapped_critical_features)}")
-            print(f"3. Total features in data files: {len(all_features)}")
-            print(f"4. Critical features missing from data: {len(self.missing_critical_features)}")
-            print(f"5. Critical features present in data: {len(self.existing_critical_features)}")
-            print(f"6. Critical features with coverage >= {self.coverage_threshold:.2%}: {features_above_threshold}")
+            print(f"1. Original critical features extracted: {summary['critical_features']}")
+            print(f"2. Unique mapped critical features: {summary['mapped_critical_features']}")
+            print(f"3. Total features in data files: {summary['total_features']}")
+            print(f"4. Critical features missing from data: {summary['missing_critical_features']}")
+            print(f"5. Critical features present in data: {summary['existing_critical_features']}")
+            print(f"6. Critical features with coverage >= {self.coverage_threshold:.2%}: "
+                  f"{summary['features_above_threshold']}")
             print("="*80 + "\n")
             
         except Exception as e:
@@ -395,17 +1309,98 @@ if __name__ == "__main__":
     parser.add_argument("--data-dir", default="data", help="Path to the directory containing TSV files")
     parser.add_argument("--threshold", type=float, default=0.8, help="Coverage threshold (0.0-1.0)")
     parser.add_argument("--output-dir", default=".", help="Output directory for reports")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Number of rows read at a time when calculating coverage")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes used to scan files")
+    parser.add_argument("--split-mb", type=float, default=DEFAULT_SPLIT_SIZE // (1024 * 1024),
+                        help="With --workers, files larger than this many MB are split and counted in parallel")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory of the persistent stats cache; unchanged files are not rescanned")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Maximum number of files kept in the stats cache")
+    parser.add_argument("--critical-only", action="store_true",
+                        help="Only parse the columns that match mapped critical features")
+    parser.add_argument("--index-out", default=None,
+                        help="Write the feature-to-files index to this JSON file")
+    parser.add_argument("--column-profile", action="store_true",
+                        help="Profile every column (distinct count, top values, min/max, type, placeholders)")
+    parser.add_argument("--sentinel", action="append", default=None,
+                        help="Placeholder value treated as missing when profiling (repeatable, replaces the defaults)")
+    parser.add_argument("--check-integrity", action="store_true",
+                        help="Check link columns for dangling references and duplicate submitter_ids")
+    parser.add_argument("--bloom", action="store_true",
+                        help="Use Bloom filters for the integrity check key sets")
+    parser.add_argument("--bloom-error-rate", type=float, default=0.001,
+                        help="Target false positive rate of the Bloom filters of each key set")
+    parser.add_argument("--metrics-out", default=None,
+                        help="Write per-stage and per-file metrics to this file (.prom/.txt for Prometheus text, else JSON)")
+    parser.add_argument("--profile", nargs="?", const="calculate_coverage", default=None,
+                        help="Run a stage under cProfile (default stage: calculate_coverage); stats go to the output directory")
+    parser.add_argument("--commons-url", default=None,
+                        help="Stream the node exports of --program/--project from this Gen3 commons instead of reading --data-dir")
+    parser.add_argument("--credentials", default=None, help="Gen3 credentials file (JSON format) for --commons-url")
+    parser.add_argument("--program", default=None, help="Program of the streamed project")
+    parser.add_argument("--project", default=None, help="Code of the streamed project")
+    parser.add_argument("--node-type", action="append", default=None,
+                        help="Node type to stream (repeatable); all dictionary node types if not given")
+    parser.add_argument("--columnar-format", choices=sorted(COLUMNAR_FORMATS), default=None,
+                        help="Also write the coverage table as Parquet or Arrow IPC (requires pyarrow)")
+    parser.add_argument("--snapshot-out", default=None,
+                        help="Save a stats snapshot of this release to a JSON file, for snapshot.py diff")
+    parser.add_argument("--release", default=None,
+                        help="Release label of the snapshot; inferred from the node file names if not given")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="Only analyze shard INDEX/COUNT of the node files, by hash of file name (e.g. 0/4)")
+    parser.add_argument("--partial-out", default=None,
+                        help="Save the mergeable partial results of this run to a JSON file")
+    parser.add_argument("--merge", nargs="+", default=None, metavar="PARTIAL",
+                        help="Merge partial results files of sharded runs instead of reading node files")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running after the analysis: update it when input files change and answer queries")
+    parser.add_argument("--watch-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="With --watch, seconds between two checks of the input files")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="With --watch, address of the query endpoint")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="With --watch, port of the query endpoint")
+    parser.add_argument("--socket", default=None,
+                        help="With --watch, serve queries on this Unix socket instead of a TCP port")
     
     args = parser.parse_args()
     
     try:
+        # 流式读取 commons 导出的节点数据
+        sources = None
+        if args.commons_url:
+            if not args.program or not args.project:
+                parser.error("--commons-url needs --program and --project")
+            # 提交 API 客户端与 replace-nodes 共用
+            sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "replace-nodes"))
+            from export_source import commons_export_sources
+            sources = commons_export_sources(args.commons_url, args.program, args.project, args.node_type,
+                                             args.credentials)
+        
         # 创建分析器实例
         analyzer = DataFeatureAnalyzer(
             critical_data_path=args.critical_data,
             data_dir=args.data_dir,
-            coverage_threshold=args.threshold
+            coverage_threshold=args.threshold,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            split_size=int(args.split_mb * 1024 * 1024),
+            cache_dir=args.cache_dir,
+            cache_max_entries=args.cache_max_entries,
+            critical_only=args.critical_only,
+            profile_columns=args.column_profile,
+            sentinel_values=tuple(args.sentinel) if args.sentinel else DEFAULT_SENTINELS,
+            profile_stages=[args.profile] if args.profile else None,
+            profile_dir=args.output_dir,
+            sources=sources,
+            shard=args.shard,
+            partials=args.merge
         )
         
+        # 监听模式下在内存中缓存各文件的统计，文件变化时只重新解析变化的文件
+        watcher = AnalysisWatcher(analyzer, args.watch_interval, args.cache_max_entries) if args.watch else None
+        
         # 提取关键特征
         original_features, mapped_features, feature_mapping = analyzer.extract_critical_features()
         
@@ -415,16 +1410,40 @@ if __name__ == "__main__":
         # 分析特征存在性
         feature_existence = analyzer.analyze_feature_existence()
         
+        # 保存特征索引
+        if args.index_out:
+            analyzer.feature_index.save(args.index_out)
+        
+        # 检查引用完整性
+        if args.check_integrity:
+            analyzer.check_referential_integrity(bloom=args.bloom, bloom_error_rate=args.bloom_error_rate)
+        
         # 计算覆盖率
         coverage_report = analyzer.calculate_coverage()
         
         # 生成报告
-        analyzer.generate_reports(output_dir=args.output_dir)
+        analyzer.generate_reports(output_dir=args.output_dir, columnar_format=args.columnar_format)
+        
+        # 保存分片结果
+        if args.partial_out:
+            analyzer.save_partial(args.partial_out)
+        
+        # 保存发布版本快照
+        if args.snapshot_out:
+            analyzer.save_snapshot(args.snapshot_out, release=args.release)
         
         # 打印摘要
         analyzer.print_summary()
         
+        # 导出运行指标
+        if args.metrics_out:
+            analyzer.metrics.write(args.metrics_out)
+        
         logger.info("Analysis completed successfully")
         
+        # 常驻监听模式：保留分析器状态，文件变化时增量更新并提供本地查询接口
+        if watcher is not None:
+            serve(watcher, host=args.host, port=args.port, socket_path=args.socket)
+        
     except Exception as e:
         logger.error(f"Error running analysis: {str(e)}") 
\ No newline at end of file
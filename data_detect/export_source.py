@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming Node Sources
+
+This module turns byte iterators, such as Gen3 submission export responses,
+into file-like node sources that DataFeatureAnalyzer can parse while the
+bytes arrive, without staging the nodes to disk.
+"""
+
+import io
+import logging
+from typing import List, Dict, Optional, Iterable, Callable, Union, BinaryIO
+
+logger = logging.getLogger(__name__)
+
+# Number of bytes requested from an export response at a time
+EXPORT_CHUNK_BYTES = 1024 * 1024
+
+# Node types that hold no properties worth analyzing
+SKIPPED_NODE_TYPES = ("program", "project")
+
+# A node source: a binary file-like object, an iterator of byte chunks, or a callable opening either
+NodeSource = Union[BinaryIO, Iterable[bytes], Callable[[], Union[BinaryIO, Iterable[bytes]]]]
+
+
+class IterStream(io.RawIOBase):
+    """Read-only binary stream over an iterator of byte chunks"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self.bytes_read += size
+        return size
+
+
+class CountingReader(io.RawIOBase):
+    """Read-only binary stream counting the bytes read from a file-like object"""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        if not data:
+            return 0
+        buffer[:len(data)] = data
+        self.bytes_read += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        close = getattr(self._raw, "close", None)
+        if close is not None:
+            close()
+        super().close()
+
+
+def open_source(source: NodeSource) -> io.RawIOBase:
+    """
+    Open a node source as a binary stream that counts the bytes read
+
+    Parameters:
+        source: File-like object, iterator of byte chunks, or a callable returning either
+
+    Returns:
+        Raw binary stream with a bytes_read attribute
+    """
+    if reusable_source(source):
+        source = source()
+    if hasattr(source, "read"):
+        return CountingReader(source)
+    return IterStream(source)
+
+
+def reusable_source(source: NodeSource) -> bool:
+    """
+    Check whether a node source can be read more than once
+
+    File-like objects are closed and iterators are exhausted after a read;
+    only callables open a new stream each time.
+
+    Parameters:
+        source: Node source
+
+    Returns:
+        True if the source is a callable opening a new stream
+    """
+    return callable(source) and not hasattr(source, "read")
+
+
+def dictionary_node_types(submission) -> List[str]:
+    """
+    List the node types of the commons dictionary
+
+    Parameters:
+        submission: SubmissionClient instance
+
+    Returns:
+        Sorted list of node types, without internal entries, program and project
+    """
+    dictionary = submission.get_dictionary_all()
+    return sorted(
+        node for node, schema in dictionary.items()
+        if not node.startswith("_") and isinstance(schema, dict) and node not in SKIPPED_NODE_TYPES
+    )
+
+
+def export_stream(submission, program: str, project: str, node_type: str) -> Iterable[bytes]:
+    """
+    Stream the TSV export of one node type from the submission API
+
+    Unlike Gen3Submission.export_node, the response is not buffered, so the
+    caller can parse the rows while they arrive.
+
+    Parameters:
+        submission: SubmissionClient instance
+        program: Program name
+        project: Project code
+        node_type: Node type
+
+    Returns:
+        Iterator of byte chunks
+    """
+    import requests
+
+    api_url = f"{submission.project_url(program, project)}/export/"
+    with requests.get(api_url, params={"node_label": node_type, "format": "tsv"},
+                      auth=submission.auth, stream=True) as response:
+        response.raise_for_status()
+        yield from response.iter_content(chunk_size=EXPORT_CHUNK_BYTES)
+
+
+def commons_export_sources(commons_url: str, program: str, project: str,
+                           node_types: Optional[List[str]] = None,
+                           credentials: Optional[str] = None) -> Dict[str, NodeSource]:
+    """
+    Build lazy node sources for the TSV exports of a project
+
+    Each source opens its export request only when the analyzer reads it,
+    so the number of requests in flight follows the analyzer's workers.
+    The submission client is the one of replace-nodes, whose directory
+    must be importable (the --commons-url option adds it to sys.path).
+
+    Parameters:
+        commons_url: URL of the Gen3 commons
+        program: Program name
+        project: Project code
+        node_types: Node types to export; all dictionary node types if None
+        credentials: Path to the credentials file (JSON format); no authentication is sent if None
+
+    Returns:
+        Dictionary mapping source names (<node_type>_<program>-<project>.tsv) to sources
+    """
+    from submission_client import create_submission
+
+    submission = create_submission(commons_url, credentials)
+    if node_types is None:
+        node_types = dictionary_node_types(submission)
+    logger.info(f"Streaming {len(node_types)} node exports from {program}-{project}")
+
+    def source(node_type: str) -> Callable[[], Iterable[bytes]]:
+        return lambda: export_stream(submission, program, project, node_type)
+
+    return {f"{node_type}_{program}-{project}.tsv": source(node_type) for node_type in node_types}
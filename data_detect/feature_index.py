@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Feature Index
+
+This module builds an inverted index from feature names to the node files
+whose header contains them, so existence lookups do not scan every file.
+"""
+
+import os
+import json
+import logging
+from typing import List, Dict, Iterable
+
+from readers import list_node_files, read_header
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureIndex:
+    """Inverted index from feature names to node files"""
+
+    def __init__(self):
+        """
+        Initialize an empty feature index
+        """
+        self.index: Dict[str, List[str]] = {}
+        self.files: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_nodes_features(cls, nodes_features: Dict[str, List[str]]) -> "FeatureIndex":
+        """
+        Build an index from a feature mapping table classified by file name
+
+        Parameters:
+            nodes_features: Dictionary mapping file names to column names
+
+        Returns:
+            Feature index
+        """
+        feature_index = cls()
+        for file_name, features in nodes_features.items():
+            feature_index.add_file(file_name, features)
+        return feature_index
+
+    @classmethod
+    def from_directory(cls, data_dir: str, qualify: bool = False) -> "FeatureIndex":
+        """
+        Build an index from the headers of the tsv files in a directory
+
+        Parameters:
+            data_dir: Path to the directory containing tsv files
+            qualify: Key files by directory and file name instead of file name only
+
+        Returns:
+            Feature index
+        """
+        feature_index = cls()
+        for tsv_file in list_node_files(data_dir):
+            file_key = tsv_file if qualify else os.path.basename(tsv_file)
+            try:
+                feature_index.add_file(file_key, read_header(tsv_file))
+            except Exception as e:
+                logger.error(f"Error indexing file {tsv_file}: {str(e)}")
+        return feature_index
+
+    def add_file(self, file_name: str, features: Iterable[str]) -> None:
+        """
+        Add the header of a file to the index, replacing an earlier entry for the same file
+
+        Parameters:
+            file_name: Name of the file
+            features: Column names of the file
+        """
+        if file_name in self.files:
+            self.remove_file(file_name)
+
+        file_features = []
+        for feature in features:
+            files = self.index.setdefault(feature, [])
+            # A repeated column name in the same header must list the file once
+            if not files or files[-1] != file_name:
+                files.append(file_name)
+                file_features.append(feature)
+        self.files[file_name] = file_features
+
+    def remove_file(self, file_name: str) -> None:
+        """
+        Remove a file from the index
+
+        Parameters:
+            file_name: Name of the file
+        """
+        for feature in self.files.pop(file_name, []):
+            self.index[feature].remove(file_name)
+            if not self.index[feature]:
+                del self.index[feature]
+
+    def files_for(self, feature: str) -> List[str]:
+        """
+        Get the files whose header contains a feature
+
+        Parameters:
+            feature: Feature name
+
+        Returns:
+            List of file names, in the order the files were added
+        """
+        return list(self.index.get(feature, []))
+
+    def __contains__(self, feature: str) -> bool:
+        return feature in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def merge(self, other: "FeatureIndex") -> "FeatureIndex":
+        """
+        Merge another index into this one
+
+        Files present in both indexes take the entry of the other index.
+        Use qualified file keys when merging indexes of different directories
+        that share file names.
+
+        Parameters:
+            other: Index to merge
+
+        Returns:
+            This index
+        """
+        for file_name, features in other.files.items():
+            self.add_file(file_name, features)
+        return self
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to a JSON file
+
+        Only the features of each file are stored; the inverted index is
+        rebuilt on load.
+
+        Parameters:
+            path: Output file path
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureIndex":
+        """
+        Read an index from a JSON file written by save
+
+        Parameters:
+            path: Input file path
+
+        Returns:
+            Feature index
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        feature_index = cls()
+        for file_name, features in data["files"].items():
+            feature_index.add_file(file_name, features)
+        return feature_index
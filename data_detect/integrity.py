@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Referential Integrity Checker
+
+This module streams Gen3 node TSV files once, builds compact key sets per
+node type and reports dangling link references and duplicate submitter_ids.
+Keys and references are kept as 64-bit hashes; the values of the reported
+hashes are read back from the files that hold them.
+"""
+
+import os
+import re
+import math
+import logging
+from typing import List, Dict, Tuple, Any, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns identifying a record, after removing the required-field '*' prefix
+KEY_FIELDS = ("submitter_id", "id", "code")
+
+# Link columns such as "cases.submitter_id" or "*projects.code"
+LINK_PATTERN = re.compile(r"^([A-Za-z0-9_]+)\.(submitter_id|id|code)$")
+
+# Number of rows parsed per chunk
+DEFAULT_CHUNK_SIZE = 100000
+
+# Smallest number of keys a Bloom filter is sized for
+MIN_BLOOM_CAPACITY = 1024
+
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """
+    Hash string values to 64-bit integers
+
+    Parameters:
+        values: Values to hash
+
+    Returns:
+        Array of uint64 hashes
+    """
+    return pd.util.hash_pandas_object(values.astype(object), index=False).to_numpy(dtype=np.uint64)
+
+
+class ExactKeySet:
+    """Sorted array of 64-bit key hashes"""
+
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Check which hashes are in the set
+
+        Parameters:
+            hashes: Hashes to look up
+
+        Returns:
+            Boolean mask
+        """
+        positions = np.searchsorted(self.hashes, hashes)
+        found = np.zeros(len(hashes), dtype=bool)
+        inside = positions < len(self.hashes)
+        found[inside] = self.hashes[positions[inside]] == hashes[inside]
+        return found
+
+    def add(self, hashes: np.ndarray) -> None:
+        """
+        Add a batch of hashes to the set, sorting once per batch
+
+        Parameters:
+            hashes: Hashes to add
+        """
+        self.hashes = np.union1d(self.hashes, hashes)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit key hashes"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        Initialize an empty filter
+
+        Parameters:
+            capacity: Number of keys the filter is sized for
+            error_rate: Target false positive rate at capacity
+        """
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        """Bit positions of each hash, using double hashing"""
+        h1 = hashes
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.size)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean mask of the hashes that may be in the filter"""
+        positions = self._positions(hashes)
+        bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Add hashes to the filter"""
+        positions = self._positions(hashes).ravel()
+        masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+        np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.int64), masks)
+        self.count += len(hashes)
+
+
+class BloomKeySet:
+    """
+    Bloom filters over 64-bit key hashes, sized from the keys added
+
+    The first filter is sized for the first batch of keys. When a batch does
+    not fit, a new filter at least twice as large is added with half the
+    error rate of the previous one, so the combined false positive rate stays
+    below the target however many keys arrive.
+    """
+
+    def __init__(self, error_rate: float):
+        """
+        Initialize an empty key set
+
+        Parameters:
+            error_rate: Target false positive rate of the key set
+        """
+        self.error_rate = error_rate
+        self.filters: List[BloomFilter] = []
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Check which hashes may be in the key set
+
+        Parameters:
+            hashes: Hashes to look up
+
+        Returns:
+            Boolean mask; False is exact, True may be a false positive
+        """
+        found = np.zeros(len(hashes), dtype=bool)
+        for bloom_filter in self.filters:
+            if len(hashes):
+                found |= bloom_filter.contains(hashes)
+        return found
+
+    def add(self, hashes: np.ndarray) -> None:
+        """
+        Add a batch of hashes to the key set
+
+        Parameters:
+            hashes: Hashes to add
+        """
+        if len(hashes) == 0:
+            return
+        last = self.filters[-1] if self.filters else None
+        if last is None or last.count + len(hashes) > last.capacity:
+            capacity = max(len(hashes), 2 * last.capacity if last else MIN_BLOOM_CAPACITY)
+            # Error rates error_rate/2, error_rate/4, ... add up to less than error_rate
+            last = BloomFilter(capacity, self.error_rate / 2 ** (len(self.filters) + 1))
+            self.filters.append(last)
+        last.add(hashes)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the filters"""
+        return sum(bloom_filter.bits.nbytes for bloom_filter in self.filters)
+
+
+def count_hashes(parts: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count the distinct hashes in a batch of hash arrays
+
+    Parameters:
+        parts: Hash arrays
+
+    Returns:
+        Tuple of (sorted distinct hashes, number of occurrences of each)
+    """
+    hashes, counts = np.unique(np.concatenate(parts), return_counts=True)
+    return hashes, counts.astype(np.int64)
+
+
+def merge_counts(first: Tuple[np.ndarray, np.ndarray],
+                 second: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Add up two (hashes, counts) pairs
+
+    Parameters:
+        first: Sorted distinct hashes and their counts
+        second: Sorted distinct hashes and their counts
+
+    Returns:
+        Sorted distinct hashes and their summed counts
+    """
+    hashes, inverse = np.unique(np.concatenate([first[0], second[0]]), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([first[1], second[1]]), minlength=len(hashes))
+    return hashes, counts.astype(np.int64)
+
+
+class ReferentialIntegrityChecker:
+    """Cross-node referential integrity checker"""
+
+    def __init__(self, bloom: bool = False, bloom_error_rate: float = 0.001, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Initialize the checker
+
+        Parameters:
+            bloom: Use Bloom filters instead of exact key sets
+            bloom_error_rate: Target false positive rate of each Bloom key set
+            chunk_size: Number of rows parsed per chunk
+        """
+        self.bloom = bloom
+        self.bloom_error_rate = bloom_error_rate
+        self.chunk_size = chunk_size
+        # (node type, key field) -> key set
+        self.key_sets: Dict[Tuple[str, str], Any] = {}
+        # (node type, link column) -> (sorted distinct referenced hashes, number of references)
+        self.references: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        # node type -> hashes of submitter_ids seen again, once per extra occurrence
+        self.duplicates: Dict[str, List[np.ndarray]] = {}
+        self.row_counts: Dict[str, int] = {}
+        # (file path, node type, field -> column) of every file, for reading values back in report()
+        self.files: List[Tuple[str, str, Dict[str, str]]] = []
+
+    def _key_set(self, node_type: str, key_field: str):
+        """Get or create the key set of a node type and key field"""
+        key = (node_type, key_field)
+        if key not in self.key_sets:
+            if self.bloom:
+                self.key_sets[key] = BloomKeySet(self.bloom_error_rate)
+            else:
+                self.key_sets[key] = ExactKeySet()
+        return self.key_sets[key]
+
+    def add_file(self, file_path: str) -> None:
+        """
+        Stream one node file and record the hashes of its keys and link references
+
+        Only the type, key and link columns are parsed. Hashes are collected
+        per chunk and added to the key sets and reference counts once per file.
+
+        Parameters:
+            file_path: Path to the tsv file
+        """
+        header = pd.read_csv(file_path, sep='\t', nrows=0).columns
+        fields = {column: column.lstrip('*') for column in header}
+        type_column = next((column for column, field in fields.items() if field == "type"), None)
+        key_columns = [column for column, field in fields.items() if field in KEY_FIELDS]
+        link_columns = [column for column, field in fields.items() if LINK_PATTERN.match(field)]
+        usecols = set(key_columns + link_columns + ([type_column] if type_column else []))
+
+        node_type = None
+        key_hashes: Dict[str, List[np.ndarray]] = {fields[column]: [] for column in key_columns}
+        link_hashes: Dict[str, List[np.ndarray]] = {fields[column]: [] for column in link_columns}
+        with pd.read_csv(file_path, sep='\t', dtype=str, chunksize=self.chunk_size,
+                         usecols=lambda column: column in usecols) as reader:
+            for chunk in reader:
+                if node_type is None:
+                    node_type = self._node_type(chunk, type_column, file_path)
+                self.row_counts[node_type] = self.row_counts.get(node_type, 0) + len(chunk)
+
+                for column in key_columns:
+                    key_hashes[fields[column]].append(hash_values(chunk[column].dropna()))
+                for column in link_columns:
+                    link_hashes[fields[column]].append(hash_values(self._link_values(chunk[column])))
+
+        if node_type is None:
+            return
+        self.files.append((file_path, node_type, {fields[column]: column for column in key_columns + link_columns}))
+
+        for key_field, parts in key_hashes.items():
+            self._add_keys(node_type, key_field, parts)
+        for link_field, parts in link_hashes.items():
+            hashes, counts = count_hashes(parts)
+            key = (node_type, link_field)
+            self.references[key] = merge_counts(self.references[key], (hashes, counts)) \
+                if key in self.references else (hashes, counts)
+
+    @staticmethod
+    def _link_values(values: pd.Series) -> pd.Series:
+        """Referenced values of a link column; a cell may reference several parents separated by commas"""
+        values = values.dropna().str.split(',').explode().str.strip()
+        return values[values != ""]
+
+    @staticmethod
+    def _node_type(chunk: pd.DataFrame, type_column: Optional[str], file_path: str) -> str:
+        """Node type from the type column, or the file name prefix if the column is empty"""
+        if type_column is not None:
+            types = chunk[type_column].dropna()
+            if not types.empty:
+                return types.iloc[0]
+        return os.path.basename(file_path).split('_')[0].replace('-', '_')
+
+    def _add_keys(self, node_type: str, key_field: str, parts: List[np.ndarray]) -> None:
+        """Add the key hashes of one file and record the hashes of duplicate submitter_ids"""
+        hashes, counts = count_hashes(parts)
+        if len(hashes) == 0:
+            return
+
+        key_set = self._key_set(node_type, key_field)
+
+        if key_field == "submitter_id":
+            # Every occurrence of a key already in the set, or repeated within the file, is an extra one
+            extra = counts - 1 + key_set.contains(hashes)
+            if extra.any():
+                self.duplicates.setdefault(node_type, []).append(np.repeat(hashes, extra))
+
+        key_set.add(hashes)
+
+    def _resolve_target(self, link_name: str, key_field: str) -> Optional[str]:
+        """Resolve a link name such as "cases" or "studies" to a node type seen in the release"""
+        candidates = [link_name]
+        if link_name.endswith("ies"):
+            candidates.append(link_name[:-3] + "y")
+        if link_name.endswith("s"):
+            candidates.append(link_name[:-1])
+        for candidate in candidates:
+            if (candidate, key_field) in self.key_sets:
+                return candidate
+        return None
+
+    def _read_values(self, wanted: Dict[Tuple[str, str], np.ndarray]) -> Tuple[Dict[Tuple[str, str], Dict[int, str]],
+                                                                              Dict[Tuple[str, str], Dict[int, int]]]:
+        """
+        Read the values of some hashes back from the node files
+
+        Only the files and columns holding wanted hashes are read again. The
+        occurrences of each hash are counted on the way, which confirms the
+        duplicate candidates of Bloom key sets.
+
+        Parameters:
+            wanted: (node type, field) -> hashes whose values are needed
+
+        Returns:
+            Tuple of ((node type, field) -> hash -> value, (node type, field) -> hash -> occurrences)
+        """
+        values: Dict[Tuple[str, str], Dict[int, str]] = {key: {} for key in wanted}
+        occurrences: Dict[Tuple[str, str], Dict[int, int]] = {key: {} for key in wanted}
+        for file_path, node_type, columns in self.files:
+            needed = {field: column for field, column in columns.items() if (node_type, field) in wanted}
+            if not needed:
+                continue
+            with pd.read_csv(file_path, sep='\t', dtype=str, chunksize=self.chunk_size,
+                             usecols=list(needed.values())) as reader:
+                for chunk in reader:
+                    for field, column in needed.items():
+                        if field in KEY_FIELDS:
+                            column_values = chunk[column].dropna()
+                        else:
+                            column_values = self._link_values(chunk[column])
+                        hashes = hash_values(column_values)
+                        found = np.isin(hashes, wanted[(node_type, field)])
+                        for value, value_hash in zip(column_values[found], hashes[found]):
+                            values[(node_type, field)].setdefault(int(value_hash), value)
+                            seen = occurrences[(node_type, field)]
+                            seen[int(value_hash)] = seen.get(int(value_hash), 0) + 1
+        return values, occurrences
+
+    def report(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Resolve link references against the collected key sets
+
+        The hashes of dangling references and duplicate submitter_ids are
+        turned back into values with a second pass over the files that hold
+        them. The same pass counts the occurrences of each duplicate
+        candidate, so the false positives of Bloom key sets are dropped
+        instead of being reported as duplicates.
+
+        Returns:
+            Dictionary containing:
+            - "dangling": dangling references with their source, target and count
+            - "duplicates": duplicated submitter_ids per node type
+            - "unchecked": links whose target node type is not part of the release
+        """
+        dangling_hashes = {}
+        unchecked = []
+        for (node_type, link_field), (hashes, counts) in self.references.items():
+            link_name, key_field = LINK_PATTERN.match(link_field).groups()
+            target = self._resolve_target(link_name, key_field)
+            if target is None:
+                unchecked.append({"node_type": node_type, "column": link_field, "references": int(counts.sum())})
+                continue
+            missing = ~self.key_sets[(target, key_field)].contains(hashes)
+            if missing.any():
+                dangling_hashes[(node_type, link_field)] = (target, hashes[missing], counts[missing])
+
+        duplicate_hashes = {}
+        for node_type, parts in self.duplicates.items():
+            duplicate_hashes[(node_type, "submitter_id")] = count_hashes(parts)
+
+        values, occurrences = self._read_values({
+            **{key: hashes for key, (_, hashes, _) in dangling_hashes.items()},
+            **{key: hashes for key, (hashes, _) in duplicate_hashes.items()}
+        })
+
+        dangling = []
+        for (node_type, link_field), (target, hashes, counts) in dangling_hashes.items():
+            found = values[(node_type, link_field)]
+            dangling.extend(sorted(
+                ({"node_type": node_type, "column": link_field, "target": target,
+                  "value": found[int(value_hash)], "count": int(count)}
+                 for value_hash, count in zip(hashes, counts)),
+                key=lambda info: info["value"]
+            ))
+
+        duplicates = []
+        for (node_type, _), (hashes, _) in duplicate_hashes.items():
+            found = values[(node_type, "submitter_id")]
+            seen = occurrences[(node_type, "submitter_id")]
+            confirmed = [int(value_hash) for value_hash in hashes if seen.get(int(value_hash), 0) > 1]
+            if len(confirmed) < len(hashes):
+                logger.info(f"Dropped {len(hashes) - len(confirmed)} false duplicate submitter_ids of {node_type} "
+                            f"found by the Bloom key set")
+            duplicates.extend(sorted(
+                ({"node_type": node_type, "value": found[value_hash], "count": seen[value_hash]}
+                 for value_hash in confirmed),
+                key=lambda info: info["value"]
+            ))
+        return {"dangling": dangling, "duplicates": duplicates, "unchecked": unchecked}
@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Analysis Metrics
+
+This module records wall time, CPU time, bytes read, row throughput and peak
+memory per analysis stage and per file, and exports them as JSON or
+Prometheus text.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+import logging
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator, Callable
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported Prometheus metric
+METRIC_PREFIX = "data_feature_analysis"
+
+# Seconds between two RSS samples
+RSS_SAMPLE_INTERVAL = 0.01
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """
+    Get the peak resident set size of this process or of its finished child processes
+
+    Parameters:
+        children: Report the largest finished child process instead of this process
+
+    Returns:
+        Peak RSS in bytes, or None if the platform does not provide it
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Get the current resident set size of this process
+
+    Returns:
+        RSS in bytes, or None where /proc/self/statm is not available
+    """
+    try:
+        with open("/proc/self/statm", 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    """
+    Samples the RSS of this process in a background thread while in use, keeping the peak
+
+    ru_maxrss only gives the peak of the whole process lifetime, so it cannot
+    tell which stage or file used the memory. peak is None where the RSS
+    cannot be read.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        """
+        Initialize the sampler
+
+        Parameters:
+            interval: Seconds between two samples
+        """
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> None:
+        """Read the RSS once and update the peak"""
+        rss = current_rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self) -> "RssSampler":
+        self.sample()
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process plus its finished child processes"""
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+
+def timed_call(func: Callable, *args) -> tuple:
+    """
+    Call a function and measure it, for use inside worker processes
+
+    Parameters:
+        func: Function to call
+        args: Positional arguments of the function
+
+    Returns:
+        Tuple of (result, wall seconds, CPU seconds, peak RSS in bytes of the calling process during the call)
+    """
+    with RssSampler() as sampler:
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        result = func(*args)
+        wall_seconds, cpu_seconds = time.perf_counter() - start_wall, time.process_time() - start_cpu
+    return result, wall_seconds, cpu_seconds, sampler.peak
+
+
+class MetricsRecorder:
+    """Per-stage and per-file metrics of one analysis run"""
+
+    def __init__(self, profile_stages: Optional[List[str]] = None, profile_dir: str = "."):
+        """
+        Initialize the recorder
+
+        Parameters:
+            profile_stages: Names of the stages to run under cProfile
+            profile_dir: Directory receiving the <stage>.prof files
+        """
+        self.profile_stages = set(profile_stages or [])
+        self.profile_dir = profile_dir
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        # stage -> file name -> metrics
+        self.files: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._active: List[str] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measure a stage; nested stages are recorded separately and included in their parent
+
+        Parameters:
+            name: Stage name
+        """
+        record = self.stages.setdefault(name, {
+            "calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "bytes_read": 0, "rows": 0,
+            "peak_rss_bytes": None, "worker_peak_rss_bytes": None
+        })
+        profiler = cProfile.Profile() if name in self.profile_stages else None
+        sampler = RssSampler()
+
+        self._active.append(name)
+        start_wall = time.perf_counter()
+        start_cpu = _cpu_seconds()
+        try:
+            with sampler:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    yield
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            record["calls"] += 1
+            record["wall_seconds"] += time.perf_counter() - start_wall
+            record["cpu_seconds"] += _cpu_seconds() - start_cpu
+            record["peak_rss_bytes"] = _max(record["peak_rss_bytes"], sampler.peak)
+            self._active.pop()
+            if profiler is not None:
+                self._dump_profile(name, profiler)
+
+    def _dump_profile(self, name: str, profiler: cProfile.Profile) -> None:
+        """Write the cProfile stats of a stage and log its hottest functions"""
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_path = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(profile_path)
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(15)
+            logger.info(f"cProfile stats of {name} written to {profile_path}\n{stream.getvalue()}")
+        except Exception as e:
+            logger.error(f"Error writing cProfile stats of {name}: {str(e)}")
+
+    def add_io(self, bytes_read: int = 0, rows: int = 0) -> None:
+        """
+        Add bytes read and rows processed to the innermost active stage
+
+        Parameters:
+            bytes_read: Number of bytes read
+            rows: Number of rows processed
+        """
+        if not self._active:
+            return
+        record = self.stages[self._active[-1]]
+        record["bytes_read"] += bytes_read
+        record["rows"] += rows
+
+    def record_file(self, file_name: str, bytes_read: int, rows: int, wall_seconds: float,
+                    cpu_seconds: float, peak_rss: Optional[int] = None) -> None:
+        """
+        Record the metrics of one processed file and add its I/O to the active stage
+
+        Parameters:
+            file_name: Name of the file
+            bytes_read: Number of bytes read
+            rows: Number of rows processed
+            wall_seconds: Wall time spent on the file, summed over its byte ranges
+            cpu_seconds: CPU time spent on the file, summed over its byte ranges
+            peak_rss: Peak RSS of the process that read the file (the largest over its byte ranges),
+                as returned by timed_call
+        """
+        stage = self._active[-1] if self._active else ""
+        self.files.setdefault(stage, {})[file_name] = {
+            "bytes_read": bytes_read,
+            "rows": rows,
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": cpu_seconds,
+            "rows_per_second": rows / wall_seconds if wall_seconds > 0 else None,
+            "peak_rss_bytes": peak_rss
+        }
+        self.add_io(bytes_read, rows)
+        if self._active:
+            record = self.stages[stage]
+            record["worker_peak_rss_bytes"] = _max(record["worker_peak_rss_bytes"], peak_rss)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get all metrics, adding rows per second to every stage
+
+        Returns:
+            Dictionary with "stages" and "files" entries
+        """
+        stages = {}
+        for name, record in self.stages.items():
+            stages[name] = dict(record)
+            wall = record["wall_seconds"]
+            stages[name]["rows_per_second"] = record["rows"] / wall if wall > 0 and record["rows"] else None
+        return {"stages": stages, "files": self.files}
+
+    def to_prometheus(self) -> str:
+        """
+        Format the metrics in the Prometheus text exposition format
+
+        Returns:
+            Metrics text
+        """
+        metrics = self.to_dict()
+        stage_records = [({"stage": name}, record) for name, record in metrics["stages"].items()]
+        file_records = [
+            ({"stage": stage, "file": file_name}, record)
+            for stage, files in metrics["files"].items() for file_name, record in files.items()
+        ]
+        lines = []
+
+        def add_family(name: str, help_text: str, records: list, field: str):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            for labels, record in records:
+                if record.get(field) is not None:
+                    label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+                    lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {record[field]}")
+
+        add_family("stage_calls", "Number of times a stage ran", stage_records, "calls")
+        add_family("stage_wall_seconds", "Wall time of a stage", stage_records, "wall_seconds")
+        add_family("stage_cpu_seconds", "CPU time of a stage including worker processes", stage_records,
+                   "cpu_seconds")
+        add_family("stage_bytes_read", "Bytes read by a stage", stage_records, "bytes_read")
+        add_family("stage_rows", "Rows processed by a stage", stage_records, "rows")
+        add_family("stage_rows_per_second", "Row throughput of a stage", stage_records, "rows_per_second")
+        add_family("stage_peak_rss_bytes", "Peak RSS of the process sampled during a stage", stage_records,
+                   "peak_rss_bytes")
+        add_family("stage_worker_peak_rss_bytes", "Largest peak RSS of the files read during a stage",
+                   stage_records, "worker_peak_rss_bytes")
+
+        add_family("file_wall_seconds", "Wall time spent on a file", file_records, "wall_seconds")
+        add_family("file_cpu_seconds", "CPU time spent on a file", file_records, "cpu_seconds")
+        add_family("file_bytes_read", "Bytes read from a file", file_records, "bytes_read")
+        add_family("file_rows", "Rows read from a file", file_records, "rows")
+        add_family("file_rows_per_second", "Row throughput of a file", file_records, "rows_per_second")
+        add_family("file_peak_rss_bytes", "Peak RSS of the process that read a file", file_records,
+                   "peak_rss_bytes")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, metrics_format: Optional[str] = None) -> None:
+        """
+        Write the metrics to a file
+
+        Parameters:
+            path: Output file path
+            metrics_format: "json" or "prometheus"; inferred from the extension (.prom, .txt) if None
+        """
+        if metrics_format is None:
+            metrics_format = "prometheus" if path.endswith((".prom", ".txt")) else "json"
+
+        with open(path, 'w', encoding='utf-8') as f:
+            if metrics_format == "prometheus":
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Metrics written to {path}")
+
+
+def instrumented(method: Callable) -> Callable:
+    """
+    Decorate an analyzer method so that it is recorded as a stage in self.metrics
+
+    Parameters:
+        method: Method to decorate
+
+    Returns:
+        Wrapped method
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.metrics.stage(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _max(current: Optional[int], value: Optional[int]) -> Optional[int]:
+    """Largest of two optional values"""
+    if value is None:
+        return current
+    return value if current is None else max(current, value)
+
+
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Analysis Stage Graph
+
+This module memoizes the results of analyzer stages. Each stage declares the
+stages it depends on and how to read its input state, and runs again only
+when that state, its arguments or the result of a dependency have changed.
+"""
+
+import functools
+import logging
+from typing import Dict, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """Memoized stage results with the input keys they were computed from"""
+
+    def __init__(self):
+        # stage -> {"key", "result", "version"}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.runs: Dict[str, int] = {}
+        self._next_version = 0
+
+    def version(self, name: str) -> int:
+        """
+        Get the version of a stage result, which changes every time the stage runs
+
+        Parameters:
+            name: Stage name
+
+        Returns:
+            Version number, or -1 if the stage has no result
+        """
+        entry = self.entries.get(name)
+        return -1 if entry is None else entry["version"]
+
+    def lookup(self, name: str, key: Any) -> Tuple[bool, Any]:
+        """
+        Look up the memoized result of a stage
+
+        Parameters:
+            name: Stage name
+            key: Input key of the current call
+
+        Returns:
+            Tuple of (True, result) if the result was computed from the same key, else (False, None)
+        """
+        entry = self.entries.get(name)
+        if entry is not None and entry["key"] == key:
+            return True, entry["result"]
+        return False, None
+
+    def store(self, name: str, key: Any, result: Any) -> None:
+        """
+        Store the result of a stage run
+
+        Parameters:
+            name: Stage name
+            key: Input key the result was computed from
+            result: Stage result
+        """
+        self._next_version += 1
+        self.entries[name] = {"key": key, "result": result, "version": self._next_version}
+        self.runs[name] = self.runs.get(name, 0) + 1
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        Drop memoized results so they are computed again on the next request
+
+        Stages depending on an invalidated stage run again as well, since the
+        version of its new result differs.
+
+        Parameters:
+            name: Stage name; all stages if None
+        """
+        if name is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(name, None)
+
+
+def stage(*depends: str, state: Optional[Callable[[Any], Any]] = None) -> Callable:
+    """
+    Decorate an analyzer method as a memoized stage of self.stage_graph
+
+    The dependencies are requested first (which is cheap when they are
+    memoized); the method then runs only if its input key differs from the
+    key of its memoized result. The key is made of the input state, the call
+    arguments and the versions of the dependency results.
+
+    Parameters:
+        depends: Names of the stage methods this stage uses
+        state: Function of the analyzer returning the input state read by this stage, such as file stats
+
+    Returns:
+        Decorator
+    """
+    def decorate(method: Callable) -> Callable:
+        name = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            for dependency in depends:
+                getattr(self, dependency)()
+
+            graph = self.stage_graph
+            key = (
+                state(self) if state is not None else None,
+                args,
+                tuple(sorted(kwargs.items())),
+                tuple(graph.version(dependency) for dependency in depends)
+            )
+            hit, result = graph.lookup(name, key)
+            if hit:
+                logger.debug(f"Reusing the result of {name}")
+                return result
+
+            result = method(self, *args, **kwargs)
+            graph.store(name, key, result)
+            return result
+
+        wrapper.depends = depends
+        return wrapper
+    return decorate
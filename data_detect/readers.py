@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Node File Readers
+
+This module finds node TSV files, including gzip and zstd compressed ones,
+and reads their headers without loading whole files.
+"""
+
+import os
+import io
+import glob
+import gzip
+import mmap
+from typing import List, Optional, BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, only needed for .tsv.zst files
+    zstandard = None
+
+# Node file name patterns, plain files first
+NODE_FILE_PATTERNS = ("*.tsv", "*.tsv.gz", "*.tsv.zst")
+
+# Extensions of compressed node files
+COMPRESSED_EXTENSIONS = (".gz", ".zst")
+
+
+def list_node_files(data_dir: str) -> List[str]:
+    """
+    List the plain and compressed node files in a directory
+
+    Parameters:
+        data_dir: Path to the directory containing tsv files
+
+    Returns:
+        List of file paths
+    """
+    node_files = []
+    for pattern in NODE_FILE_PATTERNS:
+        node_files.extend(glob.glob(os.path.join(data_dir, pattern)))
+    return node_files
+
+
+def is_compressed(file_path: str) -> bool:
+    """
+    Check whether a node file is compressed
+
+    Parameters:
+        file_path: Path to the file
+
+    Returns:
+        True for .gz and .zst files
+    """
+    return file_path.endswith(COMPRESSED_EXTENSIONS)
+
+
+def open_node_file(file_path: str, raw: Optional[BinaryIO] = None) -> BinaryIO:
+    """
+    Open a node file for streaming binary reads, decompressing on the fly
+
+    Parameters:
+        file_path: Path to the file
+        raw: Already opened binary stream of the file's bytes, e.g. one that hashes what is read;
+            the file is opened if None
+
+    Returns:
+        Binary file object
+    """
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path if raw is None else raw, 'rb')
+    if file_path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("The zstandard package is required to read .zst files: pip install zstandard")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+            open(file_path, 'rb') if raw is None else raw, closefd=True))
+    return open(file_path, 'rb') if raw is None else raw
+
+
+def read_header(file_path: str) -> List[str]:
+    """
+    Read the column names from the first line of a TSV file
+
+    Plain files are memory-mapped so only the first line is copied;
+    compressed files are decompressed until the first line break.
+
+    Parameters:
+        file_path: Path to the tsv file
+
+    Returns:
+        List of column names
+    """
+    if is_compressed(file_path):
+        with open_node_file(file_path) as f:
+            first_line = f.readline()
+    elif os.path.getsize(file_path) == 0:
+        first_line = b""
+    else:
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.find(b"\n")
+            first_line = mm[:end if end >= 0 else len(mm)]
+    return first_line.decode('utf-8').strip().split('\t')
+
+
+def next_line_start(mm: mmap.mmap, position: int) -> int:
+    """
+    Find the start of the line following a position in a memory-mapped file
+
+    Parameters:
+        mm: Memory-mapped file
+        position: Byte offset
+
+    Returns:
+        Offset just past the next line break, or the file size if there is none
+    """
+    end = mm.find(b"\n", position)
+    return len(mm) if end < 0 else end + 1
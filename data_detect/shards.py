@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Sharded Analysis
+
+This module splits the node files of a release into deterministic shards by
+hash of file name, and writes and merges the partial results of analyzers
+that each processed one shard, so a release can be analyzed on several
+machines.
+"""
+
+import os
+import json
+import time
+import zlib
+import logging
+from typing import List, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of partial-results files changes
+PARTIAL_VERSION = 1
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification
+
+    Parameters:
+        value: Shard as "<index>/<count>", e.g. "0/4"; indexes start at 0
+
+    Returns:
+        Tuple of (index, count)
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard {value!r}, expected <index>/<count> such as 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value!r}, the index must be between 0 and {count - 1}")
+    return index, count
+
+
+def shard_of(file_name: str, count: int) -> int:
+    """
+    Get the shard of a node file
+
+    CRC32 is used instead of hash(), which is salted per process, so every
+    worker assigns a file to the same shard.
+
+    Parameters:
+        file_name: Node file name, without directory
+        count: Number of shards
+
+    Returns:
+        Shard index
+    """
+    return zlib.crc32(file_name.encode("utf-8")) % count
+
+
+def build_partial(analyzer, file_order: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Build the partial results of an analyzer that processed one shard
+
+    Parameters:
+        analyzer: DataFeatureAnalyzer; its coverage stage is run if needed
+        file_order: Position of each file name in the unsharded file listing, used to restore the order on merge
+
+    Returns:
+        Partial results dictionary with the headers, non-null counts and column profiles of the shard's files
+    """
+    table = analyzer.calculate_coverage()
+
+    counts: Dict[str, Tuple[Dict[str, int], int]] = {}
+    for file_name, rows in table.frame.groupby("file", observed=True, sort=False):
+        counts[str(file_name)] = (
+            dict(zip(rows["feature"].astype(str), rows["non_null_count"].tolist())),
+            int(rows["total_count"].iloc[0])
+        )
+
+    files = []
+    for file_name, header in analyzer.nodes_features.items():
+        non_null_counts, total_count = counts.get(file_name, (None, None))
+        files.append({
+            "name": file_name,
+            "order": file_order.get(file_name, len(file_order)),
+            "header": header,
+            "non_null_counts": non_null_counts,
+            "total_count": total_count
+        })
+
+    return {
+        "version": PARTIAL_VERSION,
+        "shard": list(analyzer.shard) if analyzer.shard else [0, 1],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "options": {
+            "critical_only": analyzer.critical_only,
+            "profile_columns": analyzer.profile_columns,
+            "sentinel_values": list(analyzer.sentinel_values)
+        },
+        "critical_features": analyzer.critical_features,
+        "feature_mapping": analyzer.feature_mapping,
+        "files": files,
+        "column_profiles": analyzer.column_profiles
+    }
+
+
+def save_partial(partial: Dict[str, Any], path: str) -> None:
+    """
+    Write partial results to a JSON file
+
+    Parameters:
+        partial: Partial results dictionary
+        path: Output file path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(partial, f, separators=(",", ":"), default=str)
+    os.replace(tmp_path, path)
+    index, count = partial["shard"]
+    logger.info(f"Partial results of shard {index}/{count} ({len(partial['files'])} files) written to {path}")
+
+
+def merge_partials(paths: List[str]) -> Dict[str, Any]:
+    """
+    Load and combine partial results files
+
+    The shards must come from runs with the same critical data and options.
+    Files are put back in their unsharded order; a missing shard only logs a
+    warning, so a release can be merged while a worker is re-run.
+
+    Parameters:
+        paths: Partial results file paths
+
+    Returns:
+        Dictionary with critical_features, feature_mapping, options, files (in order) and
+        column_profiles; feature existence follows from the merged headers
+    """
+    partials = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            partial = json.load(f)
+        if partial.get("version") != PARTIAL_VERSION:
+            raise ValueError(f"Unsupported partial results version in {path}: {partial.get('version')}")
+        partials.append(partial)
+    if not partials:
+        raise ValueError("No partial results to merge")
+
+    first = partials[0]
+    counts = {partial["shard"][1] for partial in partials}
+    if len(counts) > 1:
+        raise ValueError(f"Partial results come from different shard counts: {sorted(counts)}")
+    indexes = [partial["shard"][0] for partial in partials]
+    if len(set(indexes)) < len(indexes):
+        raise ValueError(f"Duplicate shards in partial results: {sorted(indexes)}")
+    missing = sorted(set(range(first["shard"][1])) - set(indexes))
+    if missing:
+        logger.warning(f"Shards {missing} of {first['shard'][1]} are missing; the merged results are incomplete")
+    for path, partial in zip(paths, partials):
+        if partial["feature_mapping"] != first["feature_mapping"] or partial["options"] != first["options"]:
+            raise ValueError(f"{path} was produced with different critical data or options than {paths[0]}")
+
+    files: List[Dict[str, Any]] = []
+    seen = set()
+    column_profiles: Dict[str, Dict[str, Any]] = {}
+    for partial in partials:
+        for info in partial["files"]:
+            if info["name"] in seen:
+                raise ValueError(f"{info['name']} appears in more than one partial results file")
+            seen.add(info["name"])
+            files.append(info)
+        for feature, file_info in partial["column_profiles"].items():
+            column_profiles.setdefault(feature, {}).update(file_info)
+    files.sort(key=lambda info: info["order"])
+
+    logger.info(f"Merged {len(partials)} partial results with {len(files)} files")
+    return {
+        "critical_features": first["critical_features"],
+        "feature_mapping": first["feature_mapping"],
+        "options": first["options"],
+        "files": files,
+        "column_profiles": column_profiles
+    }
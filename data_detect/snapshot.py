@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Release Stats Snapshots
+
+This script saves a compact per-release snapshot of the analysis results
+(headers, row counts and non-null counts) and compares any number of
+snapshots without reading the TSV files again.
+
+Usage:
+    python snapshot.py diff snapshot_v1.json snapshot_v2.json [...] --threshold 0.8
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional
+import numpy as np
+import pandas as pd
+
+from coverage_table import CoverageTable
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of snapshot files changes
+SNAPSHOT_VERSION = 1
+
+# Release version in node file names, e.g. audit_obs_DCC_data_release_v2-0-0.tsv
+RELEASE_PATTERN = re.compile(r"_v(\d+(?:-\d+)*)")
+
+
+def release_version(file_name: str) -> Optional[str]:
+    """
+    Get the release version from a node file name
+
+    Parameters:
+        file_name: Node file name
+
+    Returns:
+        Version such as "v2-0-0", or None if the name has none
+    """
+    match = RELEASE_PATTERN.search(file_name)
+    return f"v{match.group(1)}" if match else None
+
+
+def node_key(file_name: str) -> str:
+    """
+    Get the release-independent key of a node file, used to match files across releases
+
+    Parameters:
+        file_name: Node file name
+
+    Returns:
+        File name without its release version
+    """
+    return RELEASE_PATTERN.sub("", file_name)
+
+
+def infer_release(file_names: List[str]) -> str:
+    """
+    Infer the release of a set of node files from the most common version in their names
+
+    Parameters:
+        file_names: Node file names
+
+    Returns:
+        Release version, or "unknown"
+    """
+    versions = Counter(version for version in map(release_version, file_names) if version)
+    return versions.most_common(1)[0][0] if versions else "unknown"
+
+
+def build_snapshot(analyzer, release: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the stats snapshot of an analyzer run
+
+    Parameters:
+        analyzer: DataFeatureAnalyzer; its existence and coverage stages are run if needed
+        release: Release label; inferred from the file names if None
+
+    Returns:
+        Snapshot dictionary
+    """
+    analyzer.analyze_feature_existence()
+    table = analyzer.calculate_coverage()
+    row_counts = table.frame.groupby("file", observed=True)["total_count"].first()
+
+    files = {}
+    for file_name, columns in analyzer.nodes_features.items():
+        files[file_name] = {
+            "node": node_key(file_name),
+            "columns": columns,
+            "total_count": int(row_counts[file_name]) if file_name in row_counts.index else None
+        }
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "release": release or infer_release(list(analyzer.nodes_features)),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "critical_features": sorted(analyzer.mapped_critical_features),
+        "files": files,
+        "coverage": table.to_dict()
+    }
+
+
+def save_snapshot(snapshot: Dict[str, Any], path: str) -> None:
+    """
+    Write a snapshot to a JSON file
+
+    Parameters:
+        snapshot: Snapshot dictionary
+        path: Output file path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    logger.info(f"Snapshot of release {snapshot['release']} written to {path}")
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Load a snapshot from a JSON file
+
+    Parameters:
+        path: Snapshot file path
+
+    Returns:
+        Snapshot dictionary
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version in {path}: {snapshot.get('version')}")
+    return snapshot
+
+
+def release_labels(snapshots: List[Dict[str, Any]]) -> List[str]:
+    """
+    Get the release label of every snapshot, numbering labels that appear more than once
+
+    Two snapshots of the same release (e.g. before and after a data fix, both
+    inferred as v2-0-0) are kept apart as "v2-0-0 #1" and "v2-0-0 #2", with the
+    position of the snapshot in the list.
+
+    Parameters:
+        snapshots: Snapshots in release order
+
+    Returns:
+        One distinct label per snapshot
+    """
+    counts = Counter(snapshot["release"] for snapshot in snapshots)
+    labels = [f"{snapshot['release']} #{position}" if counts[snapshot["release"]] > 1 else snapshot["release"]
+              for position, snapshot in enumerate(snapshots, 1)]
+    duplicates = sorted(release for release, count in counts.items() if count > 1)
+    if duplicates:
+        logger.warning(f"Several snapshots of release {', '.join(duplicates)}, numbered by position")
+    return labels
+
+
+def critical_coverage_matrix(snapshots: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the average coverage of every critical feature in every release
+
+    Parameters:
+        snapshots: Snapshots in release order
+
+    Returns:
+        DataFrame with one row per critical feature and one column per snapshot, labeled by
+        release_labels; NaN where the feature is not critical or not present in any file of the release
+    """
+    columns = {}
+    for label, snapshot in zip(release_labels(snapshots), snapshots):
+        average = CoverageTable.from_dict(snapshot["coverage"]).average_coverage()
+        average.index = average.index.astype(object)
+        columns[label] = average.reindex(snapshot["critical_features"])
+    return pd.DataFrame(columns)
+
+
+def diff_coverage(snapshots: List[Dict[str, Any]], threshold: float = 0.8,
+                  include_unchanged: bool = False) -> pd.DataFrame:
+    """
+    Compare the critical feature coverage of consecutive releases
+
+    All release pairs are compared at once on the coverage matrix. Changes are:
+    newly critical / no longer critical (critical in one release only),
+    appeared / disappeared (critical in both releases, present in one only),
+    gained / lost (crossed the threshold), increased / decreased, and unchanged.
+
+    Parameters:
+        snapshots: Snapshots in release order
+        threshold: Coverage threshold (0.0-1.0)
+        include_unchanged: Keep features whose coverage did not change
+
+    Returns:
+        DataFrame with Release From, Release To, Critical Feature, Coverage From, Coverage To, Delta and Change
+    """
+    matrix = critical_coverage_matrix(snapshots)
+    releases = list(matrix.columns)
+    if len(releases) < 2 or matrix.empty:
+        return pd.DataFrame(columns=["Release From", "Release To", "Critical Feature", "Coverage From",
+                                     "Coverage To", "Delta", "Change"])
+
+    values = matrix.to_numpy(dtype=np.float64)
+    old = values[:, :-1]
+    new = values[:, 1:]
+    old_present = ~np.isnan(old)
+    new_present = ~np.isnan(new)
+    both = old_present & new_present
+    critical_sets = [set(snapshot["critical_features"]) for snapshot in snapshots]
+    critical = np.array([[feature in features for features in critical_sets] for feature in matrix.index],
+                        dtype=bool).reshape(len(matrix), len(releases))
+    old_critical = critical[:, :-1]
+    new_critical = critical[:, 1:]
+    with np.errstate(invalid="ignore"):
+        delta = new - old
+        change = np.select(
+            [
+                ~old_critical & new_present,
+                old_present & ~new_critical,
+                ~old_present & new_present,
+                old_present & ~new_present,
+                both & (old < threshold) & (new >= threshold),
+                both & (old >= threshold) & (new < threshold),
+                both & (delta > 0),
+                both & (delta < 0),
+                both
+            ],
+            ["newly critical", "no longer critical", "appeared", "disappeared", "gained", "lost", "increased",
+             "decreased", "unchanged"],
+            default=""
+        )
+
+    # One row per (feature, release pair), ordered by release pair
+    pairs = len(releases) - 1
+    result = pd.DataFrame({
+        "Release From": np.repeat(np.asarray(releases[:-1], dtype=object), len(matrix)),
+        "Release To": np.repeat(np.asarray(releases[1:], dtype=object), len(matrix)),
+        "Critical Feature": np.tile(matrix.index.to_numpy(dtype=object), pairs),
+        "Coverage From": old.T.ravel(),
+        "Coverage To": new.T.ravel(),
+        "Delta": delta.T.ravel(),
+        "Change": change.T.ravel()
+    })
+    keep = result["Change"] != ""
+    if not include_unchanged:
+        keep &= result["Change"] != "unchanged"
+    return result[keep].reset_index(drop=True)
+
+
+def diff_shapes(snapshots: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Compare the node files of consecutive releases
+
+    Files are matched by their name without the release version. A row count
+    of None (unknown) is not compared.
+
+    Parameters:
+        snapshots: Snapshots in release order
+
+    Returns:
+        DataFrame with Release From, Release To, Node File, Change, Columns Added, Columns Removed,
+        Rows From and Rows To, for files that were added, removed or changed shape
+    """
+    rows = []
+    labels = release_labels(snapshots)
+    for position, (before, after) in enumerate(zip(snapshots[:-1], snapshots[1:])):
+        old_files = {info["node"]: info for info in before["files"].values()}
+        new_files = {info["node"]: info for info in after["files"].values()}
+        for node in sorted(set(old_files) | set(new_files)):
+            old_info = old_files.get(node)
+            new_info = new_files.get(node)
+            old_columns = old_info["columns"] if old_info else []
+            new_columns = new_info["columns"] if new_info else []
+            added = [column for column in new_columns if column not in set(old_columns)]
+            removed = [column for column in old_columns if column not in set(new_columns)]
+            old_rows = old_info["total_count"] if old_info else None
+            new_rows = new_info["total_count"] if new_info else None
+
+            if old_info is None:
+                change = "added"
+            elif new_info is None:
+                change = "removed"
+            elif added or removed:
+                change = "columns changed"
+            elif old_rows is not None and new_rows is not None and old_rows != new_rows:
+                # Critical-only snapshots have no row count for files without critical features
+                change = "rows changed"
+            else:
+                continue
+            rows.append({
+                "Release From": labels[position],
+                "Release To": labels[position + 1],
+                "Node File": node,
+                "Change": change,
+                "Columns Added": ", ".join(added) if old_info and new_info else "",
+                "Columns Removed": ", ".join(removed) if old_info and new_info else "",
+                "Rows From": old_rows,
+                "Rows To": new_rows
+            })
+    result = pd.DataFrame(rows, columns=["Release From", "Release To", "Node File", "Change", "Columns Added",
+                                         "Columns Removed", "Rows From", "Rows To"])
+    return result.astype({"Rows From": "Int64", "Rows To": "Int64"})
+
+
+def print_diff(coverage_diff: pd.DataFrame, shape_diff: pd.DataFrame, threshold: float) -> None:
+    """
+    Print a summary of the release differences to the console
+
+    Parameters:
+        coverage_diff: Result of diff_coverage
+        shape_diff: Result of diff_shapes
+        threshold: Coverage threshold (0.0-1.0)
+    """
+    print("\n" + "="*80)
+    print(f"RELEASE DIFF SUMMARY (threshold {threshold:.2%})")
+    print("="*80)
+    pairs = pd.concat([coverage_diff[["Release From", "Release To"]], shape_diff[["Release From", "Release To"]]])
+    for (release_from, release_to), _ in pairs.groupby(["Release From", "Release To"], sort=False):
+        print(f"{release_from} -> {release_to}")
+        changes = coverage_diff[(coverage_diff["Release From"] == release_from) &
+                                (coverage_diff["Release To"] == release_to)]
+        for change in ["gained", "lost", "appeared", "disappeared", "newly critical", "no longer critical"]:
+            features = changes.loc[changes["Change"] == change, "Critical Feature"].tolist()
+            if features:
+                print(f"  Critical features {change}: {len(features)} ({', '.join(features[:10])}"
+                      f"{', ...' if len(features) > 10 else ''})")
+        shapes = shape_diff[(shape_diff["Release From"] == release_from) & (shape_diff["Release To"] == release_to)]
+        for change, count in shapes["Change"].value_counts().items():
+            print(f"  Node files {change}: {count}")
+    print("="*80 + "\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
+    parser = argparse.ArgumentParser(description="Release Stats Snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = subparsers.add_parser("diff", help="Compare two or more snapshots in release order")
+    diff_parser.add_argument("snapshots", nargs="+", help="Snapshot JSON files, oldest first")
+    diff_parser.add_argument("--threshold", type=float, default=0.8, help="Coverage threshold (0.0-1.0)")
+    diff_parser.add_argument("--output-dir", default=".", help="Output directory for coverage_diff.csv and shape_diff.csv")
+    diff_parser.add_argument("--all", action="store_true", help="Also list critical features whose coverage did not change")
+
+    args = parser.parse_args()
+
+    try:
+        if len(args.snapshots) < 2:
+            parser.error("diff needs at least two snapshots")
+        snapshots = [load_snapshot(path) for path in args.snapshots]
+        coverage_diff = diff_coverage(snapshots, args.threshold, include_unchanged=args.all)
+        shape_diff = diff_shapes(snapshots)
+
+        os.makedirs(args.output_dir, exist_ok=True)
+        coverage_diff.to_csv(os.path.join(args.output_dir, "coverage_diff.csv"), index=False,
+                             float_format="%.4f", lineterminator="\r\n")
+        shape_diff.to_csv(os.path.join(args.output_dir, "shape_diff.csv"), index=False, lineterminator="\r\n")
+        logger.info(f"Release diff written to {args.output_dir}")
+
+        print_diff(coverage_diff, shape_diff, args.threshold)
+
+    except Exception as e:
+        logger.error(f"Error comparing snapshots: {str(e)}")
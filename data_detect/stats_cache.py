@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persistent Stats Cache
+
+This module stores per-file statistics (header, non-null counts, row count)
+on disk, or in memory for long-running processes, so that unchanged files do
+not have to be parsed again.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of cached entries changes
+CACHE_VERSION = 1
+
+# Default maximum number of files kept in the cache
+DEFAULT_MAX_ENTRIES = 10000
+
+# Seconds after which a cache hit refreshes the saved last use time of an entry
+LAST_USED_RESOLUTION = 24 * 3600
+
+
+def new_digest():
+    """Create the BLAKE2b digest used for file content hashes"""
+    return hashlib.blake2b(digest_size=20)
+
+
+def range_hash(file_path: str, start: int, end: int, block_size: int = 1024 * 1024) -> str:
+    """
+    Calculate the BLAKE2b hash of the bytes between start and end of a file
+
+    Parameters:
+        file_path: Path to the file
+        start: Byte offset of the range
+        end: Byte offset just past the range
+        block_size: Number of bytes read at a time
+
+    Returns:
+        Hex digest of the range
+    """
+    digest = new_digest()
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def combine_hashes(range_hashes: List[str]) -> str:
+    """
+    Combine the hashes of consecutive byte ranges into the hash of a file read in ranges
+
+    Parameters:
+        range_hashes: Hex digests of the ranges, in file order
+
+    Returns:
+        Hex digest of the range digests
+    """
+    digest = new_digest()
+    for value in range_hashes:
+        digest.update(bytes.fromhex(value))
+    return digest.hexdigest()
+
+
+def content_hash(file_path: str, boundaries: Optional[List[int]] = None) -> str:
+    """
+    Calculate the BLAKE2b hash of a file's content
+
+    Files counted in byte ranges are hashed range by range, so each worker
+    hashes the bytes it reads; boundaries gives the ranges of such a hash.
+
+    Parameters:
+        file_path: Path to the file
+        boundaries: Offsets of consecutive byte ranges from 0 to the file size; the whole file if None
+
+    Returns:
+        Hex digest of the file content
+    """
+    if boundaries is None:
+        return range_hash(file_path, 0, os.path.getsize(file_path))
+    return combine_hashes([range_hash(file_path, start, end) for start, end in zip(boundaries[:-1], boundaries[1:])])
+
+
+class StatsCache:
+    """On-disk cache of per-file statistics"""
+
+    def __init__(self, cache_dir: Optional[str], max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the stats cache
+
+        Parameters:
+            cache_dir: Directory holding the cache file; entries are only kept in memory if None
+            max_entries: Maximum number of files kept; least recently used entries are evicted first
+        """
+        self.cache_dir = cache_dir
+        self.cache_path = os.path.join(cache_dir, "stats_cache.json") if cache_dir else None
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self.load()
+
+    def load(self) -> None:
+        """
+        Load cached entries from disk, starting empty if the cache is missing or unreadable
+        """
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("entries", {})
+            else:
+                logger.info("Stats cache version changed, starting with an empty cache")
+        except Exception as e:
+            logger.error(f"Error loading stats cache {self.cache_path}: {str(e)}")
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached statistics of a file if the file has not changed
+
+        A file is unchanged when its size and modification time match the
+        cached entry. If only the modification time differs, the content hash
+        decides, so files that were copied or touched are not rescanned.
+
+        Parameters:
+            file_path: Path to the file
+
+        Returns:
+            Cached statistics, or None if the file is new or changed
+        """
+        key = os.path.abspath(file_path)
+        entry = self.entries.get(key)
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        if entry is None or entry["size"] != stat.st_size:
+            self.misses += 1
+            return None
+
+        if entry["mtime_ns"] != stat.st_mtime_ns:
+            if entry["hash"] != content_hash(file_path, entry.get("hash_boundaries")):
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._dirty = True
+
+        # The saved last use time only needs to be precise enough to order evictions,
+        # so a hit does not rewrite the cache file every run
+        now = time.time()
+        if now - entry["last_used"] > LAST_USED_RESOLUTION:
+            self._dirty = True
+        entry["last_used"] = now
+        self.hits += 1
+        return entry["stats"]
+
+    def put(self, file_path: str, stats: Dict[str, Any], file_hash: Optional[str] = None,
+            hash_boundaries: Optional[List[int]] = None) -> None:
+        """
+        Store the statistics of a file
+
+        Parameters:
+            file_path: Path to the file
+            stats: JSON-serializable statistics of the file
+            file_hash: Content hash computed while the file was read; the file is read again to hash it if None
+            hash_boundaries: Byte range boundaries of file_hash, if the file was hashed in ranges
+        """
+        stat = os.stat(file_path)
+        if file_hash is None:
+            file_hash, hash_boundaries = content_hash(file_path), None
+        self.entries[os.path.abspath(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": file_hash,
+            "hash_boundaries": hash_boundaries,
+            "last_used": time.time(),
+            "stats": stats
+        }
+        self._dirty = True
+
+    def evict(self) -> None:
+        """
+        Remove entries of deleted files and the least recently used entries above max_entries
+        """
+        for key in [key for key in self.entries if not os.path.exists(key)]:
+            del self.entries[key]
+            self._dirty = True
+
+        if len(self.entries) > self.max_entries:
+            by_last_used = sorted(self.entries, key=lambda key: self.entries[key]["last_used"])
+            for key in by_last_used[:len(self.entries) - self.max_entries]:
+                del self.entries[key]
+            self._dirty = True
+
+    def save(self) -> None:
+        """
+        Evict stale entries and write the cache to disk
+        """
+        self.evict()
+        if not self._dirty or self.cache_path is None:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self.cache_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+            # Replace atomically so an interrupted run never leaves a broken cache
+            os.replace(temp_path, self.cache_path)
+            self._dirty = False
+            logger.info(f"Stats cache saved: {len(self.entries)} entries, {self.hits} hits, {self.misses} misses")
+        except Exception as e:
+            logger.error(f"Error saving stats cache {self.cache_path}: {str(e)}")
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""Shared fixtures of the data_detect tests"""
+
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPLACE_NODES_DIR = os.path.join(os.path.dirname(os.path.dirname(TESTS_DIR)), "replace-nodes")
+# The modules of data_detect and its benchmarks are imported as top-level modules, as
+# data_feature_analysis.py and bench_analyzer.py do; the submission client and the stand-in
+# submission API are those of replace-nodes
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "benchmarks"))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+sys.path.append(REPLACE_NODES_DIR)
+sys.path.append(os.path.join(REPLACE_NODES_DIR, "tests"))
+
+from standin_server import StandinSubmissionAPI  # noqa: E402
+
+# Node types of project P-A, with their number of records and the properties of record i
+NODES = {
+    "subject": (40, lambda i: {"gender": "female" if i % 2 else "male", "age": "" if i % 3 else str(40 + i)}),
+    "lab": (60, lambda i: {"subjects.submitter_id": f"subject_{i % 40}", "glucose": "" if i % 5 else "5.5",
+                           "note": "" if i % 2 else "fasting"}),
+    "visit": (10, lambda i: {"visit_type": "follow-up"}),
+}
+
+# Critical data file: the critical flag is in column 4 and the mapped property in column 11
+CRITICAL_CSV = "name,c1,c2,critical,c4,c5,c6,c7,c8,c9,property\n" + "".join(
+    f"{name},,,{flag},,,,,,,{prop}\n" for name, flag, prop in [
+        ("gender", "Critical", "gender"),
+        ("age", "Critical", "age"),
+        ("glucose", "Critical", "glucose"),
+        ("missing", "Critical", "not_exported"),
+        ("note", "No", "note"),
+    ]
+)
+
+
+def standin_api() -> StandinSubmissionAPI:
+    """Stand-in submission API holding the NODES records of P-A, not started"""
+    api = StandinSubmissionAPI()
+    for node_type, (count, properties) in NODES.items():
+        api.add_records("P-A", node_type, count, properties)
+    return api
+
+
+@pytest.fixture
+def standin():
+    """Started stand-in submission API serving the exports of P-A"""
+    api = standin_api()
+    api.url = api.start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def exports():
+    """TSV exports of the NODES by node type"""
+    api = standin_api()
+    return {node_type: api.export_tsv("P-A", node_type) for node_type in NODES}
+
+
+@pytest.fixture
+def release(tmp_path, exports):
+    """Critical data file and a data directory holding the exports of P-A as <node_type>_P-A.tsv files"""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for node_type, tsv_text in exports.items():
+        (data_dir / f"{node_type}_P-A.tsv").write_text(tsv_text, encoding="utf-8")
+    critical_data = tmp_path / "critical_data.csv"
+    critical_data.write_text(CRITICAL_CSV, encoding="utf-8")
+    return str(critical_data), str(data_dir)
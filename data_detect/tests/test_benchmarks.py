@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the synthetic release generator and the benchmark harness"""
+
+import os
+
+import pandas as pd
+
+from bench_analyzer import ROW_STAGES, STAGES, run_benchmark
+from data_feature_analysis import DataFeatureAnalyzer
+from generate_release import generate_release
+
+
+def test_generated_release_has_the_requested_shape(tmp_path):
+    release = generate_release(str(tmp_path), num_files=3, num_rows=40, num_columns=6, null_density=0.25,
+                               dictionary_size=30, seed=1)
+
+    file_names = sorted(os.listdir(release["data_dir"]))
+    frames = [pd.read_csv(os.path.join(release["data_dir"], name), sep='\t') for name in file_names]
+    properties = [frame[[column for column in frame.columns if column.startswith("property_")]] for frame in frames]
+
+    assert len(file_names) == 3
+    assert all(len(frame) == 40 for frame in frames)
+    assert all(frame.shape[1] == 6 for frame in properties)
+    null_share = sum(int(frame.isna().sum().sum()) for frame in properties) / (3 * 40 * 6)
+    assert 0.15 < null_share < 0.35
+    assert release["total_bytes"] == sum(os.path.getsize(os.path.join(release["data_dir"], name))
+                                         for name in file_names)
+
+    analyzer = DataFeatureAnalyzer(release["critical_data_path"], release["data_dir"])
+    analyzer.extract_critical_features()
+    assert 0 < len(analyzer.mapped_critical_features) < 30
+
+
+def test_benchmark_reports_rows_per_second_for_row_stages_only():
+    config = {"num_files": 2, "num_rows": 50, "num_columns": 4, "null_density": 0.2, "dictionary_size": 20}
+
+    results = run_benchmark([config], repeats=2, analyzer_options={}, trace_memory=True)
+
+    assert [record["stage"] for record in results] == STAGES
+    for record in results:
+        assert (record["rows_per_sec"] is not None) == (record["stage"] in ROW_STAGES)
+        assert record["seconds_min"] <= record["seconds_median"]
+        assert record["peak_alloc_bytes"] > 0
+        assert record["max_rss_bytes"] is None or record["max_rss_bytes"] > 0
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the mergeable column profile statistics"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from column_profile import ColumnProfile, HeavyHitters, HyperLogLog
+
+
+def test_exact_top_values_include_singletons():
+    top_values = HeavyHitters(exact_limit=8, capacity=4)
+    top_values.add(pd.Series(["a", "b", "b", "c"]))
+
+    assert top_values.exact
+    assert top_values.top() == [("b", 2), ("a", 1), ("c", 1)]
+
+
+def test_approximate_top_values_are_lower_bounds_above_the_error():
+    top_values = HeavyHitters(exact_limit=8, capacity=16)
+    counts = {"frequent": 50, "common": 30, "rare": 3}
+    counts.update({f"unique_{i}": 1 for i in range(100)})
+    values = [value for value, count in counts.items() for _ in range(count)]
+    random.Random(3).shuffle(values)
+    for start in range(0, len(values), 7):
+        top_values.add(pd.Series(values[start:start + 7]))
+
+    assert not top_values.exact
+    # Misra-Gries bound: no count is more than n / (capacity + 1) too low
+    assert top_values.error <= len(values) / 17
+    top = dict(top_values.top())
+    for value, count in top.items():
+        assert counts[value] - top_values.error <= count <= counts[value]
+        assert count > top_values.error
+    # Values more frequent than twice the error are always listed, unique values never
+    assert {"frequent", "common"} <= set(top)
+    assert not any(value.startswith("unique_") for value in top)
+
+
+def test_split_top_values_merge_within_the_same_bounds():
+    counts = {"frequent": 60, "common": 40}
+    counts.update({f"unique_{i}": 1 for i in range(200)})
+    values = [value for value, count in counts.items() for _ in range(count)]
+    random.Random(5).shuffle(values)
+    halves = [HeavyHitters(exact_limit=8, capacity=16), HeavyHitters(exact_limit=8, capacity=16)]
+    for index, half in enumerate(halves):
+        for start in range(index * 150, index * 150 + 150, 10):
+            half.add(pd.Series(values[start:start + 10]))
+
+    merged = halves[0]
+    merged.merge(halves[1])
+
+    assert merged.error <= len(values) / 17 + 1
+    top = dict(merged.top())
+    for value, count in top.items():
+        assert counts[value] - merged.error <= count <= counts[value]
+    assert {"frequent", "common"} <= set(top)
+
+
+def test_exact_merge_counts_every_value():
+    first, second = HeavyHitters(), HeavyHitters()
+    first.add(pd.Series(["a", "b", "b"]))
+    second.add(pd.Series(["b", "c"]))
+
+    first.merge(second)
+
+    assert first.exact
+    assert first.top() == [("b", 3), ("a", 1), ("c", 1)]
+
+
+@pytest.mark.parametrize("cardinality", [100, 3000, 50000])
+def test_distinct_estimate_is_within_the_hyperloglog_error(cardinality):
+    sketch = HyperLogLog()
+    values = pd.Series([f"subject_{i}" for i in range(cardinality)])
+    for start in range(0, cardinality, 1000):
+        # Repeated values do not change the estimate
+        sketch.add(values[start:start + 1000])
+        sketch.add(values[start:start + 10])
+
+    # Standard error is 1.04 / sqrt(4096) = 1.6%; allow four of them
+    assert abs(sketch.estimate() - cardinality) <= 0.065 * cardinality
+
+
+def test_merged_sketches_equal_the_sketch_of_the_union():
+    values = pd.Series([f"case_{i}" for i in range(20000)])
+    first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    first.add(values[:12000])
+    second.add(values[8000:])
+    union.add(values)
+
+    first.merge(second)
+
+    np.testing.assert_array_equal(first.registers, union.registers)
+    assert abs(first.estimate() - 20000) <= 0.065 * 20000
+
+
+def test_profile_summary_separates_placeholders():
+    profile = ColumnProfile()
+    values = pd.Series(["1", "2", "2", "not reported", "3"])
+    profile.update(values[:2], ["not reported"])
+    profile.update(values[2:], ["not reported"])
+
+    summary = profile.summary(non_null_count=5, total_count=8)
+
+    assert summary["inferred_type"] == "integer"
+    assert (summary["min"], summary["max"]) == (1.0, 3.0)
+    assert summary["distinct_count"] == 3
+    assert summary["top_values"] == [("2", 2), ("1", 1), ("3", 1)]
+    assert summary["placeholder_share"] == 4 / 8
+    assert summary["effective_coverage"] == 4 / 8
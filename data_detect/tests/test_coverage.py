@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the streaming coverage counts"""
+
+import os
+import logging
+
+import pandas as pd
+import pytest
+
+from data_feature_analysis import (DataFeatureAnalyzer, count_non_null, count_non_null_range, merge_counts,
+                                   split_byte_ranges)
+
+
+def write_tsv(path, rows=95):
+    """TSV with empty cells, pandas missing-value markers and a column that is never filled"""
+    lines = ["type\tsubmitter_id\tage\tnote\tempty"]
+    for i in range(rows):
+        age = "" if i % 3 else str(i)
+        note = "NA" if i % 4 == 0 else ("" if i % 5 == 0 else f"note {i}")
+        lines.append(f"subject\tsubject_{i}\t{age}\t{note}\t")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_streamed_counts_match_a_full_read(tmp_path, chunk_size):
+    file_path = write_tsv(tmp_path / "subject.tsv")
+    frame = pd.read_csv(file_path, sep='\t')
+
+    non_null_counts, total_count, profiles = count_non_null(file_path, chunk_size)
+
+    assert non_null_counts == {column: int(count) for column, count in frame.notna().sum().items()}
+    assert total_count == len(frame)
+    assert profiles is None
+
+
+def test_selected_columns_ignore_names_missing_from_the_file(tmp_path):
+    file_path = write_tsv(tmp_path / "subject.tsv")
+
+    non_null_counts, total_count, _ = count_non_null(file_path, 7, usecols=["age", "not_a_column"])
+
+    assert non_null_counts == {"age": 32}
+    assert total_count == 95
+
+
+def test_analyzer_coverage_matches_a_full_read(release):
+    critical_data, data_dir = release
+    analyzer = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7)
+
+    analyzer.calculate_coverage()
+    coverage = analyzer.coverage_report
+    for file_name in sorted(os.listdir(data_dir)):
+        frame = pd.read_csv(os.path.join(data_dir, file_name), sep='\t')
+        for feature, share in frame.notna().mean().items():
+            assert coverage[feature][file_name]["coverage"] == pytest.approx(share)
+    assert coverage["age"]["subject_P-A.tsv"]["is_critical"]
+    assert not coverage["note"]["lab_P-A.tsv"]["is_critical"]
+
+
+@pytest.mark.parametrize("split_size", [1, 64, 500, 10 ** 6])
+def test_split_ranges_merge_to_the_counts_of_the_whole_file(tmp_path, split_size):
+    file_path = write_tsv(tmp_path / "subject.tsv")
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    columns = list(pd.read_csv(file_path, sep='\t', nrows=0).columns)
+
+    ranges = split_byte_ranges(file_path, split_size)
+    merged = merge_counts([count_non_null_range(file_path, columns, start, end, 7) for start, end in ranges])
+
+    # The ranges cover every data row exactly once and start on line boundaries
+    assert ranges[0][0] == content.index(b"\n") + 1
+    assert ranges[-1][1] == len(content)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(content[start - 1:start] == b"\n" for start, _ in ranges)
+    assert merged[:2] == count_non_null(file_path, 7)[:2]
+
+
+def test_parallel_split_coverage_matches_a_single_worker(release, caplog):
+    caplog.set_level(logging.INFO, logger="data_feature_analysis")
+    critical_data, data_dir = release
+    single = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7)
+    single.calculate_coverage()
+
+    split = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7, workers=2, split_size=200)
+    split.calculate_coverage()
+
+    assert "Splitting lab_P-A.tsv" in caplog.text
+    pd.testing.assert_frame_equal(split.coverage_table.frame, single.coverage_table.frame)
+
+
+def test_critical_only_counts_match_the_full_counts(release):
+    critical_data, data_dir = release
+    full = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7)
+    full.calculate_coverage()
+
+    critical = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7, critical_only=True)
+    critical.calculate_coverage()
+
+    # Only the critical columns of files holding any are parsed; visit_P-A.tsv has none
+    assert sorted(critical.metrics.files["calculate_coverage"]) == ["lab_P-A.tsv", "subject_P-A.tsv"]
+    assert sorted(set(critical.coverage_table.frame["feature"])) == ["age", "gender", "glucose"]
+    assert critical.critical_features_coverage == full.critical_features_coverage
+    critical.analyze_feature_existence()
+    assert critical.missing_critical_features == ["not_exported"]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of coverage analysis from node exports streamed from the stand-in export API"""
+
+import pytest
+
+from data_feature_analysis import DataFeatureAnalyzer
+
+pytest.importorskip("gen3")
+
+from export_source import commons_export_sources  # noqa: E402
+
+
+def analyze(critical_data, data_dir, **kwargs):
+    """Run the analysis stages up to the coverage and return the analyzer"""
+    analyzer = DataFeatureAnalyzer(critical_data_path=critical_data, data_dir=data_dir, chunk_size=7, **kwargs)
+    analyzer.extract_critical_features()
+    analyzer.get_nodes_features()
+    analyzer.analyze_feature_existence()
+    analyzer.calculate_coverage()
+    return analyzer
+
+
+def test_streamed_coverage_matches_files(standin, release):
+    critical_data, data_dir = release
+    sources = commons_export_sources(standin.url, "P", "A")
+
+    streamed = analyze(critical_data, "unused", sources=sources, workers=2)
+    on_disk = analyze(critical_data, data_dir)
+
+    assert sorted(sources) == ["lab_P-A.tsv", "subject_P-A.tsv", "visit_P-A.tsv"]
+    assert streamed.nodes_features == on_disk.nodes_features
+    assert streamed.coverage_report == on_disk.coverage_report
+    assert streamed.critical_features_coverage["glucose"]["lab_P-A.tsv"]["non_null_count"] == 12
+    assert streamed.missing_critical_features == ["not_exported"]
+    # Each export is requested once, for the header and the counts alike
+    assert sorted(standin.exports) == [("P-A", "lab"), ("P-A", "subject"), ("P-A", "visit")]
+
+
+def test_critical_only_skips_exports_without_critical_features(standin, release):
+    critical_data, data_dir = release
+    sources = commons_export_sources(standin.url, "P", "A", ["subject", "visit"])
+
+    analyzer = analyze(critical_data, "unused", sources=sources, critical_only=True)
+
+    assert sorted(analyzer.nodes_features) == ["subject_P-A.tsv", "visit_P-A.tsv"]
+    assert sorted(analyzer.source_counts) == ["subject_P-A.tsv"]
+    assert analyzer.critical_features_coverage["age"]["subject_P-A.tsv"]["non_null_count"] == 14
+
+
+def test_streamed_counts_follow_critical_options(standin, release, tmp_path):
+    critical_data, data_dir = release
+    sources = commons_export_sources(standin.url, "P", "A", ["subject", "visit"])
+    analyzer = analyze(critical_data, "unused", sources=sources, critical_only=True)
+    assert sorted(analyzer.source_counts) == ["subject_P-A.tsv"]
+
+    # A new critical feature makes visit a critical node: the exports are counted again
+    with open(critical_data, 'a', encoding='utf-8') as f:
+        f.write("visit_type,,,Critical,,,,,,,visit_type\n")
+    analyzer.calculate_coverage()
+    assert sorted(analyzer.source_counts) == ["subject_P-A.tsv", "visit_P-A.tsv"]
+    assert analyzer.critical_features_coverage["visit_type"]["visit_P-A.tsv"]["non_null_count"] == 10
+
+    analyzer.critical_only = False
+    analyzer.calculate_coverage()
+    assert "submitter_id" in analyzer.coverage_report
+    assert len(standin.exports) == 6
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the inverted feature index"""
+
+import os
+import gzip
+
+from data_feature_analysis import DataFeatureAnalyzer
+from feature_index import FeatureIndex
+
+
+def test_files_are_listed_once_and_replaced_on_re_add():
+    feature_index = FeatureIndex.from_nodes_features({
+        "subject.tsv": ["type", "age", "age"],
+        "lab.tsv": ["type", "glucose"],
+    })
+    assert feature_index.files_for("age") == ["subject.tsv"]
+    assert feature_index.files_for("type") == ["subject.tsv", "lab.tsv"]
+
+    feature_index.add_file("subject.tsv", ["type", "gender"])
+
+    assert "age" not in feature_index
+    assert feature_index.files_for("gender") == ["subject.tsv"]
+    assert feature_index.files_for("type") == ["lab.tsv", "subject.tsv"]
+    assert feature_index.files_for("missing") == []
+
+
+def test_merge_takes_the_entries_of_the_other_index():
+    first = FeatureIndex.from_nodes_features({"subject.tsv": ["type", "age"], "lab.tsv": ["type", "glucose"]})
+    second = FeatureIndex.from_nodes_features({"subject.tsv": ["type", "gender"], "visit.tsv": ["type"]})
+
+    merged = first.merge(second)
+
+    assert merged is first
+    assert merged.files == {"lab.tsv": ["type", "glucose"], "subject.tsv": ["type", "gender"], "visit.tsv": ["type"]}
+    assert merged.index == {"type": ["lab.tsv", "subject.tsv", "visit.tsv"], "glucose": ["lab.tsv"],
+                            "gender": ["subject.tsv"]}
+
+
+def test_save_and_load_rebuild_the_same_index(tmp_path):
+    feature_index = FeatureIndex.from_nodes_features({"subject.tsv": ["type", "age"], "lab.tsv": ["type", "glucose"]})
+    path = str(tmp_path / "index.json")
+
+    feature_index.save(path)
+    loaded = FeatureIndex.load(path)
+
+    assert loaded.files == feature_index.files
+    assert loaded.index == feature_index.index
+    assert len(loaded) == 3
+
+
+def test_directory_index_matches_the_analyzer_existence(release, tmp_path):
+    critical_data, data_dir = release
+    # Compressed node files are indexed from their decompressed header
+    with open(os.path.join(data_dir, "visit_P-A.tsv"), 'rb') as f, \
+            gzip.open(os.path.join(data_dir, "visit_P-B.tsv.gz"), 'wb') as out:
+        out.write(f.read())
+
+    feature_index = FeatureIndex.from_directory(data_dir)
+    qualified = FeatureIndex.from_directory(data_dir, qualify=True)
+    analyzer = DataFeatureAnalyzer(critical_data, data_dir)
+    existence = analyzer.analyze_feature_existence()
+
+    assert feature_index.files_for("visit_type") == ["visit_P-A.tsv", "visit_P-B.tsv.gz"]
+    assert qualified.files_for("visit_type") == [os.path.join(data_dir, "visit_P-A.tsv"),
+                                                 os.path.join(data_dir, "visit_P-B.tsv.gz")]
+    for feature, info in existence.items():
+        assert info["files"] == feature_index.files_for(feature)
+    assert existence["not_exported"] == {"exists": "n", "files": []}
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the referential integrity check"""
+
+import os
+import csv
+
+import pytest
+
+from data_feature_analysis import DataFeatureAnalyzer
+from integrity import ReferentialIntegrityChecker
+
+
+def write_node(path, rows, columns=("type", "submitter_id")):
+    """Write a node TSV of rows given as tuples in the order of columns"""
+    path.write_text("\t".join(columns) + "\n" + "".join("\t".join(row) + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+
+def check(paths, **options):
+    checker = ReferentialIntegrityChecker(chunk_size=7, **options)
+    for path in paths:
+        checker.add_file(path)
+    return checker.report()
+
+
+@pytest.fixture
+def linked_release(tmp_path):
+    """Cases with one repeated submitter_id and samples with two dangling case references"""
+    cases = write_node(tmp_path / "case_1.tsv", [("case", f"case_{i}") for i in range(20)] + [("case", "case_3")])
+    more_cases = write_node(tmp_path / "case_2.tsv", [("case", "case_3"), ("case", "case_20")])
+    samples = write_node(
+        tmp_path / "sample.tsv",
+        [("sample", f"sample_{i}", f"case_{i}") for i in range(15)]
+        + [("sample", "sample_15", "case_404, case_1"), ("sample", "sample_16", "case_404"),
+           ("sample", "sample_17", "case_405")],
+        columns=("type", "submitter_id", "*cases.submitter_id")
+    )
+    orphans = write_node(tmp_path / "aliquot.tsv", [("aliquot", "aliquot_1", "analyte_1")],
+                         columns=("type", "submitter_id", "analytes.submitter_id"))
+    return [cases, more_cases, samples, orphans]
+
+
+@pytest.mark.parametrize("bloom", [False, True])
+def test_dangling_references_and_duplicates(linked_release, bloom):
+    report = check(linked_release, bloom=bloom)
+
+    assert report["dangling"] == [
+        {"node_type": "sample", "column": "cases.submitter_id", "target": "case", "value": "case_404", "count": 2},
+        {"node_type": "sample", "column": "cases.submitter_id", "target": "case", "value": "case_405", "count": 1},
+    ]
+    assert report["duplicates"] == [{"node_type": "case", "value": "case_3", "count": 3}]
+    assert report["unchecked"] == [{"node_type": "aliquot", "column": "analytes.submitter_id", "references": 1}]
+
+
+def test_bloom_false_positives_are_not_reported_as_duplicates(tmp_path):
+    # A Bloom key set this loose answers "maybe" for most of the second file,
+    # but only the submitter_id that really repeats is a duplicate
+    first = write_node(tmp_path / "case_1.tsv", [("case", f"case_{i}") for i in range(2000)])
+    second = write_node(tmp_path / "case_2.tsv", [("case", f"other_{i}") for i in range(2000)] + [("case", "case_7")])
+    checker = ReferentialIntegrityChecker(bloom=True, bloom_error_rate=0.9)
+    for path in (first, second):
+        checker.add_file(path)
+    candidates = sum(len(parts) for parts in checker.duplicates["case"])
+
+    report = checker.report()
+
+    assert candidates > 100
+    assert report["duplicates"] == [{"node_type": "case", "value": "case_7", "count": 2}]
+
+
+def test_analyzer_writes_the_integrity_report(release, tmp_path):
+    critical_data, data_dir = release
+    with open(os.path.join(data_dir, "lab_P-A.tsv"), 'a', encoding='utf-8') as f:
+        f.write("lab\tlab_0\tsubject_99\t\t\n")
+    analyzer = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7)
+    output_dir = tmp_path / "reports"
+    output_dir.mkdir()
+
+    analyzer.check_referential_integrity()
+    analyzer.generate_reports(output_dir=str(output_dir))
+
+    with open(output_dir / "referential_integrity.csv", newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ["Issue", "Node Type", "Column", "Target Node Type", "Value", "Count"],
+        ["dangling_reference", "lab", "subjects.submitter_id", "subject", "subject_99", "1"],
+        ["duplicate_submitter_id", "lab", "submitter_id", "", "lab_0", "2"],
+    ]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the stage and file metrics and their export"""
+
+import os
+import re
+import json
+
+from data_feature_analysis import DataFeatureAnalyzer
+from metrics import MetricsRecorder
+
+# One sample line of the Prometheus text format: name{labels} value
+SAMPLE_LINE = re.compile(r'^(data_feature_analysis_[a-z_]+)\{((?:[a-z]+="(?:[^"\\]|\\.)*",?)+)\} (\S+)$')
+
+
+def parse_prometheus(text):
+    """Samples by (metric name, labels text), checking that every family has its HELP and TYPE lines"""
+    samples = {}
+    declared = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line.split()[2:]
+            assert kind == "gauge"
+            declared.add(name)
+        elif not line.startswith("# HELP "):
+            match = SAMPLE_LINE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            assert name in declared
+            samples[(name, labels)] = float(value)
+    return samples
+
+
+def test_nested_stages_and_files_are_exported():
+    recorder = MetricsRecorder()
+    with recorder.stage("outer"):
+        with recorder.stage("inner"):
+            recorder.record_file('odd "name"\\.tsv', 100, 10, 0.5, 0.25, None)
+        recorder.add_io(50, 0)
+
+    samples = parse_prometheus(recorder.to_prometheus())
+
+    assert samples[("data_feature_analysis_stage_calls", 'stage="outer"')] == 1
+    assert samples[("data_feature_analysis_stage_bytes_read", 'stage="inner"')] == 100
+    assert samples[("data_feature_analysis_stage_bytes_read", 'stage="outer"')] == 50
+    assert samples[("data_feature_analysis_file_rows_per_second", 'stage="inner",file="odd \\"name\\"\\\\.tsv"')] == 20
+    # Unknown values are left out rather than exported as None
+    assert not any(name == "data_feature_analysis_file_peak_rss_bytes" for name, _ in samples)
+    assert ("data_feature_analysis_stage_rows_per_second", 'stage="outer"') not in samples
+
+
+def test_analyzer_metrics_cover_every_file(release, tmp_path):
+    critical_data, data_dir = release
+    analyzer = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7,
+                                   profile_stages=["calculate_coverage"], profile_dir=str(tmp_path))
+    analyzer.calculate_coverage()
+    analyzer.metrics.write(str(tmp_path / "metrics.prom"))
+    analyzer.metrics.write(str(tmp_path / "metrics.json"))
+
+    with open(tmp_path / "metrics.json", encoding='utf-8') as f:
+        metrics = json.load(f)
+    coverage = metrics["stages"]["calculate_coverage"]
+    files = metrics["files"]["calculate_coverage"]
+    assert coverage["rows"] == sum(record["rows"] for record in files.values()) == 110
+    assert coverage["bytes_read"] == sum(os.path.getsize(os.path.join(data_dir, name)) for name in files)
+    assert metrics["stages"]["get_nodes_features"]["calls"] == 1
+
+    samples = parse_prometheus((tmp_path / "metrics.prom").read_text(encoding='utf-8'))
+    assert samples[("data_feature_analysis_file_rows", 'stage="calculate_coverage",file="lab_P-A.tsv"')] == 60
+    assert (tmp_path / "calculate_coverage.prof").exists()
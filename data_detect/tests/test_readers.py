@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the compressed and memory-mapped node file readers"""
+
+import os
+import gzip
+import mmap
+
+import pandas as pd
+import pytest
+
+import readers
+from data_feature_analysis import DataFeatureAnalyzer, count_and_hash, count_non_null
+from readers import list_node_files, next_line_start, open_node_file, read_header
+from stats_cache import content_hash
+
+CONTENT = b"type\tsubmitter_id\tage\nsubject\tsubject_0\t41\nsubject\tsubject_1\t\nsubject\tsubject_2\t39\n"
+
+
+def compress(path, content, suffix):
+    """Write content to path + suffix, compressed by the suffix"""
+    target = str(path) + suffix
+    if suffix == ".gz":
+        with gzip.open(target, 'wb') as f:
+            f.write(content)
+    else:
+        zstandard = pytest.importorskip("zstandard")
+        with open(target, 'wb') as f:
+            f.write(zstandard.ZstdCompressor().compress(content))
+    return target
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".zst"])
+def test_compressed_files_read_like_plain_files(tmp_path, suffix):
+    plain = tmp_path / "subject.tsv"
+    plain.write_bytes(CONTENT)
+    compressed = compress(plain, CONTENT, suffix)
+
+    with open_node_file(compressed) as f:
+        assert f.read() == CONTENT
+    assert read_header(compressed) == read_header(str(plain)) == ["type", "submitter_id", "age"]
+    assert count_non_null(compressed, 2) == count_non_null(str(plain), 2) == \
+        ({"type": 3, "submitter_id": 3, "age": 2}, 3, None)
+    # The stats cache hashes the compressed bytes as they are read
+    counts, file_hash = count_and_hash(compressed, 2)
+    assert counts[:2] == ({"type": 3, "submitter_id": 3, "age": 2}, 3)
+    assert file_hash == content_hash(compressed)
+
+
+def test_zst_files_need_the_zstandard_package(tmp_path, monkeypatch):
+    path = tmp_path / "subject.tsv.zst"
+    path.write_bytes(b"")
+    monkeypatch.setattr(readers, "zstandard", None)
+
+    with pytest.raises(ImportError, match="pip install zstandard"):
+        open_node_file(str(path))
+
+
+def test_headers_of_empty_and_unterminated_files(tmp_path):
+    empty = tmp_path / "empty.tsv"
+    empty.write_bytes(b"")
+    header_only = tmp_path / "header.tsv"
+    header_only.write_bytes(b"type\tsubmitter_id")
+
+    assert read_header(str(empty)) == [""]
+    assert read_header(str(header_only)) == ["type", "submitter_id"]
+
+
+def test_next_line_start(tmp_path):
+    path = tmp_path / "subject.tsv"
+    path.write_bytes(CONTENT[:-1])
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        first_break = CONTENT.index(b"\n")
+        assert next_line_start(mm, 0) == first_break + 1
+        assert next_line_start(mm, first_break) == first_break + 1
+        assert next_line_start(mm, len(CONTENT) - 3) == len(CONTENT) - 1
+
+
+def test_compressed_release_has_the_coverage_of_the_plain_release(release, tmp_path):
+    critical_data, data_dir = release
+    plain = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7)
+    plain.calculate_coverage()
+
+    compressed_dir = tmp_path / "compressed"
+    compressed_dir.mkdir()
+    for file_name, suffix in (("subject_P-A.tsv", ".gz"), ("lab_P-A.tsv", ".gz"), ("visit_P-A.tsv", ".zst")):
+        with open(os.path.join(data_dir, file_name), 'rb') as f:
+            compress(compressed_dir / file_name, f.read(), suffix)
+    # Compressed files are never split into byte ranges
+    compressed = DataFeatureAnalyzer(critical_data, str(compressed_dir), chunk_size=7, workers=2, split_size=100)
+    compressed.calculate_coverage()
+
+    assert sorted(os.path.basename(path) for path in list_node_files(str(compressed_dir))) == \
+        ["lab_P-A.tsv.gz", "subject_P-A.tsv.gz", "visit_P-A.tsv.zst"]
+    # The files are listed in another order, so compare the rows as plain strings
+    frame = compressed.coverage_table.frame.astype({"feature": str, "file": str})
+    frame["file"] = frame["file"].str.replace(r"\.(gz|zst)$", "", regex=True)
+    expected = plain.coverage_table.frame.astype({"feature": str, "file": str})
+    pd.testing.assert_frame_equal(frame.sort_values(["file", "feature"]).reset_index(drop=True),
+                                  expected.sort_values(["file", "feature"]).reset_index(drop=True))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of sharded analysis, running one data_feature_analysis.py process per shard and merging them"""
+
+import os
+import gzip
+import random
+import subprocess
+import sys
+
+import pytest
+
+from conftest import CRITICAL_CSV
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_feature_analysis.py")
+
+SHARDS = 3
+
+
+def write_release(data_dir, files=9, rows=200):
+    """Write node files with sparse columns drawn from the critical and other features"""
+    rng = random.Random(17)
+    features = ["gender", "age", "glucose", "note", "visit_type", "days_to_visit", "weight"]
+    for index in range(files):
+        columns = ["type", "submitter_id"] + rng.sample(features, rng.randint(2, len(features)))
+        lines = ["\t".join(columns)]
+        for row in range(rows):
+            values = [f"node_{index}", f"node_{index}_{row}"]
+            values += ["" if rng.random() < 0.3 else str(rng.randint(0, 99)) for _ in columns[2:]]
+            lines.append("\t".join(values))
+        content = "\n".join(lines) + "\n"
+        # One compressed file, read like the plain ones
+        if index == 0:
+            with gzip.open(os.path.join(data_dir, f"node_{index}.tsv.gz"), 'wt', encoding='utf-8') as f:
+                f.write(content)
+        else:
+            with open(os.path.join(data_dir, f"node_{index}.tsv"), 'w', encoding='utf-8') as f:
+                f.write(content)
+
+
+def analyze(tmp_path, output_dir, *options):
+    """Run data_feature_analysis.py on the generated release"""
+    os.makedirs(output_dir, exist_ok=True)
+    return subprocess.Popen(
+        [sys.executable, SCRIPT, "--critical-data", str(tmp_path / "critical_data.csv"),
+         "--data-dir", str(tmp_path / "data"), "--output-dir", str(output_dir)] + list(options),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+
+
+def finish(process):
+    """Wait for an analysis process and check that it succeeded"""
+    stdout, stderr = process.communicate(timeout=120)
+    assert process.returncode == 0, stderr
+    assert "Error" not in stderr, stderr
+    return stdout
+
+
+@pytest.mark.parametrize("options", [[], ["--critical-only"], ["--column-profile"]])
+def test_merged_shards_match_a_single_run(tmp_path, options):
+    (tmp_path / "data").mkdir()
+    write_release(str(tmp_path / "data"))
+    (tmp_path / "critical_data.csv").write_text(CRITICAL_CSV, encoding="utf-8")
+
+    single = finish(analyze(tmp_path, tmp_path / "single", *options))
+    shards = [analyze(tmp_path, tmp_path / f"shard_{index}", *options, "--shard", f"{index}/{SHARDS}",
+                      "--partial-out", str(tmp_path / "partials" / f"shard_{index}.json"))
+              for index in range(SHARDS)]
+    for process in shards:
+        finish(process)
+    merged = finish(analyze(tmp_path, tmp_path / "merged", "--merge",
+                            *[str(tmp_path / "partials" / f"shard_{index}.json") for index in range(SHARDS)]))
+
+    reports = sorted(os.listdir(tmp_path / "single"))
+    assert "feature_coverage.csv" in reports
+    assert sorted(os.listdir(tmp_path / "merged")) == reports
+    for report in reports:
+        assert (tmp_path / "merged" / report).read_bytes() == (tmp_path / "single" / report).read_bytes(), report
+    assert merged.split("=====")[-1] == single.split("=====")[-1]
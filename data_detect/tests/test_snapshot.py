@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the release diff of stats snapshots"""
+
+from coverage_table import CoverageTable
+from snapshot import SNAPSHOT_VERSION, diff_coverage, diff_shapes
+
+
+def snapshot(release, critical_features, files):
+    """Snapshot of (file name, {feature: non-null count}, total count) files"""
+    table = CoverageTable.from_counts(
+        [(name, list(counts), counts, total) for name, counts, total in files if total is not None],
+        critical_features
+    )
+    return {
+        "version": SNAPSHOT_VERSION,
+        "release": release,
+        "critical_features": sorted(critical_features),
+        "files": {name: {"node": name, "columns": list(counts), "total_count": total} for name, counts, total in files},
+        "coverage": table.to_dict()
+    }
+
+
+def test_critical_feature_changes():
+    old = snapshot("v1", ["age", "gender", "glucose"],
+                   [("subject.tsv", {"age": 9, "gender": 10, "race": 2}, 10), ("lab.tsv", {"glucose": 1}, 10)])
+    new = snapshot("v2", ["age", "race", "weight"],
+                   [("subject.tsv", {"age": 5, "gender": 10, "race": 2}, 10), ("lab.tsv", {"glucose": 1}, 10)])
+
+    changes = dict(zip(*[diff_coverage([old, new], threshold=0.8)[column] for column in ("Critical Feature",
+                                                                                            "Change")]))
+
+    assert changes == {"age": "lost", "gender": "no longer critical", "glucose": "no longer critical",
+                       "race": "newly critical"}
+
+
+def test_unknown_row_counts_are_not_compared():
+    # Critical-only snapshots have no row count for files without critical features
+    old = snapshot("v1", ["age"], [("subject.tsv", {"age": 9}, 10), ("visit.tsv", {"visit_type": 3}, None)])
+    new = snapshot("v2", ["age"], [("subject.tsv", {"age": 9}, 12), ("visit.tsv", {"visit_type": 3}, 4)])
+
+    shapes = diff_shapes([old, new])
+
+    assert shapes["Node File"].tolist() == ["subject.tsv"]
+    assert shapes["Change"].tolist() == ["rows changed"]
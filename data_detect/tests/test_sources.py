@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of streaming node sources read again by the stage graph"""
+
+import os
+
+import pytest
+
+from data_feature_analysis import DataFeatureAnalyzer
+
+
+def chunks(text, size=50):
+    """One-shot iterator over the bytes of text"""
+    data = text.encode("utf-8")
+    return iter([data[start:start + size] for start in range(0, len(data), size)])
+
+
+def touch(path):
+    """Move the modification time of a file forward"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_iterator_sources_survive_critical_data_changes(release, exports):
+    critical_data, _ = release
+    analyzer = DataFeatureAnalyzer(critical_data, "unused", chunk_size=7,
+                                   sources={"subject.tsv": chunks(exports["subject"]), "lab.tsv": chunks(exports["lab"])})
+    analyzer.calculate_coverage()
+    rows = len(analyzer.coverage_table)
+    assert rows == 9
+
+    # The headers and counts do not depend on the critical features outside critical-only mode
+    touch(critical_data)
+    analyzer.calculate_coverage()
+
+    assert len(analyzer.coverage_table) == rows
+    assert sorted(analyzer.nodes_features) == ["lab.tsv", "subject.tsv"]
+
+
+def test_critical_only_iterator_sources_are_not_read_twice(release, exports):
+    critical_data, _ = release
+    analyzer = DataFeatureAnalyzer(critical_data, "unused", chunk_size=7, critical_only=True,
+                                   sources={"subject.tsv": chunks(exports["subject"]), "lab.tsv": lambda: chunks(exports["lab"])})
+    analyzer.calculate_coverage()
+    assert analyzer.critical_features_coverage["age"]["subject.tsv"]["non_null_count"] == 14
+
+    with open(critical_data, 'a', encoding='utf-8') as f:
+        f.write("submitter_id,,,Critical,,,,,,,submitter_id\n")
+    with pytest.raises(ValueError, match="subject.tsv"):
+        analyzer.calculate_coverage()
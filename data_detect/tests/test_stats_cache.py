@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the persistent stats cache"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from data_feature_analysis import DataFeatureAnalyzer
+from stats_cache import StatsCache
+
+
+def set_mtime(path, seconds):
+    """Set the modification time of a file"""
+    os.utime(path, (seconds, seconds))
+
+
+@pytest.fixture
+def node_file(tmp_path):
+    path = tmp_path / "subject.tsv"
+    path.write_text("type\tage\nsubject\t41\n", encoding="utf-8")
+    set_mtime(path, 1000)
+    return path
+
+
+def test_unchanged_files_hit_and_changed_files_miss(tmp_path, node_file):
+    cache = StatsCache(str(tmp_path / "cache"))
+    assert cache.get(str(node_file)) is None
+    cache.put(str(node_file), {"total_count": 1})
+
+    assert cache.get(str(node_file)) == {"total_count": 1}
+
+    # Touched but unchanged: the content hash matches
+    set_mtime(node_file, 2000)
+    assert cache.get(str(node_file)) == {"total_count": 1}
+
+    # Same size, new content
+    node_file.write_text("type\tage\nsubject\t42\n", encoding="utf-8")
+    set_mtime(node_file, 3000)
+    assert cache.get(str(node_file)) is None
+
+    node_file.write_text("type\tage\nsubject\t42\nsubject\t43\n", encoding="utf-8")
+    set_mtime(node_file, 2000)
+    assert cache.get(str(node_file)) is None
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_entries_survive_a_reload(tmp_path, node_file):
+    cache = StatsCache(str(tmp_path / "cache"))
+    cache.put(str(node_file), {"total_count": 1})
+    cache.save()
+
+    assert StatsCache(str(tmp_path / "cache")).get(str(node_file)) == {"total_count": 1}
+
+
+def test_least_recently_used_and_deleted_files_are_evicted(tmp_path):
+    cache = StatsCache(str(tmp_path / "cache"), max_entries=2)
+    paths = []
+    for name in ("a.tsv", "b.tsv", "c.tsv", "d.tsv"):
+        path = tmp_path / name
+        path.write_text("type\nsubject\n", encoding="utf-8")
+        cache.put(str(path), {"name": name})
+        paths.append(str(path))
+    for last_used, path in enumerate(paths):
+        cache.entries[os.path.abspath(path)]["last_used"] = last_used
+    # a.tsv is used again, d.tsv is deleted
+    cache.get(paths[0])
+    os.remove(paths[3])
+
+    cache.save()
+
+    assert sorted(cache.entries) == [os.path.abspath(paths[0]), os.path.abspath(paths[2])]
+    assert len(StatsCache(str(tmp_path / "cache")).entries) == 2
+
+
+def test_memory_only_cache_writes_nothing(tmp_path, node_file):
+    cache = StatsCache(None)
+    cache.put(str(node_file), {"total_count": 1})
+    cache.save()
+
+    assert cache.get(str(node_file)) == {"total_count": 1}
+    assert sorted(os.listdir(tmp_path)) == ["subject.tsv"]
+
+
+def test_rerun_reads_only_changed_files(release, tmp_path):
+    critical_data, data_dir = release
+    cache_dir = str(tmp_path / "cache")
+    first = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7, cache_dir=cache_dir)
+    first.calculate_coverage()
+    assert sorted(first.metrics.files["calculate_coverage"]) == ["lab_P-A.tsv", "subject_P-A.tsv", "visit_P-A.tsv"]
+
+    with open(os.path.join(data_dir, "visit_P-A.tsv"), 'a', encoding='utf-8') as f:
+        f.write("visit\tvisit_extra\t\n")
+    second = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7, cache_dir=cache_dir)
+    second.calculate_coverage()
+
+    assert sorted(second.metrics.files["calculate_coverage"]) == ["visit_P-A.tsv"]
+    rows = second.coverage_table.frame.set_index(["feature", "file"])
+    expected = first.coverage_table.frame.set_index(["feature", "file"])
+    pd.testing.assert_frame_equal(rows.drop(index="visit_P-A.tsv", level="file"),
+                                  expected.drop(index="visit_P-A.tsv", level="file"))
+    assert rows.loc[("visit_type", "visit_P-A.tsv"), "total_count"] == 11
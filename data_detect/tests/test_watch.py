@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of watch mode: refreshing the analysis after file changes and answering queries"""
+
+import os
+import json
+import time
+import threading
+import urllib.request
+from urllib.error import HTTPError
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from data_feature_analysis import DataFeatureAnalyzer
+from watch import AnalysisWatcher, QueryHandler
+
+
+@pytest.fixture
+def watched(release):
+    """Watcher of the release, created before the first analysis, with its query server"""
+    critical_data, data_dir = release
+    analyzer = DataFeatureAnalyzer(critical_data, data_dir, chunk_size=7, profile_columns=True)
+    watcher = AnalysisWatcher(analyzer, interval=0.05)
+    watcher.refresh()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QueryHandler)
+    server.watcher = watcher
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    watcher.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield watcher
+    watcher.stop()
+    server.shutdown()
+    server.server_close()
+
+
+def get(watcher, path, method="GET"):
+    """Send a query and return (status, JSON body)"""
+    request = urllib.request.Request(watcher.url + path, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def write_tsv(path, rows):
+    """Write a subject file with an age column"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("type\tsubmitter_id\tage\n")
+        f.writelines(f"subject\textra_{i}\t{'' if i % 2 else 30}\n" for i in range(rows))
+
+
+def test_queries(watched):
+    status, body = get(watched, "/coverage?feature=age")
+    assert status == 200
+    assert body["files"]["subject_P-A.tsv"] == {"coverage": 0.35, "non_null_count": 14, "total_count": 40}
+    assert body["is_critical"] and not body["meets_threshold"]
+
+    status, body = get(watched, "/existence?feature=glucose")
+    assert (status, body["exists"], body["files"]) == (200, "y", ["lab_P-A.tsv"])
+    assert get(watched, "/coverage?feature=unknown")[0] == 404
+    assert get(watched, "/coverage?feature=age&file=lab_P-A.tsv")[0] == 404
+    assert get(watched, "/summary")[1]["generation"] == 1
+    assert get(watched, "/nothing")[0] == 404
+
+    status, body = get(watched, "/refresh", method="POST")
+    assert (status, body["generation"]) == (200, 2)
+
+
+def test_refresh_parses_only_changed_files(watched):
+    analyzer = watched.analyzer
+    write_tsv(os.path.join(analyzer.data_dir, "extra_P-A.tsv"), 10)
+    analyzer.metrics.files.clear()
+
+    status = watched.refresh()
+
+    assert "calculate_coverage" in status["stages_run"]
+    # Counts and column profiles of the unchanged files come from the in-memory stats cache
+    assert list(analyzer.metrics.files["calculate_coverage"]) == ["extra_P-A.tsv"]
+    assert get(watched, "/coverage?feature=age&file=extra_P-A.tsv")[1]["files"]["extra_P-A.tsv"]["non_null_count"] == 5
+    assert "extra_P-A.tsv" in analyzer.column_profiles["age"]
+    assert "subject_P-A.tsv" in analyzer.column_profiles["age"]
+
+
+def test_watch_picks_up_settled_changes(watched):
+    thread = threading.Thread(target=watched.watch, daemon=True)
+    thread.start()
+    path = os.path.join(watched.analyzer.data_dir, "subject_P-A.tsv")
+    write_tsv(path, 8)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    deadline = time.time() + 10
+    while get(watched, "/status")[1]["generation"] < 2 and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert get(watched, "/status")[1]["generation"] == 2
+    assert get(watched, "/coverage?feature=age")[1]["files"]["subject_P-A.tsv"]["total_count"] == 8
+    # The change is applied once, after it settled
+    time.sleep(0.3)
+    assert get(watched, "/status")[1]["generation"] == 2
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Watch Mode
+
+This module keeps a DataFeatureAnalyzer in memory, polls its critical data
+file and data directory for changes, brings the analysis up to date when
+they change, and answers existence and coverage queries from memory over a
+local HTTP endpoint, on a TCP port or a Unix socket.
+"""
+
+import os
+import json
+import time
+import signal
+import socketserver
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, Optional, Tuple
+
+from stats_cache import StatsCache, DEFAULT_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two checks of the input files
+DEFAULT_INTERVAL = 2.0
+
+# Default address of the query endpoint
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class AnalysisWatcher:
+    """Keeps an analyzer up to date with its input files and answers queries from memory"""
+
+    def __init__(self, analyzer, interval: float = DEFAULT_INTERVAL, cache_max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the watcher
+
+        Create it before the first analysis, so the stats of every file are
+        cached from the start.
+
+        Parameters:
+            analyzer: DataFeatureAnalyzer reading node files from its data directory
+            interval: Seconds between two checks of the input files
+            cache_max_entries: Maximum number of files kept in the in-memory stats cache,
+                if the analyzer has no stats cache
+        """
+        self.analyzer = analyzer
+        self.interval = interval
+        if analyzer.stats_cache is None:
+            # Keep per-file stats in memory so only new or changed files are parsed again
+            analyzer.stats_cache = StatsCache(None, cache_max_entries)
+        # Query results of the latest analysis; replaced as a whole so queries never see a partial update
+        self.view: Dict[str, Any] = {}
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def refresh(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Bring the analysis up to date and publish a new query view
+
+        Memoized stages only run again for changed inputs, and the stats
+        cache limits the parsing to new or changed node files.
+
+        Parameters:
+            force: Drop the memoized stage results first
+
+        Returns:
+            Status of the new view
+        """
+        with self._lock:
+            started = time.perf_counter()
+            analyzer = self.analyzer
+            if force:
+                analyzer.invalidate()
+            runs_before = dict(analyzer.stage_graph.runs)
+            input_state = analyzer.input_state()
+            existence = analyzer.analyze_feature_existence()
+            table = analyzer.calculate_coverage()
+
+            coverage: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for feature, file_name, non_null_count, total_count, file_coverage in zip(
+                    table.frame["feature"], table.frame["file"], table.frame["non_null_count"],
+                    table.frame["total_count"], table.frame["coverage"]):
+                coverage.setdefault(feature, {})[file_name] = {
+                    "coverage": float(file_coverage),
+                    "non_null_count": int(non_null_count),
+                    "total_count": int(total_count)
+                }
+
+            self.generation += 1
+            self.view = {
+                "generation": self.generation,
+                "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "refresh_seconds": time.perf_counter() - started,
+                "input_state": input_state,
+                "files": len(analyzer.nodes_features),
+                "stages_run": sorted(name for name, count in analyzer.stage_graph.runs.items()
+                                     if count != runs_before.get(name, 0)),
+                "summary": analyzer.summary(),
+                "threshold": analyzer.coverage_threshold,
+                "critical_features": set(analyzer.mapped_critical_features),
+                "feature_index": analyzer.feature_index,
+                "existence": existence,
+                "coverage": coverage,
+                "average_coverage": {str(feature): float(value) for feature, value in
+                                     table.average_coverage(critical_only=False).items()}
+            }
+            logger.info(f"Analysis generation {self.generation} ready in {self.view['refresh_seconds']:.3f}s "
+                        f"(stages run: {', '.join(self.view['stages_run']) or 'none'})")
+            return self.status()
+
+    def watch(self) -> None:
+        """
+        Poll the input files until stop() is called, refreshing the analysis after changes
+
+        A change is picked up once the input files have stayed the same for one
+        interval, so files that are still being copied are not read half-written.
+        """
+        seen = self.view.get("input_state")
+        while not self._stop.wait(self.interval):
+            try:
+                state = self.analyzer.input_state()
+                if state != seen:
+                    seen = state
+                    continue
+                if state != self.view.get("input_state"):
+                    logger.info("Input files changed, updating the analysis...")
+                    self.refresh()
+            except Exception as e:
+                logger.error(f"Error updating the analysis: {str(e)}")
+
+    def stop(self) -> None:
+        """Stop the watch loop"""
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the status of the current view
+
+        Returns:
+            Dictionary with the generation, update time, refresh time, file count and stages run
+        """
+        view = self.view
+        return {key: view.get(key) for key in ("generation", "updated", "refresh_seconds", "files", "stages_run")}
+
+    def query(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Answer a query from the current view
+
+        Parameters:
+            path: Query path: /status, /summary, /existence or /coverage
+            params: Query parameters; feature (and file for /coverage)
+
+        Returns:
+            Tuple of (HTTP status, JSON-serializable response)
+        """
+        view = self.view
+        if not view:
+            return 503, {"error": "The analysis is not ready yet"}
+        feature = params.get("feature")
+
+        if path == "/status":
+            return 200, self.status()
+
+        if path == "/summary":
+            return 200, dict(view["summary"], threshold=view["threshold"], generation=view["generation"])
+
+        if path == "/existence":
+            if feature is None:
+                return 200, {"generation": view["generation"], "features": view["existence"]}
+            files = view["feature_index"].files_for(feature)
+            return 200, {
+                "generation": view["generation"],
+                "feature": feature,
+                "is_critical": feature in view["critical_features"],
+                "exists": "y" if files else "n",
+                "files": files
+            }
+
+        if path == "/coverage":
+            if feature is None:
+                return 200, {
+                    "generation": view["generation"],
+                    "threshold": view["threshold"],
+                    "features": {name: value for name, value in view["average_coverage"].items()
+                                 if name in view["critical_features"]}
+                }
+            if feature not in view["coverage"]:
+                return 404, {"error": f"Feature {feature} is not in any node file"}
+            files = view["coverage"][feature]
+            file_name = params.get("file")
+            if file_name is not None:
+                if file_name not in files:
+                    return 404, {"error": f"Feature {feature} is not in {file_name}"}
+                files = {file_name: files[file_name]}
+            average = view["average_coverage"][feature]
+            return 200, {
+                "generation": view["generation"],
+                "feature": feature,
+                "is_critical": feature in view["critical_features"],
+                "average_coverage": average,
+                "meets_threshold": average >= view["threshold"],
+                "files": files
+            }
+
+        return 404, {"error": f"Unknown query {path}; use /status, /summary, /existence or /coverage"}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """HTTP handler answering queries with the watcher of its server"""
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            status, body = self.server.watcher.query(url.path.rstrip("/") or "/", params)
+        except Exception as e:
+            logger.error(f"Error answering query {self.path}: {str(e)}")
+            status, body = 500, {"error": str(e)}
+        self._send(status, body)
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path.rstrip("/") != "/refresh":
+            self._send(404, {"error": f"Unknown command {self.path}; use /refresh"})
+            return
+        try:
+            self._send(200, self.server.watcher.refresh(force=True))
+        except Exception as e:
+            logger.error(f"Error refreshing the analysis: {str(e)}")
+            self._send(500, {"error": str(e)})
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
+
+
+def _interrupt(signum, frame) -> None:
+    """Stop serving on SIGTERM like on Ctrl-C"""
+    raise KeyboardInterrupt
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a Unix socket"""
+
+    daemon_threads = True
+
+
+def serve(watcher: AnalysisWatcher, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          socket_path: Optional[str] = None) -> None:
+    """
+    Keep the analysis of a watcher up to date and serve queries until interrupted
+
+    Parameters:
+        watcher: AnalysisWatcher of the analyzer
+        host: Address of the HTTP endpoint
+        port: Port of the HTTP endpoint
+        socket_path: Serve on this Unix socket instead of a TCP port
+    """
+    analyzer = watcher.analyzer
+    watcher.refresh()
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, QueryHandler)
+        address = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), QueryHandler)
+        address = f"http://{host}:{server.server_address[1]}"
+    server.watcher = watcher
+
+    watch_thread = threading.Thread(target=watcher.watch, name="watch", daemon=True)
+    watch_thread.start()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _interrupt)
+    logger.info(f"Watching {analyzer.data_dir} and {analyzer.critical_data_path}; queries served on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping watch mode")
+    finally:
+        watcher.stop()
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
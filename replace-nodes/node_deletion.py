@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Bulk Node Deletion
+
+This module deletes the records of many (program, project, node_type) targets.
+Targets are ordered with the Gen3 dictionary hierarchy so that child nodes are
+deleted before their parents, and independent targets run concurrently.
+"""
+
+import os
+import csv
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Optional, Tuple
+
+from submission_client import RateLimiter, call_with_retry, run_query
+
+logger = logging.getLogger(__name__)
+
+# Number of records queried and deleted per request
+DEFAULT_BATCH_SIZE = 100
+
+# (program, project, node_type)
+Target = Tuple[str, str, str]
+
+
+def parse_target(value: str) -> Target:
+    """
+    Parse a target written as program/project/node_type
+
+    Parameters:
+        value: Target string
+
+    Returns:
+        Tuple of (program, project, node_type)
+    """
+    parts = [part.strip() for part in value.split("/")]
+    if len(parts) != 3 or not all(parts):
+        raise ValueError(f"Invalid target '{value}', expected program/project/node_type")
+    return tuple(parts)
+
+
+def load_manifest(manifest_path: str) -> List[Target]:
+    """
+    Load targets from a manifest file
+
+    CSV and TSV manifests need program, project and node_type columns; JSON
+    manifests are a list of objects with the same keys or of target strings.
+
+    Parameters:
+        manifest_path: Path to the manifest file (.csv, .tsv or .json)
+
+    Returns:
+        List of targets in file order
+    """
+    if manifest_path.endswith(".json"):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        return [
+            parse_target(entry) if isinstance(entry, str)
+            else (entry["program"], entry["project"], entry["node_type"])
+            for entry in entries
+        ]
+
+    delimiter = '\t' if manifest_path.endswith(".tsv") else ','
+    with open(manifest_path, 'r', encoding='utf-8', newline='') as f:
+        return [
+            (row["program"].strip(), row["project"].strip(), row["node_type"].strip())
+            for row in csv.DictReader(f, delimiter=delimiter)
+            if row.get("node_type")
+        ]
+
+
+def _link_targets(links: List[Dict[str, Any]]) -> List[str]:
+    """Collect the target node types of a dictionary links list, including subgroups"""
+    targets = []
+    for link in links or []:
+        if "subgroup" in link:
+            targets.extend(_link_targets(link["subgroup"]))
+        elif "target_type" in link:
+            targets.append(link["target_type"])
+    return targets
+
+
+def node_levels(dictionary: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Compute the depth of every node type in the dictionary graph
+
+    program is at level 0 and every other node is one level below its deepest
+    parent, so deleting in decreasing level order removes children first.
+
+    Parameters:
+        dictionary: Dictionary schema as returned by Gen3Submission.get_dictionary_all
+
+    Returns:
+        Dictionary mapping node types to levels
+    """
+    parents = {
+        node: _link_targets(schema.get("links"))
+        for node, schema in dictionary.items()
+        if not node.startswith("_") and isinstance(schema, dict)
+    }
+    levels: Dict[str, int] = {}
+
+    def level(node: str, visiting: frozenset) -> int:
+        if node in levels:
+            return levels[node]
+        known_parents = [p for p in parents.get(node, []) if p in parents and p not in visiting]
+        result = 0 if not known_parents else 1 + max(level(p, visiting | {node}) for p in known_parents)
+        levels[node] = result
+        return result
+
+    for node in parents:
+        level(node, frozenset())
+    return levels
+
+
+def load_dictionary(submission, dictionary_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load the dictionary schema from a file or from the commons
+
+    Parameters:
+        submission: Gen3Submission instance
+        dictionary_path: Path to a dictionary JSON file; fetched from the commons if None
+
+    Returns:
+        Dictionary schema
+    """
+    if dictionary_path:
+        with open(dictionary_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return submission.get_dictionary_all()
+
+
+def delete_target(submission, target: Target, batch_size: int = DEFAULT_BATCH_SIZE, retries: int = 3,
+                  backoff: float = 1.0, rate_limiter: Optional[RateLimiter] = None,
+                  dry_run: bool = False) -> int:
+    """
+    Delete every record of one node type from a project
+
+    This is the query-and-delete loop of Gen3Submission.delete_node, written
+    out so that every request goes through call_with_retry and the shared
+    rate limiter: delete_node sends its requests without retries or rate
+    limiting, prints its progress and returns no record count.
+
+    Parameters:
+        submission: Gen3Submission instance
+        target: Tuple of (program, project, node_type)
+        batch_size: Number of records queried and deleted per request
+        retries: Number of retries per request
+        backoff: Initial retry delay in seconds
+        rate_limiter: Rate limiter shared by all workers
+        dry_run: Only count the records that would be deleted
+
+    Returns:
+        Number of records deleted (or found, in dry-run mode)
+    """
+    program, project, node_type = target
+    project_id = f"{program}-{project}"
+
+    if dry_run:
+        query = f'{{ _{node_type}_count(project_id: "{project_id}") }}'
+        result = call_with_retry(run_query, submission, query, retries=retries, backoff=backoff,
+                                 rate_limiter=rate_limiter)
+        return int(result["data"][f"_{node_type}_count"])
+
+    deleted = 0
+    first_uuid = None
+    while True:
+        query = f'{{ {node_type}(first: {batch_size}, project_id: "{project_id}") {{ id }} }}'
+        result = call_with_retry(run_query, submission, query, retries=retries, backoff=backoff,
+                                 rate_limiter=rate_limiter)
+        uuids = [record["id"] for record in result["data"][node_type]]
+        if not uuids:
+            return deleted
+        # The same first record after a delete means the delete did not take effect
+        if uuids[0] == first_uuid:
+            raise RuntimeError(f"Records of {node_type} are not being deleted (first id {first_uuid})")
+        first_uuid = uuids[0]
+
+        call_with_retry(submission.delete_records, program, project, uuids, batch_size,
+                        retries=retries, backoff=backoff, rate_limiter=rate_limiter)
+        deleted += len(uuids)
+        logger.info(f"{'/'.join(target)}: deleted {deleted} records")
+
+
+def delete_targets(submission, targets: List[Target], levels: Dict[str, int], workers: int = 4,
+                   **delete_options) -> List[Dict[str, Any]]:
+    """
+    Delete many targets concurrently, children before parents
+
+    A target starts once every target of the same program/project at a deeper
+    level has finished. If a target fails, the shallower targets of its project
+    are skipped, since their records may still be referenced. Node types that
+    are not in the dictionary are treated as leaves.
+
+    Parameters:
+        submission: Gen3Submission instance
+        targets: List of (program, project, node_type) targets
+        levels: Node levels from node_levels
+        workers: Maximum number of targets deleted at the same time
+        delete_options: Keyword arguments passed to delete_target
+
+    Returns:
+        List of result dictionaries in target order, with target, status, records, seconds and error
+    """
+    targets = list(dict.fromkeys(targets))
+    leaf_level = max(levels.values(), default=0) + 1
+    for target in targets:
+        if target[2] not in levels:
+            logger.warning(f"Node type '{target[2]}' is not in the dictionary, deleting it as a leaf")
+
+    def target_level(target: Target) -> int:
+        return levels.get(target[2], leaf_level)
+
+    results = {target: {"target": "/".join(target), "status": "pending", "records": 0, "seconds": 0.0,
+                        "error": ""} for target in targets}
+    pending = list(targets)
+    failed_projects: Dict[Tuple[str, str], int] = {}
+    running = {}
+
+    def run(target: Target) -> int:
+        start = time.perf_counter()
+        try:
+            return delete_target(submission, target, **delete_options)
+        finally:
+            results[target]["seconds"] = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            blocked = {(t[0], t[1], target_level(t)) for t in pending} | \
+                      {(t[0], t[1], target_level(t)) for t in running.values()}
+            for target in list(pending):
+                program, project, _ = target
+                level = target_level(target)
+                failed_level = failed_projects.get((program, project))
+                if failed_level is not None and level < failed_level:
+                    pending.remove(target)
+                    results[target].update(status="skipped",
+                                           error="a deeper node of the same project failed to delete")
+                    continue
+                if any(p == program and q == project and l > level for p, q, l in blocked):
+                    continue
+                pending.remove(target)
+                logger.info(f"Deleting {'/'.join(target)}")
+                running[executor.submit(run, target)] = target
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                target = running.pop(future)
+                try:
+                    results[target].update(status="dry-run" if delete_options.get("dry_run") else "deleted",
+                                           records=future.result())
+                except Exception as e:
+                    logger.error(f"Error deleting {'/'.join(target)}: {str(e)}")
+                    results[target].update(status="failed", error=str(e))
+                    key = (target[0], target[1])
+                    failed_projects[key] = max(failed_projects.get(key, 0), target_level(target))
+
+    return [results[target] for target in targets]
+
+
+def write_results(results: List[Dict[str, Any]], output_path: str) -> None:
+    """
+    Write deletion results to a CSV file
+
+    Parameters:
+        results: Result dictionaries from delete_targets
+        output_path: Output CSV file path
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["target", "status", "records", "seconds", "error"])
+        writer.writeheader()
+        writer.writerows(results)
+    logger.info(f"Deletion results written to {output_path}")
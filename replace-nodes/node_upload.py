@@ -0,0 +1,551 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Bulk Node Upload
+
+This module streams release TSV files into the Gen3 submission API in
+batches, with several batches in flight, and records acknowledged batches in
+a checkpoint file so an interrupted upload resumes where it stopped.
+"""
+
+import os
+import io
+import csv
+import gzip
+import json
+import glob
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Optional, Iterator, Tuple, TextIO
+
+import requests
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, only needed for .tsv.zst release files
+    zstandard = None
+
+from submission_client import RateLimiter, SubmissionRejected, call_with_retry
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the checkpoint file changes
+CHECKPOINT_VERSION = 1
+
+# Number of records submitted per request
+DEFAULT_UPLOAD_BATCH_SIZE = 50
+
+# Number of batch requests in flight per file
+DEFAULT_IN_FLIGHT = 4
+
+# Number of entity errors quoted in a failed batch message
+MAX_QUOTED_ERRORS = 3
+
+# Acknowledged batches and seconds between two checkpoint writes while a file is uploaded;
+# batches acknowledged after the last write are sent again on resume, which updates the same records
+CHECKPOINT_SAVE_BATCHES = 20
+CHECKPOINT_SAVE_SECONDS = 5.0
+
+# Release file name patterns, as read by data_detect
+RELEASE_FILE_PATTERNS = ("*.tsv", "*.tsv.gz", "*.tsv.zst")
+
+
+class UploadCheckpoint:
+    """On-disk record of deleted targets and acknowledged upload batches"""
+
+    def __init__(self, checkpoint_path: str, save_batches: int = CHECKPOINT_SAVE_BATCHES,
+                 save_seconds: float = CHECKPOINT_SAVE_SECONDS):
+        """
+        Initialize the checkpoint, loading it if the file exists
+
+        Parameters:
+            checkpoint_path: Path to the checkpoint JSON file
+            save_batches: Acknowledged batches after which ack writes the checkpoint
+            save_seconds: Seconds after the last write after which ack writes the checkpoint
+        """
+        self.checkpoint_path = checkpoint_path
+        self.save_batches = save_batches
+        self.save_seconds = save_seconds
+        self.targets: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        # Acknowledged batches not written yet, and time of the last write
+        self.unsaved = 0
+        self.saved_at = time.monotonic()
+        self.load()
+
+    def load(self) -> None:
+        """
+        Load the checkpoint from disk, starting empty if it is missing or unreadable
+        """
+        if not os.path.exists(self.checkpoint_path):
+            return
+
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CHECKPOINT_VERSION:
+                self.targets = data.get("targets", {})
+                logger.info(f"Resuming from checkpoint {self.checkpoint_path}")
+            else:
+                logger.info("Checkpoint version changed, starting over")
+        except Exception as e:
+            logger.error(f"Error loading checkpoint {self.checkpoint_path}: {str(e)}")
+
+    def save(self) -> None:
+        """
+        Write the checkpoint to disk
+        """
+        with self.lock:
+            directory = os.path.dirname(self.checkpoint_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = self.checkpoint_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": CHECKPOINT_VERSION, "targets": self.targets}, f, indent=1)
+            # Replace atomically so an interrupted run never leaves a broken checkpoint
+            os.replace(temp_path, self.checkpoint_path)
+            self.unsaved = 0
+            self.saved_at = time.monotonic()
+
+    def target_state(self, target_key: str) -> Dict[str, Any]:
+        """
+        Get the state of a target, creating it if needed
+
+        Parameters:
+            target_key: Target as program/project/node_type
+
+        Returns:
+            Dictionary with "deleted", "uploaded" and "files" entries
+        """
+        with self.lock:
+            return self.targets.setdefault(target_key, {"deleted": False, "uploaded": False, "files": {}})
+
+    def file_state(self, target_key: str, file_path: str, batch_size: int) -> Dict[str, Any]:
+        """
+        Get the upload state of a file, starting over if the file changed
+
+        A resumed file keeps the batch size it was started with, so batch
+        numbers keep referring to the same rows.
+
+        Parameters:
+            target_key: Target as program/project/node_type
+            file_path: Path to the release TSV file
+            batch_size: Batch size used for files without a state
+
+        Returns:
+            Dictionary with "size", "mtime_ns", "batch_size", "acked_through" and "acked" entries
+        """
+        stat = os.stat(file_path)
+        files = self.target_state(target_key)["files"]
+        with self.lock:
+            state = files.get(file_path)
+            if state is not None and (state["size"] != stat.st_size or state["mtime_ns"] != stat.st_mtime_ns):
+                logger.warning(f"{file_path} changed since the checkpoint was written, uploading it again")
+                state = None
+            if state is None:
+                state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "batch_size": batch_size,
+                         "acked_through": 0, "acked": []}
+                files[file_path] = state
+            return state
+
+    def release_changed(self, target_key: str, file_paths: List[str]) -> bool:
+        """
+        Check whether the release files of a target changed since the checkpoint recorded them
+
+        Parameters:
+            target_key: Target as program/project/node_type
+            file_paths: Current release files of the target
+
+        Returns:
+            True if a recorded file changed or disappeared, or, for an uploaded target,
+            if the set of release files is different
+        """
+        with self.lock:
+            state = self.targets.get(target_key)
+            if state is None:
+                return False
+            for file_path, file_state in state["files"].items():
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    return True
+                if file_state["size"] != stat.st_size or file_state["mtime_ns"] != stat.st_mtime_ns:
+                    return True
+            return state["uploaded"] and set(state["files"]) != set(file_paths)
+
+    def forget(self, target_keys: List[str]) -> None:
+        """
+        Drop the state of targets and save the checkpoint, removing the file once no target is left
+
+        Parameters:
+            target_keys: Targets as program/project/node_type
+        """
+        with self.lock:
+            for target_key in target_keys:
+                self.targets.pop(target_key, None)
+            empty = not self.targets
+        if empty:
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+        else:
+            self.save()
+
+    def is_acked(self, state: Dict[str, Any], batch: int) -> bool:
+        """
+        Check whether a batch of a file was acknowledged
+
+        Parameters:
+            state: File state from file_state
+            batch: Batch number
+
+        Returns:
+            True if the batch was acknowledged
+        """
+        with self.lock:
+            return batch < state["acked_through"] or batch in state["acked"]
+
+    def ack(self, state: Dict[str, Any], batch: int) -> None:
+        """
+        Mark a batch of a file as acknowledged, saving the checkpoint every few batches
+
+        Batches finish out of order, so acknowledged batches past the first
+        missing one are kept in a list until the gap is filled. The checkpoint
+        is written after save_batches batches or save_seconds seconds, and by
+        upload_file once a file is done or interrupted.
+
+        Parameters:
+            state: File state from file_state
+            batch: Batch number
+        """
+        with self.lock:
+            acked = set(state["acked"])
+            acked.add(batch)
+            while state["acked_through"] in acked:
+                acked.discard(state["acked_through"])
+                state["acked_through"] += 1
+            state["acked"] = sorted(acked)
+            self.unsaved += 1
+            due = self.unsaved >= self.save_batches or time.monotonic() - self.saved_at >= self.save_seconds
+        if due:
+            self.save()
+
+
+def find_release_files(data_dir: str, node_type: str) -> List[str]:
+    """
+    Find the release TSV files holding records of a node type
+
+    The node type is read from the *type column of the first record, since
+    file names do not always match node names (e.g. follow-up_*.tsv).
+    Plain .tsv files and .tsv.gz/.tsv.zst compressed files are included.
+
+    Parameters:
+        data_dir: Directory containing the release tsv files
+        node_type: Node type
+
+    Returns:
+        Sorted list of file paths
+    """
+    file_paths = []
+    for pattern in RELEASE_FILE_PATTERNS:
+        file_paths.extend(glob.glob(os.path.join(data_dir, pattern)))
+    matches = []
+    for file_path in sorted(file_paths):
+        try:
+            with open_release_file(file_path) as f:
+                header = _clean_header(f.readline())
+                first_record = f.readline().rstrip("\r\n").split("\t")
+            if "type" in header and len(first_record) > header.index("type") and \
+                    first_record[header.index("type")] == node_type:
+                matches.append(file_path)
+        except Exception as e:
+            logger.error(f"Error reading {file_path}: {str(e)}")
+    return matches
+
+
+def open_release_file(file_path: str) -> TextIO:
+    """
+    Open a release TSV file for reading text, decompressing .gz and .zst files on the fly
+
+    Parameters:
+        file_path: Path to the release file
+
+    Returns:
+        Text file object
+    """
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, 'rt', encoding='utf-8')
+    if file_path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("The zstandard package is required to read .zst files: pip install zstandard")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True),
+                                encoding='utf-8')
+    return open(file_path, 'r', encoding='utf-8')
+
+
+def _clean_header(line: str) -> List[str]:
+    """Split a TSV header line, removing the leading * of required columns"""
+    return [column.lstrip("*") for column in line.rstrip("\r\n").split("\t")]
+
+
+def iter_batches(file_path: str, project_id: str, batch_size: int) -> Iterator[Tuple[int, str]]:
+    """
+    Stream a release TSV file (plain or compressed) as batches of TSV text
+
+    Lines are passed through unchanged apart from the header, and only
+    records of the given project are kept when the file has a project_id
+    column.
+
+    Parameters:
+        file_path: Path to the release tsv file
+        project_id: Project ID (program-project) of the target
+        batch_size: Number of records per batch
+
+    Returns:
+        Iterator of (number of records, TSV text with header) tuples
+    """
+    with open_release_file(file_path) as f:
+        header = _clean_header(f.readline())
+        header_line = "\t".join(header) + "\n"
+        project_index = header.index("project_id") if "project_id" in header else None
+
+        lines = []
+        for line in f:
+            if not line.strip():
+                continue
+            if project_index is not None:
+                values = line.rstrip("\r\n").split("\t")
+                if len(values) > project_index and values[project_index] != project_id:
+                    continue
+            lines.append(line if line.endswith("\n") else line + "\n")
+            if len(lines) == batch_size:
+                yield len(lines), header_line + "".join(lines)
+                lines = []
+        if lines:
+            yield len(lines), header_line + "".join(lines)
+
+
+def submit_batch(submission, program: str, project: str, tsv_text: str) -> Dict[str, Any]:
+    """
+    Submit one batch of TSV records
+
+    Server errors, 408 and 429 raise HTTPErrors that are retried; rejected
+    records raise SubmissionRejected, which is not.
+
+    Parameters:
+        submission: SubmissionClient instance
+        program: Program name
+        project: Project code
+        tsv_text: TSV text with header
+
+    Returns:
+        Submission API response
+    """
+    response = requests.put(submission.project_url(program, project), auth=submission.auth, data=tsv_text.encode('utf-8'),
+                            headers={"content-type": "text/tab-separated-values"})
+    if response.status_code >= 500 or response.status_code in (408, 429):
+        response.raise_for_status()
+
+    try:
+        result = response.json()
+    except ValueError:
+        result = {"message": response.text}
+    if response.status_code != 200 or result.get("code", 200) != 200 or result.get("success") is False:
+        errors = [
+            f"{(entity.get('unique_keys') or [{}])[0].get('submitter_id', '')}: {entity['errors'][0].get('message')}"
+            for entity in result.get("entities", []) if entity.get("errors")
+        ]
+        message = "; ".join(errors[:MAX_QUOTED_ERRORS]) or result.get("message", response.text)
+        if len(errors) > MAX_QUOTED_ERRORS:
+            message += f" (and {len(errors) - MAX_QUOTED_ERRORS} more)"
+        raise SubmissionRejected(f"{response.status_code} rejected: {message}")
+    return result
+
+
+def upload_file(submission, target: Tuple[str, str, str], file_path: str, checkpoint: UploadCheckpoint,
+                batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE, in_flight: int = DEFAULT_IN_FLIGHT,
+                retries: int = 3, backoff: float = 1.0,
+                rate_limiter: Optional[RateLimiter] = None) -> List[Dict[str, Any]]:
+    """
+    Upload a release TSV file in batches, skipping batches acknowledged by the checkpoint
+
+    Parameters:
+        submission: SubmissionClient instance
+        target: Tuple of (program, project, node_type)
+        file_path: Path to the release tsv file
+        checkpoint: Upload checkpoint
+        batch_size: Number of records per batch for files not started yet
+        in_flight: Maximum number of batch requests in flight
+        retries: Number of retries per request
+        backoff: Initial retry delay in seconds
+        rate_limiter: Rate limiter shared with other requests
+
+    Returns:
+        List of batch result dictionaries with file, batch, records, status, seconds, records_per_second and error
+    """
+    program, project, _ = target
+    target_key = "/".join(target)
+    state = checkpoint.file_state(target_key, file_path, batch_size)
+    batch_results = []
+
+    def send(batch: int, records: int, tsv_text: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = {"file": os.path.basename(file_path), "batch": batch, "records": records, "status": "ok",
+                  "seconds": 0.0, "records_per_second": None, "error": ""}
+        try:
+            call_with_retry(submit_batch, submission, program, project, tsv_text,
+                            retries=retries, backoff=backoff, rate_limiter=rate_limiter)
+            checkpoint.ack(state, batch)
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+        result["seconds"] = time.perf_counter() - start
+        if result["status"] == "ok" and result["seconds"] > 0:
+            result["records_per_second"] = records / result["seconds"]
+        return result
+
+    def collect(futures: set, return_when: str) -> set:
+        done, not_done = wait(futures, return_when=return_when)
+        for future in done:
+            result = future.result()
+            batch_results.append(result)
+            if result["status"] == "ok":
+                logger.info(f"{target_key} {result['file']} batch {result['batch']}: {result['records']} records "
+                            f"in {result['seconds']:.2f}s ({result['records_per_second']:.1f} records/s)")
+            else:
+                logger.error(f"{target_key} {result['file']} batch {result['batch']} failed: {result['error']}")
+        return not_done
+
+    skipped = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, in_flight)) as executor:
+            futures = set()
+            for batch, (records, tsv_text) in enumerate(iter_batches(file_path, f"{program}-{project}",
+                                                                    state["batch_size"])):
+                if checkpoint.is_acked(state, batch):
+                    skipped += 1
+                    continue
+                if len(futures) >= in_flight:
+                    futures = collect(futures, FIRST_COMPLETED)
+                futures.add(executor.submit(send, batch, records, tsv_text))
+            collect(futures, ALL_COMPLETED)
+    finally:
+        # Write the batches acknowledged since the last periodic save, also when interrupted
+        checkpoint.save()
+
+    if skipped:
+        logger.info(f"{target_key} {os.path.basename(file_path)}: skipped {skipped} batches acknowledged earlier")
+    return sorted(batch_results, key=lambda result: result["batch"])
+
+
+def reset_changed_targets(checkpoint: UploadCheckpoint, targets: List[Tuple[str, str, str]],
+                          data_dir: str) -> List[str]:
+    """
+    Drop the checkpoint state of targets whose release files changed since the checkpoint was written
+
+    Such targets are deleted and uploaded again from the start, so records
+    uploaded from the old files do not remain.
+
+    Parameters:
+        checkpoint: Upload checkpoint
+        targets: List of (program, project, node_type) targets
+        data_dir: Directory containing the release tsv files
+
+    Returns:
+        Targets that were reset, as program/project/node_type
+    """
+    changed = []
+    for target in dict.fromkeys(targets):
+        target_key = "/".join(target)
+        if checkpoint.release_changed(target_key, find_release_files(data_dir, target[2])):
+            logger.warning(f"Release files of {target_key} changed since the checkpoint was written, "
+                           f"replacing it from the start")
+            changed.append(target_key)
+    if changed:
+        checkpoint.forget(changed)
+    return changed
+
+
+def upload_targets(submission, targets: List[Tuple[str, str, str]], levels: Dict[str, int], data_dir: str,
+                   checkpoint: UploadCheckpoint, **upload_options) -> Dict[str, Any]:
+    """
+    Upload the release files of deleted targets, parents before children
+
+    Once every target is uploaded, their state is dropped from the checkpoint
+    (and the file removed when it holds no other targets), so running the same
+    command again replaces the targets again.
+
+    Parameters:
+        submission: SubmissionClient instance
+        targets: List of (program, project, node_type) targets
+        levels: Node levels from node_deletion.node_levels
+        data_dir: Directory containing the release tsv files
+        checkpoint: Upload checkpoint
+        upload_options: Keyword arguments passed to upload_file
+
+    Returns:
+        Dictionary with "targets" (per-target summaries) and "batches" (all batch results)
+    """
+    leaf_level = max(levels.values(), default=0) + 1
+    ordered = sorted(dict.fromkeys(targets), key=lambda target: levels.get(target[2], leaf_level))
+    summaries = []
+    all_batches = []
+
+    for target in ordered:
+        target_key = "/".join(target)
+        target_state = checkpoint.target_state(target_key)
+        summary = {"target": target_key, "status": "", "files": 0, "records": 0, "failed_batches": 0,
+                   "seconds": 0.0}
+        summaries.append(summary)
+        if target_state["uploaded"]:
+            summary["status"] = "done earlier"
+            continue
+        if not target_state["deleted"]:
+            summary["status"] = "not deleted"
+            continue
+
+        files = find_release_files(data_dir, target[2])
+        if not files:
+            logger.warning(f"No release file with {target[2]} records found in {data_dir}")
+        start = time.perf_counter()
+        for file_path in files:
+            logger.info(f"Uploading {file_path} to {target_key}")
+            batches = upload_file(submission, target, file_path, checkpoint, **upload_options)
+            all_batches.extend(dict(batch, target=target_key) for batch in batches)
+            summary["records"] += sum(batch["records"] for batch in batches if batch["status"] == "ok")
+            summary["failed_batches"] += sum(1 for batch in batches if batch["status"] == "failed")
+        summary["files"] = len(files)
+        summary["seconds"] = time.perf_counter() - start
+
+        if summary["failed_batches"] == 0:
+            target_state["uploaded"] = True
+            checkpoint.save()
+            summary["status"] = "uploaded"
+        else:
+            summary["status"] = "incomplete"
+
+    if all(summary["status"] in ("uploaded", "done earlier") for summary in summaries):
+        checkpoint.forget([summary["target"] for summary in summaries])
+        logger.info(f"All targets replaced, checkpoint state of {len(summaries)} targets cleared")
+
+    return {"targets": summaries, "batches": all_batches}
+
+
+def write_batch_report(batches: List[Dict[str, Any]], output_path: str) -> None:
+    """
+    Write per-batch upload results to a CSV file
+
+    Parameters:
+        batches: Batch result dictionaries from upload_targets
+        output_path: Output CSV file path
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["target", "file", "batch", "records", "status", "seconds",
+                                               "records_per_second", "error"])
+        writer.writeheader()
+        writer.writerows(batches)
+    logger.info(f"Batch report written to {output_path}")
@@ -1,42 +1,163 @@
-from gen3.auth import Gen3Auth
-from gen3.submission import Gen3Submission
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
 
-# Set up the URL of the Gen3 commons you're working with
+"""
+Replace Nodes
 
-program_name = "ARDaC"
-commons_url = 'https://gen3-iudcc.cis230185.projects.jetstream-cloud.org/'
+Delete the records of (program, project, node_type) targets from a Gen3
+commons, and in replace mode upload them again from the release TSV files.
+Targets come from --target arguments or a manifest file and are deleted
+children first and uploaded parents first, following the Gen3 dictionary
+hierarchy.
+"""
 
-# program_name = "ORIEN"
-# commons_url = 'https://newdata-test04.cis230185.projects.jetstream-cloud.org/'
+import os
+import sys
+import argparse
+import logging
 
-# Authenticate using your credentials file (JSON format)
-credentials = f"./credentials_{program_name}.json"
-auth = Gen3Auth(commons_url, refresh_file=credentials)
+from submission_client import COMMONS, RateLimiter, create_submission
+from node_deletion import (
+    DEFAULT_BATCH_SIZE, parse_target, load_manifest, load_dictionary, node_levels, delete_targets, write_results
+)
+from node_upload import (
+    DEFAULT_UPLOAD_BATCH_SIZE, DEFAULT_IN_FLIGHT, UploadCheckpoint, find_release_files, reset_changed_targets,
+    upload_targets, write_batch_report
+)
 
-# Instantiate the Gen3Submission class to interact with the submission API
-submission = Gen3Submission(commons_url, auth)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
 
-# Specify the program, project, and the type of node to be deleted
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-program = "ARDaC"
-project = "AlcHepNet"
-node_type = "lab"
 
-# program = "ORIEN"
-# project = "Avatar"
-# node_type = "study"
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete or replace Gen3 nodes, following the dictionary hierarchy")
+    parser.add_argument("--mode", choices=["delete", "replace"], default="delete",
+                        help="delete: only delete the targets; replace: delete them and upload the release files")
+    parser.add_argument("--commons", choices=sorted(COMMONS), default="ARDaC",
+                        help="Known commons; sets the URL and the credentials_<commons>.json file")
+    parser.add_argument("--commons-url", default=None, help="URL of the Gen3 commons, overriding --commons")
+    parser.add_argument("--credentials", default=None,
+                        help="Credentials file (JSON format), default credentials_<commons>.json next to this script")
+    parser.add_argument("--no-auth", action="store_true",
+                        help="Send no credentials, e.g. to a local stand-in submission API")
+    parser.add_argument("--target", action="append", default=[],
+                        help="Target as program/project/node_type; can be repeated")
+    parser.add_argument("--manifest", default=None,
+                        help="CSV/TSV file with program, project and node_type columns, or a JSON list of targets")
+    parser.add_argument("--dictionary", default=None,
+                        help="Dictionary JSON file; fetched from the commons if not given")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum number of targets deleted at the same time")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Number of records queried and deleted per request")
+    parser.add_argument("--retries", type=int, default=3, help="Number of retries per request")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Initial retry delay in seconds, doubled per retry")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="Maximum requests per second across all workers (0 for no limit)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the records that would be deleted")
+    parser.add_argument("--results-out", default=None, help="CSV file receiving the result of each target")
+    # Replace mode
+    parser.add_argument("--data-dir", default=os.path.join(SCRIPT_DIR, "..", "data_detect", "data"),
+                        help="Directory containing the release tsv files uploaded in replace mode")
+    parser.add_argument("--upload-batch-size", type=int, default=DEFAULT_UPLOAD_BATCH_SIZE,
+                        help="Number of records submitted per upload request")
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT,
+                        help="Number of upload requests in flight per file")
+    parser.add_argument("--checkpoint", default="replace_checkpoint.json",
+                        help="Checkpoint file recording deleted targets and acknowledged upload batches")
+    parser.add_argument("--batch-report", default=None, help="CSV file receiving the result of each upload batch")
 
-# Delete the node of the specified type from the program and project
-print(f"Attempting to delete node...")
-print(f"Program: {program}")
-print(f"Project: {project}")
-print(f"Node Type: {node_type}")
-response = submission.delete_node(program, project, node_type)
-print(f"Response received: {response}")
+    args = parser.parse_args()
 
-if response is None:
-    print(f"May success nor failed. Please check your website.")
-elif response.status_code == 200:
-    print(f"Successfully deleted node '{node_type}' from program '{program}' and project '{project}'.")
-else:
-    print(f"Failed to delete node: {response.status_code} - {response.text}")
\ No newline at end of file
+    targets = [parse_target(value) for value in args.target]
+    if args.manifest:
+        targets.extend(load_manifest(args.manifest))
+    if not targets:
+        parser.error("no targets given, use --target or --manifest")
+
+    commons_url = args.commons_url or COMMONS[args.commons]
+    credentials = None
+    if not args.no_auth:
+        credentials = args.credentials or os.path.join(SCRIPT_DIR, f"credentials_{args.commons}.json")
+    submission = create_submission(commons_url, credentials)
+
+    levels = node_levels(load_dictionary(submission, args.dictionary))
+    rate_limiter = RateLimiter(args.rate_limit, burst=max(args.workers, args.in_flight))
+
+    # In replace mode, targets deleted by an interrupted earlier run must not be deleted again,
+    # unless their release files changed since
+    checkpoint = None
+    delete_list = targets
+    if args.mode == "replace" and not args.dry_run:
+        checkpoint = UploadCheckpoint(args.checkpoint)
+        reset_changed_targets(checkpoint, targets, args.data_dir)
+        delete_list = [t for t in targets if not checkpoint.target_state("/".join(t))["deleted"]]
+
+    logger.info(f"Deleting {len(delete_list)} targets from {commons_url} with {args.workers} workers")
+    results = delete_targets(
+        submission,
+        delete_list,
+        levels,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        retries=args.retries,
+        backoff=args.backoff,
+        rate_limiter=rate_limiter,
+        dry_run=args.dry_run
+    )
+
+    if args.results_out:
+        write_results(results, args.results_out)
+
+    print("\n===== Deletion Summary =====")
+    for result in results:
+        line = f"{result['target']}: {result['status']}, {result['records']} records, {result['seconds']:.1f}s"
+        if result["error"]:
+            line += f" - {result['error'][:200]}"
+        print(line)
+
+    failed = any(result["status"] in ("failed", "skipped") for result in results)
+
+    if args.mode == "replace" and args.dry_run:
+        print("\n===== Release Files =====")
+        for target in targets:
+            files = find_release_files(args.data_dir, target[2])
+            print(f"{'/'.join(target)}: {', '.join(os.path.basename(f) for f in files) or 'no release file'}")
+
+    elif args.mode == "replace":
+        for result in results:
+            if result["status"] == "deleted":
+                checkpoint.target_state(result["target"])["deleted"] = True
+        checkpoint.save()
+
+        upload = upload_targets(
+            submission,
+            targets,
+            levels,
+            args.data_dir,
+            checkpoint,
+            batch_size=args.upload_batch_size,
+            in_flight=args.in_flight,
+            retries=args.retries,
+            backoff=args.backoff,
+            rate_limiter=rate_limiter
+        )
+        if args.batch_report:
+            write_batch_report(upload["batches"], args.batch_report)
+
+        print("\n===== Upload Summary =====")
+        for summary in upload["targets"]:
+            rate = summary["records"] / summary["seconds"] if summary["seconds"] > 0 else 0
+            print(f"{summary['target']}: {summary['status']}, {summary['files']} files, {summary['records']} records "
+                  f"in {summary['seconds']:.1f}s ({rate:.1f} records/s), {summary['failed_batches']} failed batches")
+        for batch in upload["batches"]:
+            if batch["status"] == "failed":
+                print(f"  {batch['target']} {batch['file']} batch {batch['batch']}: {batch['error'][:200]}")
+        failed = failed or any(summary["status"] in ("incomplete", "not deleted") for summary in upload["targets"])
+
+    if failed:
+        sys.exit(1)
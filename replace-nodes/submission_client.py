@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gen3 Submission Client Helpers
+
+This module sets up the Gen3 submission client and provides the shared rate
+limiter and retry logic used for bulk node operations.
+"""
+
+import time
+import random
+import logging
+import threading
+from typing import Callable, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Known commons, selected with --commons
+COMMONS = {
+    "ARDaC": "https://gen3-iudcc.cis230185.projects.jetstream-cloud.org/",
+    "ORIEN": "https://newdata-test04.cis230185.projects.jetstream-cloud.org/",
+}
+
+
+class AnonymousAuth:
+    """Auth provider that sends no credentials, for local stand-in submission APIs"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint.rstrip("/")
+
+    def __call__(self, request):
+        return request
+
+
+class SubmissionClient:
+    """
+    Gen3Submission client together with the endpoint and auth provider of its requests
+
+    Gen3Submission keeps both private, but the TSV uploads and streamed
+    exports are sent with requests directly. Other attributes are looked up
+    on the Gen3Submission client (query, delete_records, get_dictionary_all).
+    """
+
+    def __init__(self, auth):
+        """
+        Initialize the client
+
+        Parameters:
+            auth: Auth provider with an endpoint attribute (Gen3Auth or AnonymousAuth)
+        """
+        from gen3.submission import Gen3Submission
+
+        self.auth = auth
+        self.endpoint = auth.endpoint.rstrip("/")
+        self.submission = Gen3Submission(auth_provider=auth)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.submission, name)
+
+    def project_url(self, program: str, project: str) -> str:
+        """Submission API URL of a project"""
+        return f"{self.endpoint}/api/v0/submission/{program}/{project}"
+
+
+def create_submission(commons_url: str, credentials: Optional[str] = None) -> SubmissionClient:
+    """
+    Create a submission client
+
+    Parameters:
+        commons_url: URL of the Gen3 commons
+        credentials: Path to the credentials file (JSON format); no authentication is sent if None
+
+    Returns:
+        SubmissionClient instance
+    """
+    if credentials is None:
+        auth = AnonymousAuth(commons_url)
+    else:
+        from gen3.auth import Gen3Auth
+        auth = Gen3Auth(commons_url, refresh_file=credentials)
+    return SubmissionClient(auth)
+
+
+def run_query(submission, query_text: str) -> dict:
+    """
+    Run a GraphQL query and fail on responses without data
+
+    Gen3Submission.query prints and returns error responses of the API (such
+    as 5xx bodies) instead of raising, which would hide them from the retries.
+
+    Parameters:
+        submission: Gen3Submission instance
+        query_text: GraphQL query
+
+    Returns:
+        Query response containing "data"
+    """
+    result = submission.query(query_text)
+    if not isinstance(result, dict) or "data" not in result:
+        raise RuntimeError(f"Query returned no data: {result}")
+    return result
+
+
+class RateLimiter:
+    """Token bucket limiting the request rate across threads"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the rate limiter
+
+        Parameters:
+            rate: Maximum number of requests per second; no limit if 0
+            burst: Number of requests that can be sent at once after an idle period
+        """
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a request may be sent
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SubmissionRejected(Exception):
+    """The submission API rejected the records of a request; sending them again would fail the same way"""
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rejected submissions and client errors other than 408 and 429 are not retried"""
+    if isinstance(error, SubmissionRejected):
+        return False
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code is None:
+        return True
+    return status_code >= 500 or status_code in (408, 429)
+
+
+def call_with_retry(func: Callable, *args, retries: int = 3, backoff: float = 1.0,
+                    rate_limiter: Optional[RateLimiter] = None, **kwargs) -> Any:
+    """
+    Call a submission API function with rate limiting and exponential backoff
+
+    Parameters:
+        func: Function to call
+        args: Positional arguments of the function
+        retries: Number of retries after the first attempt
+        backoff: Delay in seconds before the first retry; doubled for each further retry
+        rate_limiter: Rate limiter acquired before every attempt
+        kwargs: Keyword arguments of the function
+
+    Returns:
+        Return value of the function
+    """
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+            logger.warning(f"{getattr(func, '__name__', 'request')} failed ({str(e)}), "
+                           f"retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
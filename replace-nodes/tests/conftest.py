@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+"""Shared fixtures of the replace-nodes tests"""
+
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# The modules of replace-nodes are imported as top-level modules, as replace-nodes.py does
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+
+from standin_server import StandinSubmissionAPI  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    """Stand-in submission API with subject, visit and lab records in projects P-A and P-B"""
+    api = StandinSubmissionAPI()
+    for project_id in ("P-A", "P-B"):
+        api.add_records(project_id, "subject", 25)
+        api.add_records(project_id, "visit", 12)
+        api.add_records(project_id, "lab", 33)
+    api.url = api.start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def submission(standin):
+    """Submission client of the stand-in API, without credentials"""
+    pytest.importorskip("gen3")
+    from submission_client import create_submission
+    return create_submission(standin.url)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Stand-in Submission API
+
+A small in-process HTTP server answering the Gen3 submission API requests
+made by replace-nodes.py: the dictionary, GraphQL id and count queries,
+record deletion and TSV uploads, and the TSV exports streamed by
+data_detect. Like the real API, it refuses to delete records while records
+of a child node type remain in the project. Failures can be injected to
+exercise the retries.
+
+It can also be run on its own to try the CLI locally:
+    python tests/standin_server.py 8000
+"""
+
+import re
+import sys
+import json
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+# Minimal dictionary: program <- project <- subject <- visit <- lab (lab also links to subject)
+DICTIONARY = {
+    "_definitions": {},
+    "program": {"links": []},
+    "project": {"links": [{"name": "programs", "target_type": "program"}]},
+    "subject": {"links": [{"name": "projects", "target_type": "project"}]},
+    "visit": {"links": [{"subgroup": [{"name": "subjects", "target_type": "subject"}]}]},
+    "lab": {"links": [{"name": "visits", "target_type": "visit"}, {"name": "subjects", "target_type": "subject"}]},
+}
+
+COUNT_QUERY = re.compile(r'_(\w+)_count\(project_id: "([^"]+)"\)')
+IDS_QUERY = re.compile(r'(\w+)\(first: (\d+), project_id: "([^"]+)"\)')
+PROJECT_PATH = re.compile(r"/api/v0/submission/([^/]+)/([^/]+)(?:/entities/([^/?]+))?/?$")
+EXPORT_PATH = re.compile(r"/api/v0/submission/([^/]+)/([^/]+)/export/?$")
+
+# Number of bytes sent per chunk of an export response
+EXPORT_CHUNK_BYTES = 64
+
+
+class StandinSubmissionAPI:
+    """Records of a stand-in commons and the HTTP server answering for them"""
+
+    def __init__(self, dictionary: Optional[Dict[str, Any]] = None):
+        """
+        Initialize an empty stand-in commons
+
+        Parameters:
+            dictionary: Dictionary schema; DICTIONARY if None
+        """
+        self.dictionary = dictionary or DICTIONARY
+        # id -> (project_id, node_type, submitter_id, properties)
+        self.records: Dict[str, Tuple[str, str, str, Dict[str, str]]] = {}
+        # (project_id, node_type, number of records) per successful delete request, in order
+        self.deletes: List[Tuple[str, str, int]] = []
+        # (project_id, number of records) per successful upload request
+        self.uploads: List[Tuple[str, int]] = []
+        # (project_id, node_type) per export request, in order
+        self.exports: List[Tuple[str, str]] = []
+        # Number of upcoming query requests answered with 503
+        self.failing_queries = 0
+        # Node types whose delete requests are answered with this status
+        self.failing_deletes: Dict[str, int] = {}
+        # Number of upcoming upload requests answered with 503
+        self.failing_uploads = 0
+        # Submitter IDs whose upload is rejected as invalid, with the rest of their batch
+        self.invalid_records: set = set()
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def add_records(self, project_id: str, node_type: str, count: int,
+                    properties: Optional[Callable[[int], Dict[str, str]]] = None) -> None:
+        """Add records named <node_type>_<n> to a project, with the properties of record n if given"""
+        with self.lock:
+            for i in range(count):
+                self.records[str(uuid.uuid4())] = (project_id, node_type, f"{node_type}_{i}",
+                                                   properties(i) if properties else {})
+
+    def export_tsv(self, project_id: str, node_type: str) -> str:
+        """TSV export of the records of a node type in a project, properties in first-seen order"""
+        with self.lock:
+            records = [record for record in self.records.values() if record[:2] == (project_id, node_type)]
+        columns: Dict[str, None] = {}
+        for record in records:
+            columns.update(dict.fromkeys(record[3]))
+        lines = ["\t".join(["type", "submitter_id"] + list(columns))]
+        for _, _, submitter_id, properties in records:
+            lines.append("\t".join([node_type, submitter_id] + [properties.get(column, "") for column in columns]))
+        return "\n".join(lines) + "\n"
+
+    def count(self, project_id: str, node_type: str) -> int:
+        """Number of records of a node type in a project"""
+        with self.lock:
+            return sum(1 for record in self.records.values() if record[:2] == (project_id, node_type))
+
+    def children(self, node_type: str) -> List[str]:
+        """Node types linking to a node type"""
+        def targets(links):
+            for link in links or []:
+                if "subgroup" in link:
+                    yield from targets(link["subgroup"])
+                elif "target_type" in link:
+                    yield link["target_type"]
+        return [node for node, schema in self.dictionary.items()
+                if isinstance(schema, dict) and node_type in targets(schema.get("links"))]
+
+    def start(self, port: int = 0) -> str:
+        """
+        Start serving in a background thread
+
+        Parameters:
+            port: Port to listen on; any free port if 0
+
+        Returns:
+            URL of the stand-in commons
+        """
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Export responses use chunked transfer encoding
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, status: int, body: Any) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip("/").endswith("/_dictionary/_all"):
+                    return self.send(200, api.dictionary)
+                match = EXPORT_PATH.search(url.path)
+                query = parse_qs(url.query)
+                if match is None or query.get("format") != ["tsv"] or "node_label" not in query:
+                    return self.send(404, {"message": "not found"})
+                project_id, node_type = f"{match.group(1)}-{match.group(2)}", query["node_label"][0]
+                with api.lock:
+                    api.exports.append((project_id, node_type))
+                data = api.export_tsv(project_id, node_type).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/tab-separated-values")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                # Small chunks, so that clients parse the rows while they arrive
+                for start in range(0, len(data), EXPORT_CHUNK_BYTES):
+                    chunk = data[start:start + EXPORT_CHUNK_BYTES]
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_POST(self):
+                query = json.loads(self.body())["query"]
+                with api.lock:
+                    if api.failing_queries > 0:
+                        api.failing_queries -= 1
+                        return self.send(503, {"message": "service unavailable"})
+                    match = COUNT_QUERY.search(query)
+                    if match:
+                        node_type, project_id = match.groups()
+                        count = sum(1 for record in api.records.values() if record[:2] == (project_id, node_type))
+                        return self.send(200, {"data": {f"_{node_type}_count": count}})
+                    match = IDS_QUERY.search(query)
+                    if match is None:
+                        return self.send(400, {"errors": [f"unsupported query {query}"]})
+                    node_type, first, project_id = match.group(1), int(match.group(2)), match.group(3)
+                    ids = [record_id for record_id, record in api.records.items()
+                           if record[:2] == (project_id, node_type)][:first]
+                    self.send(200, {"data": {node_type: [{"id": record_id} for record_id in ids]}})
+
+            def do_DELETE(self):
+                match = PROJECT_PATH.search(self.path)
+                if match is None or match.group(3) is None:
+                    return self.send(404, {"message": "not found"})
+                program, project, ids = match.groups()
+                project_id = f"{program}-{project}"
+                ids = ids.split(",")
+                with api.lock:
+                    node_types = {api.records[record_id][1] for record_id in ids if record_id in api.records}
+                    for node_type in node_types:
+                        if node_type in api.failing_deletes:
+                            return self.send(api.failing_deletes[node_type], {"message": f"cannot delete {node_type}"})
+                        for child in api.children(node_type):
+                            if any(record[:2] == (project_id, child) for record in api.records.values()):
+                                return self.send(400, {"message": f"{node_type} records still have {child} children"})
+                    for record_id in ids:
+                        api.records.pop(record_id, None)
+                    api.deletes.append((project_id, ",".join(sorted(node_types)), len(ids)))
+                self.send(200, {"code": 200, "entities": [{"id": record_id, "valid": True} for record_id in ids]})
+
+            def do_PUT(self):
+                match = PROJECT_PATH.search(self.path)
+                if match is None or match.group(3) is not None:
+                    return self.send(404, {"message": "not found"})
+                project_id = f"{match.group(1)}-{match.group(2)}"
+                lines = self.body().decode("utf-8").strip("\n").split("\n")
+                header = lines[0].split("\t")
+                rows = [dict(zip(header, line.split("\t"))) for line in lines[1:]]
+                with api.lock:
+                    if api.failing_uploads > 0:
+                        api.failing_uploads -= 1
+                        return self.send(503, {"message": "service unavailable"})
+                    if any(row["submitter_id"] in api.invalid_records for row in rows):
+                        return self.send(400, {"code": 400, "success": False, "entities": [
+                            {"unique_keys": [{"submitter_id": row["submitter_id"]}],
+                             "errors": [{"message": "invalid record"}] if row["submitter_id"] in api.invalid_records
+                             else []}
+                            for row in rows]})
+                    for row in rows:
+                        properties = {key: value for key, value in row.items() if key not in ("type", "submitter_id")}
+                        api.records[str(uuid.uuid4())] = (project_id, row["type"], row["submitter_id"], properties)
+                    api.uploads.append((project_id, len(rows)))
+                self.send(200, {"code": 200, "success": True,
+                                "entities": [{"unique_keys": [{"submitter_id": row["submitter_id"]}]} for row in rows]})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self) -> None:
+        """Stop the server"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+if __name__ == "__main__":
+    standin = StandinSubmissionAPI()
+    for project_id in ("P-A", "P-B"):
+        standin.add_records(project_id, "subject", 250)
+        standin.add_records(project_id, "visit", 120)
+        standin.add_records(project_id, "lab", 330)
+    url = standin.start(int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+    print(f"Stand-in submission API on {url}; dictionary: {json.dumps(DICTIONARY)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standin.stop()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of bulk node deletion against the stand-in submission API"""
+
+from node_deletion import node_levels, delete_targets
+from standin_server import DICTIONARY
+
+LEVELS = node_levels(DICTIONARY)
+TARGETS = [(program, project, node_type) for program, project in (("P", "A"), ("P", "B"))
+           for node_type in ("subject", "visit", "lab")]
+
+
+def test_node_levels():
+    assert LEVELS == {"program": 0, "project": 1, "subject": 2, "visit": 3, "lab": 4}
+
+
+def test_deletes_children_first(standin, submission):
+    # Targets are given parents first; the stand-in refuses to delete records that still have children
+    results = delete_targets(submission, TARGETS, LEVELS, workers=4, batch_size=10, retries=0)
+
+    assert [result["status"] for result in results] == ["deleted"] * 6
+    assert [result["records"] for result in results] == [25, 12, 33] * 2
+    assert standin.records == {}
+    for project_id in ("P-A", "P-B"):
+        order = [node_type for project, node_type, _ in standin.deletes if project == project_id]
+        assert order == sorted(order, key=lambda node_type: -LEVELS[node_type])
+        assert order.count("lab") == 4 and order.count("visit") == 2 and order.count("subject") == 3
+
+
+def test_failure_skips_parents_of_the_same_project(standin, submission):
+    standin.failing_deletes["visit"] = 400
+
+    results = {result["target"]: result for result in
+               delete_targets(submission, TARGETS, LEVELS, workers=4, batch_size=10, retries=2, backoff=0)}
+
+    assert results["P/A/lab"]["status"] == "deleted"
+    assert results["P/A/visit"]["status"] == "failed"
+    assert results["P/A/subject"]["status"] == "skipped"
+    assert standin.count("P-A", "subject") == 25
+    # Client errors are not retried
+    assert "400" in results["P/A/visit"]["error"]
+    # The failure of visit in P-B skips subject there as well, independently of P-A
+    assert results["P/B/subject"]["status"] == "skipped"
+
+
+def test_retries_unavailable_api(standin, submission):
+    standin.failing_queries = 2
+
+    results = delete_targets(submission, [("P", "A", "lab")], LEVELS, batch_size=10, retries=3, backoff=0)
+
+    assert results[0]["status"] == "deleted"
+    assert results[0]["records"] == 33
+    assert standin.count("P-A", "lab") == 0
+
+
+def test_gives_up_after_retries(standin, submission):
+    standin.failing_queries = 5
+
+    results = delete_targets(submission, [("P", "A", "lab")], LEVELS, batch_size=10, retries=1, backoff=0)
+
+    assert results[0]["status"] == "failed"
+    assert standin.count("P-A", "lab") == 33
+
+
+def test_dry_run_deletes_nothing(standin, submission):
+    results = delete_targets(submission, TARGETS[:3], LEVELS, batch_size=10, dry_run=True)
+
+    assert [(result["status"], result["records"]) for result in results] == \
+        [("dry-run", 25), ("dry-run", 12), ("dry-run", 33)]
+    assert standin.deletes == []
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of replace mode and its checkpoint, running replace-nodes.py against the stand-in submission API"""
+
+import os
+import sys
+import gzip
+import subprocess
+
+import pytest
+
+from node_upload import UploadCheckpoint
+
+pytest.importorskip("gen3")
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "replace-nodes.py")
+
+
+def write_release(data_dir, records, compressed=False):
+    """Write a lab release file with records in P-A and one record in P-B"""
+    path = os.path.join(data_dir, "lab.tsv.gz" if compressed else "lab.tsv")
+    with (gzip.open(path, 'wt', encoding='utf-8') if compressed else open(path, 'w', encoding='utf-8')) as f:
+        f.write("*type\t*submitter_id\tproject_id\n")
+        for i in range(records):
+            f.write(f"lab\tlab_release_{i}\tP-A\n")
+        f.write("lab\tlab_other\tP-B\n")
+    return path
+
+
+def uploaded(standin):
+    """Submitter IDs of the lab records uploaded to P-A"""
+    return sorted(record[2] for record in standin.records.values()
+                  if record[:2] == ("P-A", "lab") and record[2].startswith("lab_release_"))
+
+
+def replace(standin, tmp_path):
+    """Run replace mode for P/A/lab and return the process result"""
+    return subprocess.run(
+        [sys.executable, SCRIPT, "--mode", "replace", "--commons-url", standin.url, "--no-auth",
+         "--target", "P/A/lab", "--data-dir", str(tmp_path), "--checkpoint", str(tmp_path / "checkpoint.json"),
+         "--upload-batch-size", "2", "--backoff", "0"],
+        capture_output=True, text=True, timeout=60
+    )
+
+
+def test_replace_clears_the_checkpoint(standin, tmp_path):
+    write_release(tmp_path, 5)
+
+    first = replace(standin, tmp_path)
+    assert first.returncode == 0, first.stderr
+    assert standin.count("P-A", "lab") == 5
+    assert standin.count("P-B", "lab") == 33
+    assert not (tmp_path / "checkpoint.json").exists()
+
+    # A second run replaces the target again instead of finding it done
+    second = replace(standin, tmp_path)
+    assert second.returncode == 0, second.stderr
+    assert "P/A/lab: deleted, 5 records" in second.stdout
+    assert "P/A/lab: uploaded" in second.stdout
+    assert standin.count("P-A", "lab") == 5
+
+
+def test_resumes_finished_target_with_unchanged_files(standin, tmp_path):
+    path = write_release(tmp_path, 5)
+    checkpoint = UploadCheckpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.file_state("P/A/lab", path, 2)
+    checkpoint.target_state("P/A/lab").update(deleted=True, uploaded=True)
+    checkpoint.save()
+
+    result = replace(standin, tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert "P/A/lab: done earlier" in result.stdout
+    assert standin.count("P-A", "lab") == 33
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_replaces_again_when_release_files_changed(standin, tmp_path):
+    path = write_release(tmp_path, 5)
+    checkpoint = UploadCheckpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.file_state("P/A/lab", path, 2)
+    checkpoint.target_state("P/A/lab").update(deleted=True, uploaded=True)
+    checkpoint.save()
+    write_release(tmp_path, 7)
+
+    result = replace(standin, tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert "P/A/lab: deleted, 33 records" in result.stdout
+    assert standin.count("P-A", "lab") == 7
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_resumes_partially_acknowledged_upload(standin, tmp_path):
+    path = write_release(tmp_path, 10)
+    checkpoint = UploadCheckpoint(str(tmp_path / "checkpoint.json"))
+    # Batches 0, 1 and 3 of 5 were acknowledged before the interruption
+    state = checkpoint.file_state("P/A/lab", path, 2)
+    state.update(acked_through=2, acked=[3])
+    checkpoint.target_state("P/A/lab")["deleted"] = True
+    checkpoint.save()
+
+    result = replace(standin, tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert "P/A/lab: uploaded, 1 files, 4 records" in result.stdout
+    assert standin.uploads == [("P-A", 2), ("P-A", 2)]
+    assert uploaded(standin) == ["lab_release_4", "lab_release_5", "lab_release_8", "lab_release_9"]
+    assert standin.deletes == []
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_retries_failing_batches(standin, tmp_path):
+    write_release(tmp_path, 5, compressed=True)
+    standin.failing_uploads = 2
+
+    result = replace(standin, tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert "P/A/lab: uploaded, 1 files, 5 records" in result.stdout
+    assert uploaded(standin) == [f"lab_release_{i}" for i in range(5)]
+    assert standin.failing_uploads == 0
+
+
+def test_rejected_batch_is_sent_again_on_the_next_run(standin, tmp_path):
+    write_release(tmp_path, 5)
+    standin.invalid_records = {"lab_release_3"}
+
+    first = replace(standin, tmp_path)
+
+    assert first.returncode == 1
+    assert "P/A/lab: incomplete, 1 files, 3 records" in first.stdout
+    assert "batch 1: 400 rejected: lab_release_3: invalid record" in first.stdout
+    checkpoint = UploadCheckpoint(str(tmp_path / "checkpoint.json"))
+    state = checkpoint.target_state("P/A/lab")
+    assert state["deleted"] and not state["uploaded"]
+    assert [(file_state["acked_through"], file_state["acked"]) for file_state in state["files"].values()] == [(1, [2])]
+
+    standin.invalid_records = set()
+    second = replace(standin, tmp_path)
+
+    assert second.returncode == 0, second.stderr
+    assert "P/A/lab: uploaded, 1 files, 2 records" in second.stdout
+    assert uploaded(standin) == [f"lab_release_{i}" for i in range(5)]
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_checkpoint_is_saved_every_few_batches(tmp_path):
+    path = write_release(tmp_path, 10)
+    checkpoint = UploadCheckpoint(str(tmp_path / "checkpoint.json"), save_batches=3, save_seconds=3600)
+    state = checkpoint.file_state("P/A/lab", path, 2)
+
+    checkpoint.ack(state, 0)
+    checkpoint.ack(state, 2)
+    assert not (tmp_path / "checkpoint.json").exists()
+    checkpoint.ack(state, 1)
+
+    saved = UploadCheckpoint(str(tmp_path / "checkpoint.json")).target_state("P/A/lab")["files"][path]
+    assert saved["acked_through"] == 3